@@ -1,8 +1,12 @@
 import streamlit as st
 from main import FaceAccessSystem
+from recognition.roi import RegionOfInterest
 import tempfile
 import os
 import inspect
+import json
+import cv2
+import numpy as np
 
 st.set_page_config(
     page_title="Face Access System",
@@ -16,7 +20,13 @@ else:
     # Re-init otomatis jika masih pakai instance lama yang belum punya argumen baru.
     try:
         sig = inspect.signature(st.session_state.system.recognize_from_crowd_image)
-        if "source_type" not in sig.parameters:
+        video_sig = inspect.signature(st.session_state.system.recognize_from_crowd_video)
+        if (
+            "camera_id" not in sig.parameters
+            or "workers" not in video_sig.parameters
+            or not hasattr(st.session_state.system, "iter_crowd_video")
+            or not hasattr(st.session_state.system, "summarize_crowd_records")
+        ):
             st.session_state.system = FaceAccessSystem()
     except Exception:
         st.session_state.system = FaceAccessSystem()
@@ -27,6 +37,27 @@ if "page" not in st.session_state:
 
 system = st.session_state.system
 
+
+def stream_crowd_summary(records, source_type="VIDEO", camera_id=None):
+    """Konsumsi record iter_crowd_video: progres tampil selama proses, return summary"""
+    progress = st.empty()
+    latest = st.empty()
+
+    def show(record, reducer):
+        if record["type"] == "frame":
+            progress.caption(
+                f"Frame {record['frame']} | diproses {reducer.processed_frames} frame | "
+                f"dikenali {len(reducer.unique_people)} orang"
+            )
+        elif record["type"] == "detection":
+            latest.write(f"Terakhir dikenali: {record['nama']} (NIP: {record['nip']}) di frame {record['frame']}")
+
+    summary = system.summarize_crowd_records(records, source_type, camera_id, on_record=show)
+    progress.empty()
+    latest.empty()
+    return summary
+
+
 st.title("🔐 Face Access System")
 
 # ===== MENU =====
@@ -173,7 +204,7 @@ if st.session_state.page == "enrollment":
                                         st.error("✗ Gagal membaca gambar")
                                         continue
 
-                                    face, msg_face = system.detector.get_single_face(frame, system.settings.CONFIDENCE_THRESHOLD)
+                                    face, msg_face = system.enrollment_detector.get_single_face(frame, system.settings.CONFIDENCE_THRESHOLD)
                                     if face is None:
                                         st.error(f"✗ {msg_face}")
                                         continue
@@ -358,12 +389,72 @@ elif st.session_state.page == "crowd":
         horizontal=True
     )
     is_outdoor = st.checkbox("Outdoor")
+    camera_id = st.text_input(
+        "ID Kamera (opsional)",
+        help="ROI tersimpan untuk ID ini dipakai saat deteksi. Kosongkan untuk seluruh frame."
+    ).strip() or None
+
+    # ===== ROI EDITOR =====
+    with st.expander("🗺️ Region of Interest (ROI) Kamera"):
+        roi_store = system.crowd_detector.roi_store
+        if camera_id is None:
+            st.info("Isi ID Kamera untuk mengatur ROI.")
+            saved = roi_store.list_cameras()
+            if saved:
+                st.caption(f"Kamera dengan ROI: {', '.join(saved)}")
+        else:
+            current = roi_store.get(camera_id) or RegionOfInterest()
+            st.caption(
+                "Poligon dalam koordinat ternormalisasi 0..1, format "
+                "[[[x, y], [x, y], [x, y]], ...]. Include kosong = seluruh frame."
+            )
+            include_text = st.text_area(
+                "Poligon Include (area deteksi)",
+                value=json.dumps(current.include),
+                key=f"roi_include_{camera_id}"
+            )
+            exclude_text = st.text_area(
+                "Poligon Exclude (pantulan, poster, area jauh)",
+                value=json.dumps(current.exclude),
+                key=f"roi_exclude_{camera_id}"
+            )
+
+            roi = None
+            try:
+                roi = RegionOfInterest(
+                    include=json.loads(include_text or "[]"),
+                    exclude=json.loads(exclude_text or "[]")
+                )
+            except Exception as e:
+                st.error(f"❌ ROI tidak valid: {e}")
+
+            snapshot = st.file_uploader(
+                "Snapshot kamera untuk preview (opsional)",
+                type=["jpg", "jpeg", "png", "bmp"],
+                key=f"roi_snapshot_{camera_id}"
+            )
+            if roi is not None and snapshot is not None:
+                image = cv2.imdecode(np.frombuffer(snapshot.getvalue(), np.uint8), cv2.IMREAD_COLOR)
+                if image is not None:
+                    roi.draw(image)
+                    st.image(cv2.cvtColor(image, cv2.COLOR_BGR2RGB), caption="Hijau: include, merah: exclude")
+
+            col_save, col_delete = st.columns(2)
+            with col_save:
+                if st.button("💾 Simpan ROI", disabled=roi is None):
+                    roi_store.save(camera_id, roi)
+                    st.success(f"ROI kamera {camera_id} disimpan")
+            with col_delete:
+                if st.button("🗑️ Hapus ROI"):
+                    roi_store.delete(camera_id)
+                    st.success(f"ROI kamera {camera_id} dihapus")
 
     video_source = None
     duration_sec = None
     temp_upload_path = None
     uploaded_file = None
     upload_type = "Video"
+    segment_workers = 1
 
     if mode_sumber == "Upload":
         upload_type = st.radio(
@@ -384,6 +475,13 @@ elif st.session_state.page == "crowd":
                 max_value=600,
                 value=5
             )
+            segment_workers = st.number_input(
+                "Worker Paralel (video panjang)",
+                min_value=1,
+                max_value=max(1, os.cpu_count() or 1),
+                value=1,
+                help="> 1: video dibagi per segmen waktu dan diproses paralel; durasi diabaikan"
+            )
         else:
             uploaded_file = st.file_uploader(
                 "Upload file gambar",
@@ -414,31 +512,74 @@ elif st.session_state.page == "crowd":
                         summary = system.recognize_from_crowd_image(
                             image_path=video_source,
                             is_outdoor=is_outdoor,
-                            source_type="IMAGE"
+                            source_type="IMAGE",
+                            camera_id=camera_id
                         )
-                    else:
+                    elif int(segment_workers) > 1:
                         summary = system.recognize_from_crowd_video(
                             video_source=video_source,
                             output_path=None,
                             is_outdoor=is_outdoor,
                             sample_fps=5,
                             duration_sec=int(duration_sec) if duration_sec is not None else None,
-                            source_type="VIDEO"
+                            source_type="VIDEO",
+                            camera_id=camera_id,
+                            workers=int(segment_workers)
                         )
+                    else:
+                        summary = stream_crowd_summary(system.iter_crowd_video(
+                            video_source=video_source,
+                            is_outdoor=is_outdoor,
+                            sample_fps=5,
+                            duration_sec=int(duration_sec) if duration_sec is not None else None,
+                            source_type="VIDEO",
+                            camera_id=camera_id
+                        ), "VIDEO", camera_id)
             else:
                 with st.spinner("Memproses webcam..."):
-                    summary = system.recognize_from_crowd_video(
+                    summary = stream_crowd_summary(system.iter_crowd_video(
                         video_source=video_source,
-                        output_path=None,
                         is_outdoor=is_outdoor,
                         duration_sec=int(duration_sec) if duration_sec is not None else None,
-                        source_type="WEBCAM"
-                    )
+                        source_type="WEBCAM",
+                        camera_id=camera_id
+                    ), "WEBCAM", camera_id)
 
             if summary:
                 st.success("Proses selesai")
                 st.write(f"Total Frame: {summary['total_frames']}")
                 st.write(f"Unique People: {summary['unique_people']}")
+                detection = summary.get("detection")
+                if detection:
+                    st.caption(
+                        f"Deteksi: mode {detection['mode']}, skala {detection['scale']}, "
+                        f"rata-rata {detection['avg_detect_ms']} ms/frame"
+                    )
+                tracking = summary.get("tracking")
+                if tracking and tracking["enabled"]:
+                    st.caption(
+                        f"Tracking: {tracking['tracks']} track, ArcFace {tracking['embedded_faces']}x, "
+                        f"identitas dipakai ulang {tracking['reused_faces']}x"
+                    )
+                motion = summary.get("motion_gate")
+                if motion:
+                    st.caption(
+                        f"Motion gate: {motion['gated_frames']}/{motion['checked_frames']} frame sampel "
+                        f"dilewati ({int(motion['gated_ratio'] * 100)}%)"
+                    )
+                sampling = summary.get("sampling")
+                if sampling:
+                    st.caption(
+                        f"Sampling adaptif: efektif {sampling['effective_fps']} fps "
+                        f"({sampling['min_fps']:g}-{sampling['max_fps']:g} fps, {sampling['changes']} perubahan laju)"
+                    )
+                degradation = summary.get("degradation")
+                if degradation:
+                    st.caption(
+                        f"Degradasi: level {degradation['level']} ({degradation['level_name']}), "
+                        f"maks {degradation['max_level']}, rata-rata {degradation['avg_frame_ms']} ms/frame "
+                        f"dari budget {degradation['budget_ms']} ms"
+                    )
 
                 if summary["people"]:
                     st.subheader("Orang Terdeteksi")
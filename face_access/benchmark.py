@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Benchmark & laporan performa komponen pencocokan
+
+Contoh:
+    python benchmark.py ann --queries 500
+    python benchmark.py ann --synthetic 500000 --nlist 4096 --pq-m 64
+    python benchmark.py quant --precision int8
+    python benchmark.py scale --video rekaman.mp4 --scale 0.5
+    python benchmark.py motion --video koridor.mp4 --detect
+"""
+
+import argparse
+import time
+import numpy as np
+from config.settings import Settings
+from core.ann_index import IVFIndex, recall_report
+from core.gallery import EmbeddingGallery, QuantizedGallery
+from utils.logger import Logger
+from utils.math_utils import box_iou
+
+
+def _normalize(matrix):
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def _load_gallery(settings, synthetic=0, seed=0):
+    """Gallery dari DB, atau gallery acak ternormalisasi sebanyak `synthetic` baris"""
+    if synthetic:
+        rng = np.random.default_rng(seed)
+        matrix = _normalize(rng.standard_normal((synthetic, 512)).astype(np.float32))
+        return EmbeddingGallery(np.arange(synthetic), matrix)
+
+    from db.database import Database
+    from db.embedding_repo import EmbeddingRepository
+
+    database = Database(settings.DB_CONFIG)
+    if not database.connect():
+        raise SystemExit("Database connection failed")
+    try:
+        repo = EmbeddingRepository(database, storage_mode=settings.EMBEDDING_STORAGE)
+        return repo.get_gallery()
+    finally:
+        database.close()
+
+
+def _make_queries(gallery, n_queries, noise=0.05, seed=1):
+    """Probe sintetis: template gallery + noise, dinormalisasi ulang"""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(gallery), min(n_queries, len(gallery)), replace=False)
+    queries = gallery.matrix[rows] + noise * rng.standard_normal((len(rows), gallery.dim)).astype(np.float32)
+    return _normalize(queries)
+
+
+def run_ann(args, settings):
+    gallery = _load_gallery(settings, synthetic=args.synthetic)
+    if len(gallery) == 0:
+        raise SystemExit("Gallery kosong")
+
+    Logger.info(f"Gallery: {len(gallery)} template; build IVF nlist={args.nlist} pq_m={args.pq_m}")
+    index = IVFIndex.build(gallery, nlist=args.nlist, pq_m=args.pq_m)
+    queries = _make_queries(gallery, args.queries, noise=args.noise)
+
+    print(f"\n{'nprobe':>7} | {'recall@' + str(args.k):>9} | {'ANN ms':>8} | {'exact ms':>8}")
+    print("-" * 42)
+    for row in recall_report(index, gallery, queries, k=args.k):
+        print(f"{row['nprobe']:>7} | {row['recall']:>9.3f} | {row['ann_ms']:>8.3f} | {row['exact_ms']:>8.3f}")
+
+
+def run_quant(args, settings):
+    gallery = _load_gallery(settings, synthetic=args.synthetic)
+    if len(gallery) == 0:
+        raise SystemExit("Gallery kosong")
+
+    quantized = QuantizedGallery.from_gallery(gallery, precision=args.precision, rerank_k=args.rerank_k)
+    queries = _make_queries(gallery, args.queries, noise=args.noise)
+    # Tambah probe "impostor" acak agar keputusan DENIED juga teruji
+    rng = np.random.default_rng(2)
+    impostors = _normalize(rng.standard_normal((len(queries), gallery.dim)).astype(np.float32))
+    queries = np.concatenate([queries, impostors])
+    threshold = settings.RECOGNITION_SIMILARITY
+
+    start = time.perf_counter()
+    exact_ids, exact_sims = gallery.best_batch(queries)
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    quant_ids, quant_sims = quantized.best_batch(queries)
+    quant_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    exact_decision = np.where(exact_sims >= threshold, exact_ids, -1)
+    quant_decision = np.where(quant_sims >= threshold, quant_ids, -1)
+    agreement = float(np.mean(exact_decision == quant_decision))
+
+    print(f"\nGallery           : {len(gallery)} template, threshold {threshold}")
+    # Byte yang benar-benar dipegang objek gallery di RAM (ids + matriks/kode; memmap tidak dihitung)
+    float_nbytes = gallery.ids.nbytes + gallery.matrix.nbytes
+    print(f"RAM float32       : {gallery.resident_nbytes / 1e6:.2f} MB"
+          + (" (memmap gallery file)" if gallery.resident_nbytes < float_nbytes else ""))
+    print(f"RAM {args.precision:<14}: {quantized.resident_nbytes / 1e6:.2f} MB "
+          f"({float_nbytes / quantized.resident_nbytes:.1f}x lebih kecil dari float32 di RAM; "
+          f"rerank dari memmap)")
+    print(f"Latency exact     : {exact_ms:.3f} ms/probe")
+    print(f"Latency quantized : {quant_ms:.3f} ms/probe (rerank_k={args.rerank_k})")
+    print(f"Keputusan sama    : {agreement * 100:.2f}% dari {len(queries)} probe")
+    print(f"Max |sim diff|    : {float(np.max(np.abs(exact_sims - quant_sims))):.6f}")
+
+
+def _pair_faces(reference, candidates, iou_threshold):
+    """Pasangkan deteksi kandidat ke deteksi referensi (greedy, IoU terbesar dulu)"""
+    if not reference or not candidates:
+        return []
+    iou = box_iou(np.array([f.bbox for f in reference]), np.array([f.bbox for f in candidates]))
+    pairs = []
+    used = set()
+    for i in np.argsort(-iou.max(axis=1)):
+        for j in np.argsort(-iou[i]):
+            if iou[i, j] < iou_threshold:
+                break
+            if j not in used:
+                pairs.append((int(i), int(j)))
+                used.add(j)
+                break
+    return pairs
+
+
+def run_scale(args, settings):
+    """
+    Deteksi resolusi penuh vs frame diperkecil pada rekaman nyata
+
+    Tiga varian embedding untuk wajah yang sama:
+      full  - deteksi & ArcFace pada frame asli (baseline)
+      two   - deteksi pada frame kecil, ArcFace dari piksel frame asli (CROWD_DETECTION_SCALE)
+      naive - deteksi & ArcFace sama-sama pada frame kecil
+    """
+    import cv2
+    from core.detector import FaceDetector
+    from core.embedding import EmbeddingExtractor
+
+    settings.apply_thread_budget()
+    detector = FaceDetector.from_profile('crowd', settings)
+    detector.warmup(settings.WARMUP_RUNS)
+    extractor = EmbeddingExtractor(detector, batch_size=settings.EMBEDDING_BATCH_SIZE)
+    gallery = None if args.no_gallery else _load_gallery(settings)
+
+    cap = cv2.VideoCapture(args.video)
+    if not cap.isOpened():
+        raise SystemExit(f"Video tidak bisa dibuka: {args.video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    interval = max(1, int(round(fps / args.sample_fps)))
+
+    full_ms = []
+    scaled_ms = []
+    full_count = 0
+    paired_count = 0
+    sims = {'two': [], 'naive': []}  # cosine ke embedding baseline
+    gallery_sims = {'full': [], 'two': [], 'naive': []}  # similarity best match gallery
+    agreement = {'two': [], 'naive': []}
+    frame_idx = 0
+    while len(full_ms) < args.max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_idx += 1
+        if frame_idx % interval != 0:
+            continue
+
+        start = time.perf_counter()
+        faces_full = detector.detect_faces(frame)
+        full_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        small, factors = detector.downscale(frame, args.scale)
+        faces_small = detector.detect_faces(small, input_size=detector.fit_input_size(small))
+        faces_two = detector.rescale_faces(faces_small, factors)
+        scaled_ms.append((time.perf_counter() - start) * 1000)
+
+        full_count += len(faces_full)
+        pairs = _pair_faces(faces_full, faces_two, args.iou)
+        paired_count += len(pairs)
+        if not pairs:
+            continue
+
+        emb_full = np.array(extractor.extract_faces(frame, [faces_full[i] for i, _ in pairs]))
+        emb_two = np.array(extractor.extract_faces(frame, [faces_two[j] for _, j in pairs]))
+        emb_naive = np.array(extractor.extract_faces(small, [faces_small[j] for _, j in pairs]))
+        sims['two'].extend(np.sum(emb_full * emb_two, axis=1))
+        sims['naive'].extend(np.sum(emb_full * emb_naive, axis=1))
+
+        if gallery is not None and len(gallery):
+            threshold = settings.RECOGNITION_SIMILARITY
+            ids_full, best_full = gallery.best_batch(emb_full)
+            decision_full = np.where(best_full >= threshold, ids_full, -1)
+            gallery_sims['full'].extend(best_full)
+            for name, emb in (('two', emb_two), ('naive', emb_naive)):
+                ids, best = gallery.best_batch(emb)
+                agreement[name].extend(np.where(best >= threshold, ids, -1) == decision_full)
+                gallery_sims[name].extend(best)
+    cap.release()
+
+    if not full_ms:
+        raise SystemExit("Tidak ada frame yang terbaca")
+
+    full_avg, scaled_avg = float(np.mean(full_ms)), float(np.mean(scaled_ms))
+    print(f"\nFrame sampel      : {len(full_ms)} ({frame.shape[1]}x{frame.shape[0]}, skala {args.scale})")
+    print(f"Deteksi penuh     : {full_avg:.2f} ms/frame (det_size {detector.det_size})")
+    print(f"Deteksi diperkecil: {scaled_avg:.2f} ms/frame termasuk resize "
+          f"(hemat {(1 - scaled_avg / full_avg) * 100:.1f}%)")
+    print(f"Wajah terdeteksi  : {paired_count}/{full_count} wajah resolusi penuh ikut terdeteksi")
+    if paired_count:
+        print(f"Cosine ke baseline: two {np.mean(sims['two']):.4f} (min {np.min(sims['two']):.4f}), "
+              f"naive {np.mean(sims['naive']):.4f} (min {np.min(sims['naive']):.4f})")
+    if gallery_sims['full']:
+        print(f"Similarity gallery: full {np.mean(gallery_sims['full']):.4f}, "
+              f"two {np.mean(gallery_sims['two']):.4f}, naive {np.mean(gallery_sims['naive']):.4f}")
+        print(f"Keputusan sama    : two {np.mean(agreement['two']) * 100:.2f}%, "
+              f"naive {np.mean(agreement['naive']) * 100:.2f}%")
+
+
+def run_motion(args, settings):
+    """Fraksi frame sampel yang dilewati motion gate dan biaya gate vs deteksi"""
+    import cv2
+    from recognition.motion_gate import MotionGate
+
+    gate = MotionGate(
+        method=args.method,
+        width=settings.MOTION_GATE_WIDTH,
+        pixel_threshold=settings.MOTION_PIXEL_THRESHOLD,
+        sensitivity=args.sensitivity,
+        hold_frames=settings.MOTION_HOLD_FRAMES,
+        mask_polygons=settings.MOTION_MASK
+    )
+    detector = None
+    if args.detect:
+        from core.detector import FaceDetector
+        settings.apply_thread_budget()
+        detector = FaceDetector.from_profile('crowd', settings)
+        detector.warmup(settings.WARMUP_RUNS)
+
+    cap = cv2.VideoCapture(args.video)
+    if not cap.isOpened():
+        raise SystemExit(f"Video tidak bisa dibuka: {args.video}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    interval = max(1, int(round(fps / args.sample_fps)))
+
+    gate_ms = 0.0
+    detect_ms = []
+    missed = 0  # Frame yang dilewati gate padahal ada wajah (butuh --detect)
+    frame_idx = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_idx += 1
+        if frame_idx % interval != 0:
+            continue
+
+        start = time.perf_counter()
+        process = gate.should_process(frame)
+        gate_ms += (time.perf_counter() - start) * 1000
+
+        if detector is not None:
+            start = time.perf_counter()
+            faces = detector.detect_faces(frame)
+            detect_ms.append((time.perf_counter() - start) * 1000)
+            if not process and faces:
+                missed += 1
+    cap.release()
+
+    stats = gate.stats()
+    checked = max(1, stats['checked_frames'])
+    print(f"\nFrame sampel  : {stats['checked_frames']} (method {args.method}, sensitivity {args.sensitivity})")
+    print(f"Dilewati gate : {stats['gated_frames']} ({stats['gated_ratio'] * 100:.1f}%)")
+    print(f"Biaya gate    : {gate_ms / checked:.3f} ms/frame")
+    if detect_ms:
+        detect_avg = float(np.mean(detect_ms))
+        processed = stats['checked_frames'] - stats['gated_frames']
+        with_gate = gate_ms + detect_avg * processed
+        print(f"Deteksi       : {detect_avg:.2f} ms/frame")
+        print(f"CPU stage 1   : {(1 - with_gate / (detect_avg * checked)) * 100:.1f}% lebih hemat dengan gate")
+        print(f"Frame terlewat berisi wajah: {missed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Face Access System")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    ann = sub.add_parser("ann", help="Recall vs latency ANN (IVF/PQ) terhadap exact search")
+    ann.add_argument("--synthetic", type=int, default=0, help="Pakai gallery acak N baris, bukan DB")
+    ann.add_argument("--nlist", type=int, default=Settings.ANN_NLIST)
+    ann.add_argument("--pq-m", type=int, default=Settings.ANN_PQ_M)
+    ann.add_argument("--queries", type=int, default=500)
+    ann.add_argument("--noise", type=float, default=0.05)
+    ann.add_argument("--k", type=int, default=1)
+
+    quant = sub.add_parser("quant", help="Memori & keputusan gallery float16/int8 vs float32")
+    quant.add_argument("--synthetic", type=int, default=0, help="Pakai gallery acak N baris, bukan DB")
+    quant.add_argument("--precision", choices=QuantizedGallery.PRECISIONS, default="int8")
+    quant.add_argument("--rerank-k", type=int, default=Settings.GALLERY_RERANK_K)
+    quant.add_argument("--queries", type=int, default=1000)
+    quant.add_argument("--noise", type=float, default=0.05)
+
+    scale = sub.add_parser("scale", help="Deteksi frame diperkecil + ArcFace resolusi asli vs resolusi penuh")
+    scale.add_argument("--video", required=True, help="Rekaman CCTV untuk diukur")
+    scale.add_argument("--scale", type=float, default=0.5)
+    scale.add_argument("--sample-fps", type=float, default=5)
+    scale.add_argument("--max-frames", type=int, default=200)
+    scale.add_argument("--iou", type=float, default=0.5, help="IoU minimal untuk memasangkan deteksi")
+    scale.add_argument("--no-gallery", action="store_true", help="Lewati perbandingan terhadap gallery DB")
+
+    motion = sub.add_parser("motion", help="Fraksi frame yang dilewati motion gate pada rekaman")
+    motion.add_argument("--video", required=True)
+    motion.add_argument("--method", choices=("diff", "mog2"), default=Settings.MOTION_GATE_METHOD)
+    motion.add_argument("--sensitivity", type=float, default=Settings.MOTION_SENSITIVITY)
+    motion.add_argument("--sample-fps", type=float, default=5)
+    motion.add_argument("--detect", action="store_true",
+                        help="Jalankan deteksi di semua frame untuk mengukur penghematan & frame terlewat")
+
+    args = parser.parse_args()
+    settings = Settings()
+
+    if args.command == "ann":
+        run_ann(args, settings)
+    elif args.command == "quant":
+        run_quant(args, settings)
+    elif args.command == "scale":
+        run_scale(args, settings)
+    elif args.command == "motion":
+        run_motion(args, settings)
+
+
+if __name__ == "__main__":
+    main()
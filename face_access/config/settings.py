@@ -1,3 +1,6 @@
+import os
+
+
 class Settings:
     """Configuration untuk seluruh sistem"""
     
@@ -23,6 +26,99 @@ class Settings:
     ENROLLMENT_SIMILARITY = 0.6
     RECOGNITION_SIMILARITY = 0.5
     
+    EMBEDDING_CACHE_INTERVAL = 5.0  # Interval cek perubahan gallery embedding di DB (detik)
+    EMBEDDING_STORAGE = 'file'  # 'file' (.pkl per pegawai), 'gallery' (satu file memmap), 'blob' (float32 di DB)
+    GALLERY_PRECISION = 'float32'  # 'float32', 'float16' atau 'int8' (pass pertama terkompresi)
+    GALLERY_RERANK_K = 8  # Kandidat yang diskor ulang full precision (GALLERY_PRECISION != float32)
+    
+    # Approximate nearest neighbour (IVF/PQ) untuk gallery sangat besar
+    ANN_ENABLED = False
+    ANN_MIN_GALLERY = 20000  # Di bawah ukuran ini tetap brute-force exact
+    ANN_NLIST = 1024  # Jumlah centroid kasar (inverted list)
+    ANN_NPROBE = 16  # Jumlah list yang diperiksa per query
+    ANN_PQ_M = 0  # 0 = IVF-Flat; >0 = jumlah sub-vektor product quantization
+    ANN_CANDIDATES = 10  # Kandidat ANN yang di-rerank exact
+    ANN_INDEX_PATH = 'embeddings/ann_index.npz'  # Relatif terhadap folder face_access
+    ANN_DELTA_COMPACT = 1024  # Insert di file delta (<ANN_INDEX_PATH>.delta) sebelum .npz ditulis ulang
+    
+    # Profil inferensi InsightFace per workload; semua profil berbagi bobot model yang sama
+    INFERENCE_MODEL = 'buffalo_l'
+    INFERENCE_PROFILES = {
+        'door': {'det_size': (640, 640), 'modules': ['detection', 'recognition']},
+        'enrollment': {'det_size': (640, 640), 'modules': ['detection', 'recognition']},
+        'crowd': {'det_size': (1024, 1024), 'modules': ['detection', 'recognition']},
+    }
+    
+    EMBEDDING_BATCH_SIZE = 32  # Jumlah crop wajah per run ArcFace (crowd & enrollment upload)
+    
+    # Runtime ONNX Runtime / OpenCV (berbagi core dengan Streamlit & pipeline lain)
+    ORT_INTRA_OP_THREADS = 4  # 0 = default ORT (semua core fisik)
+    ORT_INTER_OP_THREADS = 1
+    ORT_GRAPH_OPTIMIZATION = 'all'  # 'disable', 'basic', 'extended', 'all'
+    ORT_EXECUTION_MODE = 'sequential'  # 'sequential' atau 'parallel'
+    CV2_NUM_THREADS = 2  # 0 = OpenCV single-thread
+    WARMUP_RUNS = 2  # Inferensi dummy per profil saat startup
+    
+    # Crowd detection: 'full' (satu pass det_size), 'tiled' (tile resolusi asli),
+    # 'adaptive' (full pass lalu tile hanya di area wajah kecil)
+    CROWD_DETECTION_MODE = 'full'
+    CROWD_TILE_SIZE = 640  # Ukuran tile (px, pada frame deteksi)
+    CROWD_TILE_OVERLAP = 0.25  # Proporsi overlap antar tile
+    CROWD_TILE_WORKERS = 2  # Thread paralel untuk inferensi tile
+    CROWD_TILE_NMS_IOU = 0.4  # IoU NMS lintas tile
+    CROWD_SMALL_FACE_PX = 48  # Mode adaptive: wajah lebih sempit dari ini memicu tiling
+    # < 1.0: deteksi pada salinan frame diperkecil; align & ArcFace tetap dari piksel resolusi asli
+    CROWD_DETECTION_SCALE = 1.0
+    
+    # Tracking wajah antar frame sampel (video crowd): ArcFace hanya untuk crop yang masuk
+    # top-k kualitas track; satu keputusan identitas per track saat track berakhir
+    CROWD_TRACKING = True
+    TRACK_IOU_THRESHOLD = 0.3
+    TRACK_MAX_AGE = 5  # Frame sampel tanpa deteksi sebelum track dianggap selesai
+    TRACK_TOP_K = 5  # Jumlah crop kualitas terbaik per track untuk template
+    
+    # Motion gate: frame sampel tanpa gerakan tidak dideteksi (hemat CPU pada feed diam)
+    MOTION_GATE_ENABLED = False
+    MOTION_GATE_METHOD = 'diff'  # 'diff' (frame differencing) atau 'mog2' (background subtraction)
+    MOTION_GATE_WIDTH = 160  # Lebar frame analisis gerakan (px)
+    MOTION_PIXEL_THRESHOLD = 25  # Selisih intensitas minimal per piksel ('diff')
+    MOTION_SENSITIVITY = 0.005  # Fraksi piksel berubah minimal untuk menjalankan deteksi
+    MOTION_HOLD_FRAMES = 3  # Frame sampel tetap diproses setelah gerakan terakhir
+    MOTION_MASK = None  # List poligon [(x, y), ...] ternormalisasi 0..1; None = seluruh frame
+    
+    # Deadline per frame sampel sumber live (webcam/stream): saat rata-rata waktu proses
+    # melewati budget, resolusi deteksi turun -> stage opsional dilewati & identitas track
+    # dipakai ulang -> process_interval naik; pulih otomatis saat beban turun
+    CROWD_DEADLINE_ENABLED = True
+    CROWD_FRAME_BUDGET_MS = None  # None = interval sampel (1000 / sample_fps)
+    CROWD_DEGRADE_SCALE_STEP = 0.75  # Pengali skala deteksi saat resolusi diturunkan
+    CROWD_DEGRADE_MAX_INTERVAL = 4  # Maksimal 1 dari N frame sampel diproses
+    
+    # Sampling adaptif (video crowd): laju sampel langsung ke maksimum saat ada track baru,
+    # naik saat ada wajah, turun setelah beberapa frame sampel berturut-turut tanpa wajah.
+    # sample_fps pemanggil menjadi laju awal
+    CROWD_ADAPTIVE_SAMPLING = False
+    CROWD_SAMPLE_FPS_MIN = 1.0
+    CROWD_SAMPLE_FPS_MAX = 10.0
+    CROWD_SAMPLING_IDLE_FRAMES = 3  # Frame sampel tanpa wajah sebelum laju turun
+    
+    # Detection log video crowd ditulis append-only ke JSONL di folder ini (video berjam-jam:
+    # memori tetap); report & statistik per orang dibaca streaming dari file. None = di memori
+    CROWD_LOG_SPILL_DIR = None  # mis. 'logs/crowd' (relatif terhadap folder face_access)
+    CROWD_LOG_SORT_RUN = 50000  # Entry per run terurut saat log segmen di disk digabung
+    
+    # ROI crowd per kamera (poligon include/exclude), satu file JSON per ID kamera
+    ROI_DIR = 'config/roi'  # Relatif terhadap folder face_access
+    
+    CAPTURE_QUEUE_SIZE = 8  # Antrian decode untuk sumber file (sumber live: slot frame terbaru)
+    CAPTURE_SEEK_MIN_INTERVAL_MS = 2000  # Interval sampel >= ini: seek ke titik sampel, bukan grab
+    CROWD_SEGMENT_WORKERS = 1  # > 1: file video dibagi segmen waktu, diproses paralel per proses
+    
+    # Crowd multi-kamera (CrowdService): satu set model dibagi worker thread, giliran
+    # kamera round-robin berbobot priority. Dict: camera_id, source, sample_fps, priority, is_outdoor
+    CROWD_CAMERAS = []
+    CROWD_SERVICE_WORKERS = 2  # Set ORT_INTRA_OP_THREADS ~ jumlah core / worker
+    
     REAL_TIME_CONSTRAINT = 5.0  # Timeout recognition (detik) — dikali 3 menjadi 15 detik total
     
     COOLDOWN = 5
@@ -35,6 +131,42 @@ class Settings:
     CAMERA_INDEX = 0  # Manual camera index (dipakai jika CAMERA_AUTO_DETECT=False)
     PREFER_USB_CAMERA = True  # Jika True & CAMERA_AUTO_DETECT=True, prioritas USB camera
     
+    @classmethod
+    def build_session_options(cls):
+        """SessionOptions ONNX Runtime yang dipakai semua model InsightFace"""
+        import onnxruntime as ort
+        
+        levels = {
+            'disable': ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+            'basic': ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+            'extended': ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+            'all': ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        }
+        modes = {
+            'sequential': ort.ExecutionMode.ORT_SEQUENTIAL,
+            'parallel': ort.ExecutionMode.ORT_PARALLEL
+        }
+        
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = cls.ORT_INTRA_OP_THREADS
+        options.inter_op_num_threads = cls.ORT_INTER_OP_THREADS
+        options.graph_optimization_level = levels[cls.ORT_GRAPH_OPTIMIZATION]
+        options.execution_mode = modes[cls.ORT_EXECUTION_MODE]
+        return options
+    
+    @classmethod
+    def apply_thread_budget(cls):
+        """Batasi thread OpenCV agar tidak berebut core dengan ONNX Runtime"""
+        import cv2
+        cv2.setNumThreads(cls.CV2_NUM_THREADS)
+    
+    @classmethod
+    def resolve_path(cls, path):
+        """Path relatif di settings -> absolut terhadap folder face_access"""
+        if os.path.isabs(path):
+            return path
+        return os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), path)
+    
     @classmethod
     def get_camera_index(cls):
         """
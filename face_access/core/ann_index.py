@@ -0,0 +1,420 @@
+import hashlib
+import json
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+from utils.logger import Logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _kmeans(data, n_clusters, iters=20, seed=0, spherical=True):
+    """K-means sederhana (NumPy); spherical=True untuk embedding ternormalisasi (inner product)"""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, data.shape[0])
+    centroids = data[rng.choice(data.shape[0], n_clusters, replace=False)].copy()
+
+    for _ in range(iters):
+        assign = _assign(data, centroids, spherical)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        counts = np.bincount(assign, minlength=n_clusters)
+
+        empty = counts == 0
+        if empty.any():
+            # Cluster kosong diisi ulang dengan titik acak
+            sums[empty] = data[rng.choice(data.shape[0], int(empty.sum()))]
+            counts[empty] = 1
+        centroids = sums / counts[:, None]
+        if spherical:
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+
+    return centroids.astype(np.float32)
+
+
+def _assign(data, centroids, spherical=True, chunk=65536):
+    """Index centroid terdekat untuk setiap baris data (diproses per chunk)"""
+    out = np.empty(data.shape[0], dtype=np.int64)
+    for start in range(0, data.shape[0], chunk):
+        block = data[start:start + chunk]
+        if spherical:
+            out[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        else:
+            dist = (block ** 2).sum(1)[:, None] - 2 * block @ centroids.T + (centroids ** 2).sum(1)[None, :]
+            out[start:start + chunk] = np.argmin(dist, axis=1)
+    return out
+
+
+@contextmanager
+def _file_lock(path):
+    """Lock eksklusif antar proses pada <path>.lock selama baca/tulis file index"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path + '.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class IVFIndex:
+    """
+    Approximate nearest neighbour (inner product) berbasis IVF:
+    centroid k-means kasar + (opsional) product quantization pada residual
+
+    pq_m = 0 menyimpan vektor penuh di setiap inverted list (IVF-Flat).
+    pq_m > 0 menyimpan kode uint8 per sub-vektor (IVF-PQ), memori ~pq_m byte/vektor.
+
+    Insert incremental disimpan append-only ke file delta (<path>.delta, lihat add_persistent);
+    file .npz baru ditulis ulang (compaction) setiap compact_every insert. Akses file
+    antar proses diserialkan lewat <path>.lock; refresh menyusul insert proses lain.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, dim=512, nlist=1024, nprobe=16, pq_m=0, pq_ksub=256):
+        if pq_m and dim % pq_m != 0:
+            raise ValueError("dim harus habis dibagi pq_m")
+
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_ksub = pq_ksub
+
+        self.centroids = None
+        self.codebooks = None  # (pq_m, pq_ksub, dim // pq_m)
+        self.list_ids = []
+        self.list_data = []  # float32 (n, dim) atau uint8 (n, pq_m)
+        self.delta_count = 0  # Record di file delta yang belum masuk .npz
+        self._file_key = None  # Identitas .npz yang terakhir dibaca/ditulis (lihat refresh)
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    @property
+    def ntotal(self):
+        return int(sum(len(ids) for ids in self.list_ids))
+
+    def train(self, matrix, iters=20, max_train=100000, seed=0):
+        """Latih centroid kasar (dan codebook PQ) dari sampel gallery"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        rng = np.random.default_rng(seed)
+        if matrix.shape[0] > max_train:
+            matrix = matrix[rng.choice(matrix.shape[0], max_train, replace=False)]
+
+        self.nlist = min(self.nlist, matrix.shape[0])
+        self.centroids = _kmeans(matrix, self.nlist, iters=iters, seed=seed)
+
+        if self.pq_m:
+            residuals = matrix - self.centroids[_assign(matrix, self.centroids)]
+            dsub = self.dim // self.pq_m
+            self.codebooks = np.stack([
+                _kmeans(residuals[:, j * dsub:(j + 1) * dsub], self.pq_ksub,
+                        iters=iters, seed=seed + j, spherical=False)
+                for j in range(self.pq_m)
+            ])
+
+        self.list_ids = [np.empty(0, dtype=np.int64) for _ in range(self.nlist)]
+        self.list_data = [self._empty_data() for _ in range(self.nlist)]
+
+    def add(self, ids, matrix):
+        """Tambah vektor ke index (bisa incremental setelah train)"""
+        if not self.is_trained:
+            raise RuntimeError("Index belum di-train")
+
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dim)
+        assign = _assign(matrix, self.centroids)
+        data = self._encode(matrix, assign) if self.pq_m else matrix
+        self._add_encoded(assign, ids, data)
+        return assign, ids, data
+
+    def add_persistent(self, path, ids, matrix, compact_every=1024):
+        """
+        Tambah vektor lalu simpan: append O(1) ke file delta, bukan menulis ulang .npz
+
+        Setiap compact_every record delta, index ditulis ulang penuh (save) dan delta dihapus.
+        Di bawah lock file, index lebih dulu menyusul file di disk (refresh) sehingga
+        compaction tidak membuang insert proses lain.
+        """
+        with _file_lock(path):
+            self._refresh(path)
+            assign, ids, data = self.add(ids, matrix)
+            if not os.path.exists(path) or self.delta_count + len(ids) >= compact_every:
+                self._save(path)
+                return
+
+            records = np.empty(len(ids), dtype=self._delta_dtype())
+            records['list'] = assign
+            records['id'] = ids
+            records['data'] = data
+            with open(self._delta_path(path), 'ab') as f:
+                f.write(records.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            self.delta_count += len(ids)
+
+    def refresh(self, path):
+        """Susul perubahan proses lain: reload jika .npz diganti, replay record delta baru"""
+        with _file_lock(path):
+            self._refresh(path)
+
+    def _refresh(self, path):
+        if not os.path.exists(path):
+            return
+        if self._stat_key(path) != self._file_key:
+            nprobe = self.nprobe
+            self.__dict__.update(self._read(path).__dict__)
+            self.nprobe = nprobe
+            return
+        self._replay_delta(path)
+
+    def signature(self):
+        """Signature isi index, bandingkan dengan gallery_signature(gallery.ids)"""
+        ids = np.concatenate(self.list_ids) if self.list_ids else np.empty(0, dtype=np.int64)
+        return gallery_signature(ids)
+
+    def _add_encoded(self, assign, ids, data):
+        for list_no in np.unique(assign):
+            mask = assign == list_no
+            self.list_ids[list_no] = np.concatenate([self.list_ids[list_no], ids[mask]])
+            self.list_data[list_no] = np.concatenate([self.list_data[list_no], data[mask]])
+
+    def search(self, probe, k=10, nprobe=None):
+        """Return list (id, approx_similarity) k terbaik untuk satu probe"""
+        probe = np.asarray(probe, dtype=np.float32).reshape(-1)
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+
+        coarse = self.centroids @ probe
+        lists = np.argpartition(-coarse, nprobe - 1)[:nprobe]
+
+        lut = None
+        if self.pq_m:
+            dsub = self.dim // self.pq_m
+            # lut[j, c] = <probe_j, codebook_j[c]>
+            lut = np.einsum('jd,jcd->jc', probe.reshape(self.pq_m, dsub), self.codebooks)
+
+        all_ids = []
+        all_scores = []
+        for list_no in lists:
+            ids = self.list_ids[list_no]
+            if len(ids) == 0:
+                continue
+            data = self.list_data[list_no]
+            if self.pq_m:
+                scores = coarse[list_no] + lut[np.arange(self.pq_m), data].sum(axis=1)
+            else:
+                scores = data @ probe
+            all_ids.append(ids)
+            all_scores.append(scores)
+
+        if not all_ids:
+            return []
+
+        ids = np.concatenate(all_ids)
+        scores = np.concatenate(all_scores)
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+    def save(self, path):
+        """Simpan index ke .npz (atomik via file sementara)"""
+        with _file_lock(path):
+            self._save(path)
+
+    def _save(self, path):
+        sizes = np.array([len(ids) for ids in self.list_ids], dtype=np.int64)
+        meta = {
+            'version': self.FORMAT_VERSION,
+            'dim': self.dim, 'nlist': self.nlist, 'nprobe': self.nprobe,
+            'pq_m': self.pq_m, 'pq_ksub': self.pq_ksub
+        }
+        arrays = {
+            'meta': np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8),
+            'centroids': self.centroids,
+            'sizes': sizes,
+            'ids': np.concatenate(self.list_ids) if self.list_ids else np.empty(0, dtype=np.int64),
+            'data': np.concatenate(self.list_data) if self.list_data else self._empty_data()
+        }
+        if self.codebooks is not None:
+            arrays['codebooks'] = self.codebooks
+
+        tmp_path = path + '.tmp.npz'
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+        # Isi delta sudah ada di .npz baru
+        if os.path.exists(self._delta_path(path)):
+            os.remove(self._delta_path(path))
+        self.delta_count = 0
+        self._file_key = self._stat_key(path)
+
+    @classmethod
+    def load(cls, path):
+        with _file_lock(path):
+            return cls._read(path)
+
+    @classmethod
+    def _read(cls, path):
+        with np.load(path) as f:
+            meta = json.loads(f['meta'].tobytes().decode('utf-8'))
+            if meta.get('version') != cls.FORMAT_VERSION:
+                raise ValueError(f"Versi ANN index tidak didukung: {meta.get('version')}")
+
+            index = cls(dim=meta['dim'], nlist=meta['nlist'], nprobe=meta['nprobe'],
+                        pq_m=meta['pq_m'], pq_ksub=meta['pq_ksub'])
+            index.centroids = f['centroids']
+            index.codebooks = f['codebooks'] if 'codebooks' in f else None
+
+            offsets = np.concatenate([[0], np.cumsum(f['sizes'])])
+            ids = f['ids']
+            data = f['data']
+            index.list_ids = [ids[offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+            index.list_data = [data[offsets[i]:offsets[i + 1]] for i in range(index.nlist)]
+
+        index._file_key = cls._stat_key(path)
+        index._replay_delta(path)
+        return index
+
+    def _replay_delta(self, path):
+        """Tambahkan record delta setelah delta_count (record yang sudah dikenal dilewati)"""
+        delta_path = self._delta_path(path)
+        if not os.path.exists(delta_path):
+            return
+        dtype = self._delta_dtype()
+        # Record terakhir yang setengah tertulis (crash saat append) diabaikan
+        count = os.path.getsize(delta_path) // dtype.itemsize - self.delta_count
+        if count <= 0:
+            return
+        records = np.fromfile(delta_path, dtype=dtype, count=count, offset=self.delta_count * dtype.itemsize)
+        self._add_encoded(records['list'], records['id'], records['data'])
+        self.delta_count += count
+
+    @classmethod
+    def build(cls, gallery, nlist=1024, nprobe=16, pq_m=0):
+        """Build index dari EmbeddingGallery"""
+        index = cls(dim=gallery.dim, nlist=nlist, nprobe=nprobe, pq_m=pq_m)
+        index.train(gallery.matrix)
+        index.add(gallery.ids, gallery.matrix)
+        return index
+
+    @classmethod
+    def load_or_build(cls, gallery, path, nlist=1024, nprobe=16, pq_m=0, index=None):
+        """
+        Load index dari disk; build ulang jika belum ada atau tidak sinkron dengan gallery
+
+        index: index yang sudah dimuat (optional) - cukup disusulkan ke file (refresh)
+        """
+        with _file_lock(path):
+            if index is not None or os.path.exists(path):
+                try:
+                    if index is not None:
+                        index._refresh(path)
+                    else:
+                        index = cls._read(path)
+                    index.nprobe = nprobe
+                except Exception as e:
+                    Logger.warning(f"ANN index tidak bisa dibaca ({e}), build ulang")
+                    index = None
+
+            # Signature (jumlah, max id, hash id) seperti cache gallery: delete + insert atau
+            # enroll ulang dengan jumlah baris sama tetap terdeteksi
+            if index is not None and index.signature() != gallery_signature(gallery.ids):
+                Logger.warning(
+                    f"ANN index ({index.ntotal} vektor) tidak sinkron dengan gallery ({len(gallery)}); build ulang"
+                )
+                index = None
+
+            if index is None:
+                start = time.time()
+                index = cls.build(gallery, nlist=nlist, nprobe=nprobe, pq_m=pq_m)
+                index._save(path)
+                Logger.info(f"ANN index dibangun: {index.ntotal} vektor, {time.time() - start:.1f}s")
+
+        return index
+
+    @staticmethod
+    def _delta_path(path):
+        return path + '.delta'
+
+    @staticmethod
+    def _stat_key(path):
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _delta_dtype(self):
+        if self.pq_m:
+            data = ('data', np.uint8, (self.pq_m,))
+        else:
+            data = ('data', '<f4', (self.dim,))
+        return np.dtype([('list', '<i8'), ('id', '<i8'), data])
+
+    def _encode(self, matrix, assign):
+        residuals = matrix - self.centroids[assign]
+        dsub = self.dim // self.pq_m
+        codes = np.empty((matrix.shape[0], self.pq_m), dtype=np.uint8)
+        for j in range(self.pq_m):
+            codes[:, j] = _assign(residuals[:, j * dsub:(j + 1) * dsub], self.codebooks[j], spherical=False)
+        return codes
+
+    def _empty_data(self):
+        if self.pq_m:
+            return np.empty((0, self.pq_m), dtype=np.uint8)
+        return np.empty((0, self.dim), dtype=np.float32)
+
+
+def gallery_signature(ids):
+    """(jumlah, max id, hash id terurut) dari id gallery"""
+    ids = np.sort(np.asarray(ids, dtype=np.int64).reshape(-1))
+    max_id = int(ids[-1]) if len(ids) else 0
+    return len(ids), max_id, hashlib.sha1(ids.tobytes()).hexdigest()
+
+
+def recall_report(index, gallery, queries, k=1, nprobes=(1, 2, 4, 8, 16, 32, 64)):
+    """
+    Bandingkan ANN vs exact search
+
+    Returns:
+        list dict: nprobe, recall@k (id), rata-rata latency ANN & exact (ms/query)
+    """
+    queries = np.asarray(queries, dtype=np.float32)
+
+    start = time.perf_counter()
+    exact = [set(i for i, _ in gallery.top_k(q, k)) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    report = []
+    for nprobe in nprobes:
+        if nprobe > index.nlist:
+            break
+        start = time.perf_counter()
+        approx = [index.search(q, k=k, nprobe=nprobe) for q in queries]
+        ann_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+        hits = sum(len(truth & set(i for i, _ in found)) for truth, found in zip(exact, approx))
+        total = sum(len(truth) for truth in exact)
+        report.append({
+            'nprobe': nprobe,
+            'recall': hits / max(1, total),
+            'ann_ms': ann_ms,
+            'exact_ms': exact_ms
+        })
+    return report
@@ -1,37 +1,46 @@
 import cv2
+from core.capture import CaptureReader
 
 class Camera:
-    """Camera handler"""
+    """Camera handler (decode di thread latar, read() selalu frame terbaru)"""
     
-    def __init__(self, camera_index=0, width=640, height=480):
+    def __init__(self, camera_index=0, width=640, height=480, read_timeout=2.0):
         self.camera_index = camera_index
         self.width = width
         self.height = height
-        self.cap = None
+        self.read_timeout = read_timeout
+        self.reader = None
     
     def open(self):
         """Open camera"""
-        self.cap = cv2.VideoCapture(self.camera_index)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-        return self.cap.isOpened()
+        self.reader = CaptureReader(self.camera_index, live=True, setup=self._configure)
+        return self.reader.open()
+    
+    def _configure(self, cap):
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
     
     def read(self):
         """Read frame from camera"""
-        if self.cap is None:
+        if self.reader is None:
             return False, None
-        ret, frame = self.cap.read()
+        ret, frame = self.reader.read(timeout=self.read_timeout)
         if ret:
             frame = cv2.resize(frame, (self.width, self.height))
         return ret, frame
     
     def release(self):
         """Release camera"""
-        if self.cap is not None:
-            self.cap.release()
+        if self.reader is not None:
+            self.reader.release()
+            self.reader = None
             cv2.destroyAllWindows()
     
     def is_opened(self):
         """Check if camera is opened"""
-        return self.cap is not None and self.cap.isOpened()
+        return self.reader is not None and self.reader.is_opened()
+    
+    def stats(self):
+        """Counter frame dropped/delayed dari capture thread"""
+        return self.reader.stats() if self.reader is not None else None
@@ -0,0 +1,292 @@
+import queue
+import threading
+import time
+import cv2
+
+
+class CaptureReader:
+    """
+    Decode frame di thread latar belakang agar tidak menambah waktu inferensi
+
+    Sumber file: antrian terbatas (tidak ada frame hilang; decoder menunggu saat penuh).
+    Sumber live (webcam/stream): slot frame terbaru, frame lama ditimpa sehingga
+    loop inferensi selalu mendapat frame segar dan buffer driver tidak menumpuk.
+    
+    Dengan sample_interval_ms, frame sampel ditentukan dari timestamp (CAP_PROP_POS_MSEC,
+    bukan metadata FPS). Ingest sumber file:
+      'all'  - decode semua frame (mis. writer butuh setiap frame), sampel ditandai is_sample
+      'grab' - grab() untuk frame yang dilewati, retrieve() hanya untuk frame sampel
+      'seek' - interval panjang: lompat langsung ke titik sampel lewat CAP_PROP_POS_MSEC
+    """
+
+    INGEST_MODES = ('all', 'grab', 'seek')
+
+    def __init__(self, source, live=None, queue_size=8, setup=None, sample_interval_ms=None,
+                 decode_all=False, seek_min_interval_ms=None, start_ms=None, end_ms=None):
+        """
+        Args:
+            source: path video, URL stream, atau index webcam
+            live: True untuk slot frame terbaru; None = otomatis (index webcam / URL stream)
+            queue_size: ukuran antrian untuk sumber file
+            setup: callback(cap) sebelum thread mulai (mis. set resolusi/buffer)
+            sample_interval_ms: jarak antar frame sampel (ms); None = semua frame sampel
+            decode_all: tetap decode & kirim semua frame sumber file (ingest 'all')
+            seek_min_interval_ms: interval sampel minimal untuk ingest 'seek' (None = tidak seek)
+            start_ms, end_ms: batas segmen [start, end) sumber file (None = awal/akhir video)
+        """
+        self.source = source
+        self.live = self._is_live(source) if live is None else live
+        self.queue_size = queue_size
+        self.setup = setup
+        self.sample_interval_ms = sample_interval_ms
+        self.ingest = self._ingest_mode(sample_interval_ms, decode_all, seek_min_interval_ms)
+        self.start_ms = start_ms or 0.0
+        self.end_ms = end_ms
+
+        # Info frame terakhir yang diterima read()
+        self.frame_index = 0
+        self.position_ms = 0.0
+        self.is_sample = False
+        self.source_frames = 0  # Posisi decoder di sumber (jumlah frame yang dilalui)
+
+        self.cap = None
+        self.fps = 0.0
+        self.width = 0
+        self.height = 0
+        self.frame_count = 0
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._queue = queue.Queue(maxsize=max(1, queue_size))
+        self._cond = threading.Condition()
+        self._latest = None
+        self._seq = 0
+        self._last_seq = 0
+        self._ended = False
+        self._next_live_sample = None
+        self._start_time = None
+
+        self.frames_decoded = 0
+        self.frames_skipped = 0  # Di-grab tanpa retrieve (tanpa konversi BGR & salin frame)
+        self.frames_delivered = 0
+        self.dropped_frames = 0  # Live: frame ditimpa sebelum sempat dibaca
+        self.delayed_reads = 0  # read() harus menunggu decoder (belum ada frame siap)
+
+    def open(self):
+        """Buka sumber dan mulai thread decode"""
+        self.cap = cv2.VideoCapture(self.source)
+        if self.setup is not None:
+            self.setup(self.cap)
+        if not self.cap.isOpened():
+            return False
+
+        # Properti dibaca sebelum thread jalan; VideoCapture tidak thread-safe
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = max(0, int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT)))  # Metadata, 0 untuk live
+        if self.start_ms > 0 and not self.live:
+            self.cap.set(cv2.CAP_PROP_POS_MSEC, self.start_ms)
+
+        self._start_time = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="CaptureReader", daemon=True)
+        self._thread.start()
+        return True
+
+    def is_opened(self):
+        return self._thread is not None and not (self._ended and self._nothing_pending())
+
+    def read(self, timeout=None):
+        """
+        Return (ret, frame) seperti cap.read(); (False, None) saat sumber habis/timeout
+        
+        Setelah read(): frame_index (1-based), position_ms, is_sample milik frame tersebut.
+        """
+        if self._thread is None:
+            return False, None
+        ret, frame, info = self._read_live(timeout) if self.live else self._read_queue(timeout)
+        if not ret:
+            return False, None
+        
+        self.frames_delivered += 1
+        self.frame_index = info['index']
+        self.position_ms = info['position_ms']
+        self.is_sample = info['sample'] if not self.live else self._live_sample(info['position_ms'])
+        return ret, frame
+
+    def set_sample_interval(self, sample_interval_ms):
+        """
+        Ubah jarak antar sampel saat berjalan (sampling adaptif)
+
+        Sumber file: berlaku mulai sampel berikutnya di decoder; frame yang sudah
+        mengantri (<= queue_size) tetap bertanda grid lama. Ingest tidak berubah.
+        """
+        self.sample_interval_ms = sample_interval_ms
+
+    def release(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+    def stats(self):
+        return {
+            'mode': 'live' if self.live else 'file',
+            'ingest': 'live' if self.live else self.ingest,
+            'frames_decoded': self.frames_decoded,
+            'frames_skipped': self.frames_skipped,
+            'frames_delivered': self.frames_delivered,
+            'dropped_frames': self.dropped_frames,
+            'delayed_reads': self.delayed_reads
+        }
+
+    def _run(self):
+        try:
+            if self.live:
+                self._run_live()
+            else:
+                self._run_file()
+        finally:
+            self._ended = True
+            if self.live:
+                with self._cond:
+                    self._cond.notify_all()
+            else:
+                self._put((False, None, None))
+
+    def _run_live(self):
+        while not self._stop.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                break
+            self.frames_decoded += 1
+            self.source_frames = self.frames_decoded
+            position_ms = (time.monotonic() - self._start_time) * 1000
+            self._publish((True, frame, {'index': self.frames_decoded, 'position_ms': position_ms, 'sample': True}))
+
+    def _run_file(self):
+        interval = self.sample_interval_ms
+        next_sample_ms = self.start_ms
+        last_sample_ms = None
+        seek_target = self.start_ms
+        while not self._stop.is_set():
+            if self.sample_interval_ms != interval:
+                # Interval diubah set_sample_interval(): grid baru dihitung dari sampel terakhir
+                interval = self.sample_interval_ms
+                if last_sample_ms is not None and interval is not None:
+                    next_sample_ms = (int((last_sample_ms + 0.5) // interval) + 1) * interval
+            if self.ingest == 'all':
+                ret, frame = self.cap.read()
+                if not ret:
+                    break
+                position_ms = self._position_ms()
+                if position_ms + 0.5 < self.start_ms:
+                    continue  # Seek mendarat di keyframe sebelum awal segmen
+            else:
+                # Seek sekali per titik sampel; jika backend tidak mendukung, grab maju biasa
+                if self.ingest == 'seek' and next_sample_ms > 0 and seek_target != next_sample_ms:
+                    seek_target = next_sample_ms
+                    self.cap.set(cv2.CAP_PROP_POS_MSEC, next_sample_ms)
+                if not self.cap.grab():
+                    break
+                position_ms = self._position_ms()
+                if self.end_ms is not None and position_ms >= self.end_ms:
+                    break
+                if position_ms + 0.5 < next_sample_ms:
+                    self.frames_skipped += 1
+                    continue
+                ret, frame = self.cap.retrieve()
+                if not ret:
+                    break
+            if self.end_ms is not None and position_ms >= self.end_ms:
+                break
+            self.frames_decoded += 1
+            
+            sample = interval is None or position_ms + 0.5 >= next_sample_ms
+            if sample and interval is not None:
+                # Titik sampel berikutnya di grid timestamp setelah frame ini
+                last_sample_ms = position_ms
+                next_sample_ms = (int((position_ms + 0.5) // interval) + 1) * interval
+            info = {'index': self.source_frames, 'position_ms': position_ms, 'sample': sample}
+            if not self._put((True, frame, info)):
+                break
+
+    def _position_ms(self):
+        """Timestamp frame yang baru di-grab; fallback index/FPS jika container tidak memberi"""
+        index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        self.source_frames = max(index, self.source_frames + 1)
+        position_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        if position_ms <= 0 and self.source_frames > 1:
+            position_ms = (self.source_frames - 1) * 1000.0 / (self.fps if self.fps > 0 else 30.0)
+        return position_ms
+
+    def _live_sample(self, position_ms):
+        """Live: sampel berdasarkan waktu capture, tanpa mengejar sampel yang terlewat"""
+        if self.sample_interval_ms is None:
+            return True
+        if self._next_live_sample is None or position_ms >= self._next_live_sample:
+            self._next_live_sample = position_ms + self.sample_interval_ms
+            return True
+        return False
+
+    def _publish(self, item):
+        with self._cond:
+            if self._latest is not None and self._seq != self._last_seq:
+                self.dropped_frames += 1
+            self._latest = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def _put(self, item):
+        """Masukkan ke antrian; blok selama penuh kecuali reader dihentikan"""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read_queue(self, timeout):
+        try:
+            return self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        if self._ended:
+            return False, None, None
+        self.delayed_reads += 1
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return False, None, None
+
+    def _read_live(self, timeout):
+        with self._cond:
+            if self._seq == self._last_seq and not self._ended:
+                self.delayed_reads += 1
+                self._cond.wait_for(lambda: self._seq != self._last_seq or self._ended, timeout)
+            if self._seq == self._last_seq:
+                return False, None, None
+            self._last_seq = self._seq
+            return self._latest
+
+    def _nothing_pending(self):
+        if self.live:
+            return self._seq == self._last_seq
+        return self._queue.empty()
+
+    def _ingest_mode(self, sample_interval_ms, decode_all, seek_min_interval_ms):
+        if self.live or decode_all or sample_interval_ms is None:
+            return 'all'
+        if seek_min_interval_ms is not None and sample_interval_ms >= seek_min_interval_ms:
+            return 'seek'
+        return 'grab'
+
+    @staticmethod
+    def _is_live(source):
+        if isinstance(source, int):
+            return True
+        return str(source).lower().startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
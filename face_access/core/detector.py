@@ -1,20 +1,212 @@
+import glob
+import os
+import time
+import cv2
+import numpy as np
+import onnxruntime
 from insightface.app import FaceAnalysis
+from insightface.app.common import Face
+from insightface.model_zoo import model_zoo
+from insightface.utils import ensure_available, face_align
+
+
+class TunedFaceAnalysis(FaceAnalysis):
+    """
+    FaceAnalysis yang membuat session tiap model sekali, langsung dengan SessionOptions
+
+    FaceAnalysis bawaan tidak meneruskan sess_options ke onnxruntime, sehingga session
+    harus dibuat ulang (dua kali load per model). ModelRouter meneruskan kwargs apa adanya.
+    """
+
+    def __init__(self, name, allowed_modules=None, providers=None, session_options=None,
+                 root='~/.insightface'):
+        onnxruntime.set_default_logger_severity(3)
+        self.models = {}
+        self.model_dir = ensure_available('models', name, root=root)
+        for onnx_file in sorted(glob.glob(os.path.join(self.model_dir, '*.onnx'))):
+            model = model_zoo.ModelRouter(onnx_file).get_model(
+                providers=providers, sess_options=session_options
+            )
+            if model is None or model.taskname in self.models:
+                continue
+            if allowed_modules is not None and model.taskname not in allowed_modules:
+                continue
+            self.models[model.taskname] = model
+        if 'detection' not in self.models:
+            raise RuntimeError(f"Model deteksi tidak ditemukan di {self.model_dir}")
+        self.det_model = self.models['detection']
+
 
 class FaceDetector:
     """Face detection menggunakan RetinaFace (InsightFace)"""
     
-    def __init__(self):
-        self.app = FaceAnalysis(providers=['CPUExecutionProvider'])
-        self.app.prepare(ctx_id=0, det_size=(1024,1024))
+    # FaceAnalysis yang sudah di-load, dibagi antar profil agar bobot model tidak dimuat ulang
+    _shared_apps = {}
+    # (id app, det_size) / (id app, 'recognition') yang sudah di-warmup; session dibagi antar profil
+    _warmed = set()
+    
+    PROVIDERS = ['CPUExecutionProvider']
+    
+    def __init__(self, det_size=(1024,1024), modules=None, model_name='buffalo_l', load_modules=None,
+                 session_options=None):
+        """
+        Args:
+            det_size: ukuran input RetinaFace untuk detector ini
+            modules: model yang dijalankan detect() (None = semua yang di-load)
+            model_name: model pack InsightFace
+            load_modules: model yang di-load ke FaceAnalysis bersama (None = sama dengan modules)
+            session_options: onnxruntime.SessionOptions untuk semua model (None = default ORT)
+        """
+        self.det_size = tuple(det_size)
+        self.app = self._get_app(model_name, load_modules or modules, session_options)
+        self.modules = [name for name in self.app.models
+                        if name != 'detection' and (modules is None or name in modules)]
+        self.rec_model = self.app.models.get('recognition')
+    
+    @classmethod
+    def from_profile(cls, name, settings, load_modules=None):
+        """Buat detector dari Settings.INFERENCE_PROFILES[name]"""
+        profile = settings.INFERENCE_PROFILES[name]
+        return cls(
+            det_size=profile['det_size'],
+            modules=profile['modules'],
+            model_name=settings.INFERENCE_MODEL,
+            load_modules=load_modules,
+            session_options=settings.build_session_options()
+        )
+    
+    @classmethod
+    def _get_app(cls, model_name, modules, session_options=None):
+        key = (model_name, tuple(sorted(modules)) if modules else None)
+        if key not in cls._shared_apps:
+            if session_options is not None:
+                app = TunedFaceAnalysis(model_name, allowed_modules=modules, providers=cls.PROVIDERS,
+                                        session_options=session_options)
+            else:
+                app = FaceAnalysis(name=model_name, allowed_modules=modules, providers=cls.PROVIDERS)
+            app.prepare(ctx_id=0)
+            cls._shared_apps[key] = app
+        return cls._shared_apps[key]
     
     def detect(self, frame):
-        """Detect faces in frame"""
-        faces = self.app.get(frame)
+        """Detect faces in frame (deteksi + model analisis profil ini, termasuk ArcFace)"""
+        faces = self.detect_faces(frame)
+        for face in faces:
+            for name in self.modules:
+                self.app.models[name].get(frame, face)
+        return faces
+    
+    def detect_faces(self, frame, max_num=0, input_size=None):
+        """Deteksi saja (bbox, kps, det_score) tanpa landmark/genderage/ArcFace"""
+        bboxes, kpss = self.app.det_model.detect(
+            frame, input_size=tuple(input_size or self.det_size), max_num=max_num, metric='default'
+        )
+        
+        faces = []
+        for i in range(bboxes.shape[0]):
+            kps = kpss[i] if kpss is not None else None
+            faces.append(Face(bbox=bboxes[i, 0:4], kps=kps, det_score=bboxes[i, 4]))
         return faces
     
-    def get_single_face(self, frame, min_confidence=0.8):
-        """Get single face with confidence threshold"""
-        faces = self.detect(frame)
+    def fit_input_size(self, frame):
+        """det_size dibatasi ukuran frame (kelipatan 32) agar frame kecil tidak di-upscale ke det_size"""
+        h, w = frame.shape[:2]
+        return (min(self.det_size[0], -(-w // 32) * 32), min(self.det_size[1], -(-h // 32) * 32))
+    
+    @staticmethod
+    def pad_to_stride(image, stride=32):
+        """
+        Pad kanan/bawah (hitam) sampai sisi kelipatan stride; koordinat deteksi tidak berubah
+
+        Grid anchor RetinaFace (stride 8/16/32) hanya cocok dengan output model jika input
+        kelipatan 32 (tile tepi, crop ROI, TILE_SIZE sembarang).
+        """
+        h, w = image.shape[:2]
+        padded_h, padded_w = -(-h // stride) * stride, -(-w // stride) * stride
+        if (padded_h, padded_w) == (h, w):
+            return image
+        padded = np.zeros((padded_h, padded_w) + image.shape[2:], dtype=image.dtype)
+        padded[:h, :w] = image
+        return padded
+    
+    @staticmethod
+    def downscale(frame, scale):
+        """Salinan frame diperkecil; return (frame_kecil, (sx, sy)) faktor balik ke resolusi asli"""
+        h, w = frame.shape[:2]
+        small_w, small_h = max(1, int(round(w * scale))), max(1, int(round(h * scale)))
+        small = cv2.resize(frame, (small_w, small_h), interpolation=cv2.INTER_AREA)
+        return small, (w / small_w, h / small_h)
+    
+    @staticmethod
+    def rescale_faces(faces, factors):
+        """Petakan bbox & kps hasil deteksi frame kecil ke koordinat frame asli"""
+        sx, sy = factors
+        scale = np.array([sx, sy], dtype=np.float32)
+        return [
+            Face(
+                bbox=face.bbox * np.tile(scale, 2),
+                kps=face.kps * scale if face.kps is not None else None,
+                det_score=face.det_score
+            )
+            for face in faces
+        ]
+    
+    def embed(self, frame, face):
+        """Jalankan ArcFace on-demand pada crop ter-align (dari face.kps); set face.embedding"""
+        self.rec_model.get(frame, face)
+        return face.normed_embedding
+    
+    def warmup(self, runs=2):
+        """
+        Inferensi dummy agar alokasi & optimasi ORT tidak membebani request pertama
+
+        Session dibagi antar profil: deteksi di-warmup sekali per (model, det_size),
+        ArcFace sekali per model.
+        """
+        if runs <= 0:
+            return
+        frame = np.zeros((self.det_size[1], self.det_size[0], 3), dtype=np.uint8)
+        detect_key = (id(self.app), self.det_size)
+        if detect_key not in FaceDetector._warmed:
+            for _ in range(runs):
+                self.detect_faces(frame)
+            FaceDetector._warmed.add(detect_key)
+        
+        embed_key = (id(self.app), 'recognition')
+        if self.rec_model is not None and embed_key not in FaceDetector._warmed:
+            dummy = self._dummy_face()
+            for _ in range(runs):
+                self.embed(frame, dummy)
+            FaceDetector._warmed.add(embed_key)
+    
+    def measure_latency(self, runs=3):
+        """Rata-rata latency deteksi & embedding (ms) pada frame sintetis seukuran det_size"""
+        frame = np.zeros((self.det_size[1], self.det_size[0], 3), dtype=np.uint8)
+        dummy = self._dummy_face()
+        
+        start = time.perf_counter()
+        for _ in range(runs):
+            self.detect_faces(frame)
+        detect_ms = (time.perf_counter() - start) * 1000 / runs
+        
+        embed_ms = 0.0
+        if self.rec_model is not None:
+            start = time.perf_counter()
+            for _ in range(runs):
+                self.embed(frame, dummy)
+            embed_ms = (time.perf_counter() - start) * 1000 / runs
+        
+        return {'detect_ms': detect_ms, 'embed_ms': embed_ms}
+    
+    @staticmethod
+    def _dummy_face():
+        """Wajah dummy dengan kps template ArcFace agar model recognition ikut diukur"""
+        return Face(bbox=np.array([0, 0, 112, 112], dtype=np.float32),
+                    kps=face_align.arcface_dst.copy(), det_score=1.0)
+    
+    def get_single_face(self, frame, min_confidence=0.8, embed=True):
+        """Get single face with confidence threshold (embed=False: tanpa ArcFace)"""
+        faces = self.detect(frame) if embed else self.detect_faces(frame)
         
         if len(faces) == 0:
             return None, "Wajah tidak terdeteksi"
@@ -27,4 +219,4 @@ class FaceDetector:
         if face.det_score < min_confidence:
             return None, f"Confidence rendah: {face.det_score:.2f}"
         
-        return face, "OK"
\ No newline at end of file
+        return face, "OK"
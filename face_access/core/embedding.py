@@ -1,8 +1,12 @@
+import numpy as np
+from insightface.utils import face_align
+
 class EmbeddingExtractor:
     """Extract embeddings menggunakan ArcFace"""
     
-    def __init__(self, detector):
+    def __init__(self, detector, batch_size=32):
         self.detector = detector
+        self.batch_size = batch_size
     
     def extract(self, face):
         """Extract normalized embedding from face"""
@@ -13,4 +17,47 @@ class EmbeddingExtractor:
         face, msg = self.detector.get_single_face(frame)
         if face is None:
             return None, msg
-        return self.extract(face), "OK"
\ No newline at end of file
+        return self.extract(face), "OK"
+    
+    def align(self, frame, face):
+        """Crop ter-align (112x112) dari frame berdasarkan 5 keypoint wajah"""
+        return face_align.norm_crop(frame, landmark=face.kps, image_size=self._rec_model.input_size[0])
+    
+    def extract_batch(self, crops):
+        """
+        Embedding ArcFace untuk list crop ter-align, dijalankan per batch
+        
+        Returns:
+            np.ndarray (N, 512) ternormalisasi
+        """
+        if len(crops) == 0:
+            return np.empty((0, 512), dtype=np.float32)
+        
+        batch_size = self._max_batch_size()
+        feats = []
+        for start in range(0, len(crops), batch_size):
+            feats.append(self._rec_model.get_feat(list(crops[start:start + batch_size])))
+        feats = np.concatenate(feats).astype(np.float32)
+        return feats / np.maximum(np.linalg.norm(feats, axis=1, keepdims=True), 1e-12)
+    
+    def extract_faces(self, frame, faces):
+        """Align + embedding batch untuk banyak wajah dalam satu frame; set face.embedding"""
+        if len(faces) == 0:
+            return []
+        
+        crops = [self.align(frame, face) for face in faces]
+        embeddings = self.extract_batch(crops)
+        for face, embedding in zip(faces, embeddings):
+            face.embedding = embedding
+        return list(embeddings)
+    
+    @property
+    def _rec_model(self):
+        return self.detector.rec_model
+    
+    def _max_batch_size(self):
+        # Model ONNX dengan batch dimension statis hanya menerima 1 crop per run
+        batch_dim = self._rec_model.input_shape[0]
+        if isinstance(batch_dim, int) and batch_dim > 0:
+            return min(self.batch_size, batch_dim)
+        return max(1, self.batch_size)
@@ -0,0 +1,240 @@
+import mmap
+import tempfile
+import numpy as np
+
+
+class EmbeddingGallery:
+    """Gallery embedding pegawai dalam satu matriks float32 (N, D) untuk pencocokan vektorisasi"""
+
+    def __init__(self, ids, matrix):
+        self.ids = np.ascontiguousarray(ids, dtype=np.int64)
+        self.matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+        self._id_rows = None  # id_pegawai -> [baris], dibangun saat dibutuhkan
+
+        if self.matrix.ndim != 2 or self.matrix.shape[0] != self.ids.shape[0]:
+            raise ValueError("Gallery matrix harus (N, D) dan sejajar dengan ids")
+
+    @classmethod
+    def from_embeddings(cls, stored_embeddings, dim=512):
+        """Build gallery dari list (id_pegawai, embedding); embedding None dilewati"""
+        ids = []
+        rows = []
+        for id_pegawai, embedding in stored_embeddings:
+            if embedding is None:
+                continue
+            ids.append(id_pegawai)
+            rows.append(np.asarray(embedding, dtype=np.float32).reshape(-1))
+
+        if not rows:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32))
+
+        return cls(np.array(ids, dtype=np.int64), np.stack(rows))
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    @property
+    def dim(self):
+        return self.matrix.shape[1]
+
+    @property
+    def resident_nbytes(self):
+        """Byte yang dipegang gallery di RAM (matriks berbasis memmap dihitung 0)"""
+        matrix = 0 if _is_file_backed(self.matrix) else self.matrix.nbytes
+        return self.ids.nbytes + matrix
+
+    def embeddings(self):
+        """List (id_pegawai, embedding) berupa view baris matriks (tanpa salinan)"""
+        return [(int(self.ids[i]), self.matrix[i]) for i in range(len(self))]
+
+    def scores(self, probes):
+        """Cosine similarity probe (D,) atau (M, D) terhadap seluruh gallery dalam satu GEMM"""
+        probes = np.asarray(probes, dtype=np.float32)
+        return probes @ self.matrix.T
+
+    def best(self, probe):
+        """Return (id_pegawai, similarity) terbaik, atau (None, 0.0) jika gallery kosong"""
+        if len(self) == 0:
+            return None, 0.0
+
+        scores = self.scores(probe)
+        idx = int(np.argmax(scores))
+        return int(self.ids[idx]), float(scores[idx])
+
+    def best_batch(self, probes):
+        """Best match untuk setiap baris probes (M, D): return (ids (M,), similarities (M,))"""
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dim)
+        if len(self) == 0 or probes.shape[0] == 0:
+            return np.full(probes.shape[0], -1, dtype=np.int64), np.zeros(probes.shape[0], dtype=np.float32)
+
+        scores = self.scores(probes)
+        idx = np.argmax(scores, axis=1)
+        return self.ids[idx], scores[np.arange(probes.shape[0]), idx]
+
+    def rows_for_ids(self, ids):
+        """Index baris gallery milik id_pegawai tertentu (satu pegawai bisa punya beberapa template)"""
+        if self._id_rows is None:
+            id_rows = {}
+            for row, id_pegawai in enumerate(self.ids.tolist()):
+                id_rows.setdefault(id_pegawai, []).append(row)
+            self._id_rows = id_rows
+        rows = []
+        for id_pegawai in dict.fromkeys(int(i) for i in ids):
+            rows.extend(self._id_rows.get(id_pegawai, []))
+        return np.array(rows, dtype=np.int64)
+
+    def best_among(self, probe, ids):
+        """Skor exact hanya untuk kandidat ids; return (id_pegawai, similarity) terbaik"""
+        rows = self.rows_for_ids(ids)
+        if len(rows) == 0:
+            return None, 0.0
+
+        scores = self.matrix[rows] @ np.asarray(probe, dtype=np.float32)
+        idx = int(np.argmax(scores))
+        return int(self.ids[rows[idx]]), float(scores[idx])
+
+    def top_k(self, probe, k=5):
+        """Return list (id_pegawai, similarity) k terbaik, urut menurun"""
+        if len(self) == 0:
+            return []
+
+        scores = self.scores(probe)
+        k = min(k, len(self))
+        if k < len(self):
+            candidates = np.argpartition(-scores, k - 1)[:k]
+        else:
+            candidates = np.arange(len(self))
+        order = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [(int(self.ids[i]), float(scores[i])) for i in order]
+
+
+class QuantizedGallery(EmbeddingGallery):
+    """
+    Gallery dengan representasi terkompresi (float16 atau int8 + scale per vektor)
+
+    Pass pertama menskor semua template pada matriks terkompresi, lalu rerank_k kandidat
+    terbaik diskor ulang dengan matriks float32 penuh sehingga similarity yang dikembalikan
+    tetap exact. Matriks penuh tidak disimpan di RAM: memmap gallery file dipakai langsung,
+    matriks lain disalin ke file sementara di rerank_dir lalu di-memmap, sehingga hanya
+    baris kandidat yang dibaca (lewat page cache).
+    """
+
+    PRECISIONS = ('float16', 'int8')
+
+    def __init__(self, ids, matrix, precision='int8', rerank_k=8, block_rows=8192, rerank_dir=None):
+        if precision not in self.PRECISIONS:
+            raise ValueError(f"Precision tidak didukung: {precision}")
+
+        self.precision = precision
+        self.rerank_k = rerank_k
+        self.block_rows = block_rows
+        self.codes, self.code_scales = self._quantize(matrix)
+
+        self._rerank_file = None
+        if not _is_file_backed(matrix) and len(matrix) > 0:
+            matrix = self._spill(matrix, rerank_dir)
+        super().__init__(ids, matrix)
+
+    @classmethod
+    def from_gallery(cls, gallery, precision='int8', rerank_k=8, rerank_dir=None):
+        return cls(gallery.ids, gallery.matrix, precision=precision, rerank_k=rerank_k,
+                   rerank_dir=rerank_dir)
+
+    @property
+    def resident_nbytes(self):
+        return super().resident_nbytes + self.compressed_nbytes
+
+    @property
+    def compressed_nbytes(self):
+        """Ukuran representasi pass pertama (byte)"""
+        scales = self.code_scales.nbytes if self.code_scales is not None else 0
+        return self.codes.nbytes + scales
+
+    def approx_scores(self, probes):
+        """Skor pendekatan pada matriks terkompresi; dequantize per blok agar memori tetap kecil"""
+        probes = np.asarray(probes, dtype=np.float32)
+        single = probes.ndim == 1
+        probes = probes.reshape(-1, self.dim)
+
+        out = np.empty((probes.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), self.block_rows):
+            end = start + self.block_rows
+            block = self.codes[start:end].astype(np.float32) @ probes.T
+            if self.code_scales is not None:
+                block *= self.code_scales[start:end, None]
+            out[:, start:end] = block.T
+
+        return out[0] if single else out
+
+    def best(self, probe):
+        if len(self) == 0:
+            return None, 0.0
+
+        probe = np.asarray(probe, dtype=np.float32)
+        rows = self._candidate_rows(self.approx_scores(probe), self.rerank_k)
+        exact = self.matrix[rows] @ probe
+        idx = int(np.argmax(exact))
+        return int(self.ids[rows[idx]]), float(exact[idx])
+
+    def best_batch(self, probes):
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.dim)
+        if len(self) == 0 or probes.shape[0] == 0:
+            return np.full(probes.shape[0], -1, dtype=np.int64), np.zeros(probes.shape[0], dtype=np.float32)
+
+        approx = self.approx_scores(probes)
+        ids = np.empty(probes.shape[0], dtype=np.int64)
+        similarities = np.empty(probes.shape[0], dtype=np.float32)
+        for i, probe in enumerate(probes):
+            rows = self._candidate_rows(approx[i], self.rerank_k)
+            exact = self.matrix[rows] @ probe
+            idx = int(np.argmax(exact))
+            ids[i] = self.ids[rows[idx]]
+            similarities[i] = exact[idx]
+        return ids, similarities
+
+    def top_k(self, probe, k=5):
+        if len(self) == 0:
+            return []
+
+        probe = np.asarray(probe, dtype=np.float32)
+        rows = self._candidate_rows(self.approx_scores(probe), max(k, self.rerank_k))
+        exact = self.matrix[rows] @ probe
+        order = np.argsort(-exact, kind='stable')[:min(k, len(rows))]
+        return [(int(self.ids[rows[i]]), float(exact[i])) for i in order]
+
+    def _candidate_rows(self, approx, k):
+        k = min(k, approx.shape[0])
+        if k == approx.shape[0]:
+            return np.arange(k)
+        return np.sort(np.argpartition(-approx, k - 1)[:k])
+
+    def _spill(self, matrix, rerank_dir):
+        """Salin matriks float32 per blok ke file sementara (terhapus otomatis), return memmap"""
+        self._rerank_file = tempfile.TemporaryFile(dir=rerank_dir)
+        spilled = np.memmap(self._rerank_file, dtype=np.float32, mode='w+', shape=matrix.shape)
+        for start in range(0, matrix.shape[0], self.block_rows):
+            spilled[start:start + self.block_rows] = matrix[start:start + self.block_rows]
+        spilled.flush()
+        return spilled
+
+    def _quantize(self, matrix):
+        if self.precision == 'float16':
+            return np.asarray(matrix, dtype=np.float16), None
+
+        codes = np.empty(matrix.shape, dtype=np.int8)
+        scales = np.empty(matrix.shape[0], dtype=np.float32)
+        for start in range(0, matrix.shape[0], self.block_rows):
+            block = np.asarray(matrix[start:start + self.block_rows], dtype=np.float32)
+            block_scales = np.maximum(np.abs(block).max(axis=1), 1e-12) / 127.0
+            codes[start:start + len(block)] = np.clip(np.rint(block / block_scales[:, None]), -127, 127)
+            scales[start:start + len(block)] = block_scales
+        return codes, scales
+
+
+def _is_file_backed(array):
+    """True jika data array berasal dari memmap (tidak memakai RAM anonim)"""
+    while array is not None:
+        if isinstance(array, (np.memmap, mmap.mmap)):
+            return True
+        array = getattr(array, 'base', None)
+    return False
@@ -1,34 +1,95 @@
-from utils.math_utils import cosine_similarity
+from core.gallery import EmbeddingGallery
+from utils.logger import Logger
 import numpy as np
 
 class FaceMatcher:
     """Match faces using cosine similarity"""
     
-    def __init__(self, threshold=0.6):
+    def __init__(self, threshold=0.6, ann_index=None, ann_min_gallery=20000, ann_candidates=10,
+                 ann_loader=None):
         self.threshold = threshold
+        # ANN index (IVFIndex) opsional untuk gallery sangat besar; kandidat di-rerank exact
+        self.ann_index = ann_index
+        self.ann_min_gallery = ann_min_gallery
+        self.ann_candidates = ann_candidates
+        # ann_loader(gallery, index=...) -> IVFIndex yang sinkron dengan gallery (mis.
+        # IVFIndex.load_or_build); dipanggil sekali setiap gallery di-reload repository
+        self.ann_loader = ann_loader
+        self._ann_gallery = None
+        # Cache gallery terakhir agar list yang sama tidak di-stack ulang setiap frame
+        self._cached_source = None
+        self._cached_gallery = None
     
     def match(self, embedding, stored_embeddings):
         """Match embedding against database"""
         if embedding is None:
             return None, 0.0
 
-        best_match = None
-        best_similarity = 0
-        
-        for id_pegawai, stored_embedding in stored_embeddings:
-            if stored_embedding is None:
-                continue
-            similarity = cosine_similarity(embedding, stored_embedding)
-            
-            if similarity > best_similarity:
-                best_similarity = similarity
-                best_match = id_pegawai
+        gallery = self._as_gallery(stored_embeddings)
+        if self._use_ann(gallery):
+            candidates = self.ann_index.search(embedding, k=self.ann_candidates)
+            best_match, best_similarity = gallery.best_among(embedding, [i for i, _ in candidates])
+        else:
+            best_match, best_similarity = gallery.best(embedding)
+
+        # Sama seperti loop lama: similarity negatif tidak dianggap kandidat
+        if best_match is None or best_similarity <= 0:
+            return None, 0.0
         
         if best_similarity >= self.threshold:
             return best_match, best_similarity
         
         return None, best_similarity
     
+    def match_batch(self, embeddings, stored_embeddings):
+        """Match banyak embedding sekaligus (satu GEMM); return list (id_pegawai, similarity)"""
+        if len(embeddings) == 0:
+            return []
+
+        gallery = self._as_gallery(stored_embeddings)
+        if self._use_ann(gallery):
+            return [self.match(embedding, gallery) for embedding in embeddings]
+
+        ids, similarities = gallery.best_batch(np.stack(embeddings))
+        results = []
+        for id_pegawai, similarity in zip(ids.tolist(), similarities.tolist()):
+            if id_pegawai < 0 or similarity <= 0:
+                results.append((None, 0.0))
+            elif similarity >= self.threshold:
+                results.append((id_pegawai, similarity))
+            else:
+                results.append((None, similarity))
+        return results
+    
+    def match_top_k(self, embedding, stored_embeddings, k=5):
+        """Return k kandidat terbaik [(id_pegawai, similarity), ...] tanpa threshold"""
+        if embedding is None:
+            return []
+        return self._as_gallery(stored_embeddings).top_k(embedding, k)
+    
+    def _use_ann(self, gallery):
+        if len(gallery) < self.ann_min_gallery:
+            return False
+        if self.ann_loader is not None and gallery is not self._ann_gallery:
+            # Gallery berubah (enroll proses lain / index belum ada): susul atau build ulang index
+            try:
+                self.ann_index = self.ann_loader(gallery, index=self.ann_index)
+            except Exception as e:
+                Logger.warning(f"ANN index gagal disinkronkan, pakai exact search: {e}")
+                self.ann_index = None
+            self._ann_gallery = gallery
+        return self.ann_index is not None
+
+    def _as_gallery(self, stored_embeddings):
+        """Terima EmbeddingGallery atau list (id_pegawai, embedding)"""
+        if isinstance(stored_embeddings, EmbeddingGallery):
+            return stored_embeddings
+        
+        if stored_embeddings is not self._cached_source:
+            self._cached_gallery = EmbeddingGallery.from_embeddings(stored_embeddings)
+            self._cached_source = stored_embeddings
+        return self._cached_gallery
+    
     def verify_consistency(self, embeddings, threshold=0.7):
         """Verify embeddings are consistent"""
         from utils.math_utils import calculate_all_similarities
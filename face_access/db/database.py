@@ -6,6 +6,8 @@ class Database:
     def __init__(self, config):
         self.config = config
         self.conn = None
+        # Koneksi terpisah (autocommit) untuk baca cache gallery, lihat get_read_connection
+        self.read_conn = None
     
     def connect(self):
         """Connect to database"""
@@ -22,7 +24,27 @@ class Database:
             self.connect()
         return self.conn
     
+    def get_read_connection(self):
+        """
+        Koneksi autocommit khusus query baca
+
+        Tiap SELECT melihat data terbaru tanpa commit/rollback, jadi tidak pernah
+        mengakhiri transaksi pemanggil lain pada koneksi utama. Tidak fallback ke koneksi
+        utama (snapshot REPEATABLE READ-nya basi): error koneksi di-raise, dicoba lagi
+        pada pemanggilan berikutnya.
+        """
+        if self.read_conn is None or not self.read_conn.is_connected():
+            try:
+                self.read_conn = mysql.connector.connect(**dict(self.config, autocommit=True))
+            except mysql.connector.Error as e:
+                print(f"Database read connection error: {e}")
+                self.read_conn = None
+                raise
+        return self.read_conn
+    
     def close(self):
         """Close connection"""
         if self.conn is not None and self.conn.is_connected():
-            self.conn.close()
\ No newline at end of file
+            self.conn.close()
+        if self.read_conn is not None and self.read_conn.is_connected():
+            self.read_conn.close()
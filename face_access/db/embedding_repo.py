@@ -1,18 +1,51 @@
 import os
 import pickle
+import time
 import uuid
+import numpy as np
+from core.gallery import EmbeddingGallery, QuantizedGallery
+from db.gallery_file import GalleryFile
+from utils.logger import Logger
 
 class EmbeddingRepository:
     """Repository untuk tabel face_embedding"""
     
-    def __init__(self, database):
+    STORAGE_MODES = ("file", "gallery", "blob")
+    EMBEDDING_DIM = 512
+
+    def __init__(self, database, cache_check_interval=5.0, storage_mode="file",
+                 gallery_precision="float32", rerank_k=8):
         self.db = database
         # folder to store embedding files
         self.storage_dir = os.path.join(os.path.dirname(__file__), "..", "embeddings")
         os.makedirs(self.storage_dir, exist_ok=True)
+
+        if storage_mode not in self.STORAGE_MODES:
+            raise ValueError(f"storage_mode tidak valid: {storage_mode}")
+        self.storage_mode = storage_mode
+        # file gallery tunggal (memmap), dipakai storage_mode="gallery"
+        self.gallery_file = GalleryFile(os.path.join(self.storage_dir, "gallery.bin"))
+
+        # "float32" (exact), atau "float16"/"int8" (QuantizedGallery + rerank exact)
+        if gallery_precision != "float32" and gallery_precision not in QuantizedGallery.PRECISIONS:
+            raise ValueError(f"gallery_precision tidak valid: {gallery_precision}")
+        self.gallery_precision = gallery_precision
+        self.rerank_k = rerank_k
+
+        # In-process cache gallery; dicek ulang ke DB paling sering tiap N detik
+        self.cache_check_interval = cache_check_interval
+        self._cache = None
+        self._cache_gallery = None
+        self._cache_signature = None
+        self._cache_checked_at = 0.0
     
     def save(self, id_pegawai, embedding):
-        """Save embedding to file and store path in DB"""
+        """Save embedding (sesuai storage_mode) and store reference in DB"""
+        if self.storage_mode == "gallery":
+            return self._save_to_gallery_file(id_pegawai, embedding)
+        if self.storage_mode == "blob":
+            return self._save_to_blob(id_pegawai, embedding)
+
         # prepare file path
         filename = f"{id_pegawai}_{uuid.uuid4().hex}.pkl"
         filepath = os.path.abspath(os.path.join(self.storage_dir, filename))
@@ -31,6 +64,7 @@ class EmbeddingRepository:
                 (id_pegawai, filepath)
             )
             conn.commit()
+            self.invalidate_cache()
             return cursor.lastrowid
         except Exception as e:
             conn.rollback()
@@ -43,39 +77,241 @@ class EmbeddingRepository:
         finally:
             cursor.close()
     
-    def get_all(self):
-        """Get all embeddings"""
+    def _save_to_gallery_file(self, id_pegawai, embedding):
+        """Append embedding ke gallery file dan simpan referensi barisnya di DB"""
+        # Lepas memmap lama sebelum file mungkin di-grow/replace
+        self.invalidate_cache()
+        row = self.gallery_file.append(id_pegawai, embedding)
+
+        conn = self.db.get_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "INSERT INTO face_embedding (id_pegawai, embedding_vector) VALUES (%s, %s)",
+                (id_pegawai, GalleryFile.make_ref(row))
+            )
+            conn.commit()
+            return cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            # Slot file dikembalikan agar tidak ada baris yatim tanpa referensi DB
+            self.gallery_file.discard_last(row)
+            raise e
+        finally:
+            cursor.close()
+
+    def _save_to_blob(self, id_pegawai, embedding):
+        """Simpan buffer float32 (2 KB) langsung di kolom BLOB embedding_vector"""
         conn = self.db.get_connection()
         cursor = conn.cursor()
+
+        try:
+            cursor.execute(
+                "INSERT INTO face_embedding (id_pegawai, embedding_vector) VALUES (%s, %s)",
+                (id_pegawai, self.to_blob(embedding))
+            )
+            conn.commit()
+            self.invalidate_cache()
+            return cursor.lastrowid
+        except Exception as e:
+            conn.rollback()
+            raise e
+        finally:
+            cursor.close()
+
+    @classmethod
+    def to_blob(cls, embedding):
+        """Embedding -> bytes float32 little-endian"""
+        embedding = np.asarray(embedding, dtype="<f4").reshape(-1)
+        if embedding.shape[0] != cls.EMBEDDING_DIM:
+            raise ValueError(f"Dimensi embedding {embedding.shape[0]} != {cls.EMBEDDING_DIM}")
+        return embedding.tobytes()
+
+    @classmethod
+    def is_raw_blob(cls, embedding_blob):
+        """True jika embedding_vector berisi buffer float32 mentah"""
+        return (
+            isinstance(embedding_blob, (bytes, bytearray))
+            and len(embedding_blob) == cls.EMBEDDING_DIM * 4
+        )
+
+    def get_all(self):
+        """Get all embeddings (dari cache jika gallery di DB tidak berubah)"""
+        if self._cache is not None and not self._is_cache_stale():
+            return self._cache
+
+        signature = self._get_signature()
+        self._cache, gallery = self._load_all()
+        self._cache_gallery = None
+        if gallery is not None:
+            self._set_cache_gallery(gallery)
+        self._cache_signature = signature
+        self._cache_checked_at = time.time()
+        return self._cache
+
+    def get_gallery(self):
+        """Get all embeddings sebagai EmbeddingGallery (cached bersama get_all)"""
+        embeddings = self.get_all()
+        if self._cache_gallery is None:
+            self._set_cache_gallery(EmbeddingGallery.from_embeddings(embeddings))
+        return self._cache_gallery
+
+    def _set_cache_gallery(self, gallery):
+        """
+        Kompres gallery sesuai gallery_precision
+
+        QuantizedGallery memindahkan matriks float32 ke memmap; cache list ikut diganti ke
+        baris memmap tersebut agar salinan float32 di RAM bisa dilepas.
+        """
+        if self.gallery_precision == "float32":
+            self._cache_gallery = gallery
+            return
+        self._cache_gallery = QuantizedGallery.from_gallery(
+            gallery, precision=self.gallery_precision, rerank_k=self.rerank_k,
+            rerank_dir=self.storage_dir
+        )
+        self._cache = self._cache_gallery.embeddings()
+
+    def invalidate_cache(self):
+        """Paksa reload gallery pada pemanggilan get_all berikutnya"""
+        self._cache = None
+        self._cache_gallery = None
+        self._cache_signature = None
+        self._cache_checked_at = 0.0
+
+    def _is_cache_stale(self):
+        """Cek murah (COUNT + MAX id) paling sering sekali per cache_check_interval"""
+        now = time.time()
+        if now - self._cache_checked_at < self.cache_check_interval:
+            return False
+
+        self._cache_checked_at = now
+        try:
+            return self._get_signature() != self._cache_signature
+        except Exception as e:
+            # Koneksi baca gagal: pakai cache lama, dicek lagi setelah cache_check_interval
+            Logger.warning(f"Cek perubahan gallery gagal, cache lama dipakai: {e}")
+            return False
+
+    def _get_signature(self):
+        """Return (jumlah baris, max embedding_id) tabel face_embedding"""
+        # Koneksi autocommit: perubahan proses lain terlihat tanpa commit pada koneksi
+        # bersama (yang bisa ikut meng-commit transaksi pemanggil lain)
+        conn = self.db.get_read_connection()
+        cursor = conn.cursor()
+
+        try:
+            cursor.execute("SELECT COUNT(*), COALESCE(MAX(embedding_id), 0) FROM face_embedding")
+            count, max_id = cursor.fetchone()
+            return int(count), int(max_id)
+        finally:
+            cursor.close()
+
+    def _load_all(self):
+        """
+        Load semua embedding dari DB
+
+        Returns:
+            tuple: (list (id_pegawai, embedding), EmbeddingGallery atau None)
+            Gallery langsung dibangun di atas memmap jika semua baris merujuk gallery file.
+        """
+        # Koneksi yang sama dengan _get_signature: data selalu sesnapshot dengan signature-nya
+        conn = self.db.get_read_connection()
+        cursor = conn.cursor()
         
         try:
-            cursor.execute("SELECT id_pegawai, embedding_vector FROM face_embedding")
+            cursor.execute(
+                "SELECT id_pegawai, embedding_vector FROM face_embedding ORDER BY embedding_id"
+            )
             results = cursor.fetchall()
-            
-            embeddings = []
-            for id_pegawai, embedding_blob in results:
-                embedding = None
-                # If DB contains a path (string), load from file
-                if isinstance(embedding_blob, str):
-                    embedding = self._load_embedding_from_path(embedding_blob)
-                else:
-                    # try to unpickle raw blob (backwards compatibility)
-                    try:
-                        embedding = pickle.loads(embedding_blob)
-                    except Exception:
-                        # if it's bytes representing a path, decode and try file
-                        try:
-                            path = embedding_blob.decode("utf-8")
-                            embedding = self._load_embedding_from_path(path)
-                        except Exception:
-                            embedding = None
-
-                embeddings.append((id_pegawai, embedding))
-            
-            return embeddings
         finally:
             cursor.close()
 
+        if results and all(self.is_raw_blob(blob) for _, blob in results):
+            return self._load_from_blobs(results)
+
+        rows = [GalleryFile.parse_ref(blob) for _, blob in results]
+        gallery_matrix = None
+        if any(row is not None for row in rows):
+            gallery_matrix = self._load_gallery_matrix()
+            if results and all(row is not None for row in rows) and gallery_matrix is not None:
+                if max(rows) < gallery_matrix.shape[0]:
+                    return self._load_from_gallery_file(results, rows, gallery_matrix)
+
+        # Per baris; referensi gallery yang tidak ada di file dilewati (bukan error)
+        embeddings = []
+        unresolved = 0
+        for (id_pegawai, embedding_blob), row in zip(results, rows):
+            if row is not None:
+                embedding = None
+                if gallery_matrix is not None and row < gallery_matrix.shape[0]:
+                    embedding = gallery_matrix[row]
+                else:
+                    unresolved += 1
+            elif self.is_raw_blob(embedding_blob):
+                embedding = np.frombuffer(embedding_blob, dtype="<f4").astype(np.float32)
+            else:
+                embedding = self._decode_legacy(embedding_blob)
+            embeddings.append((id_pegawai, embedding))
+        
+        if unresolved:
+            Logger.warning(f"{unresolved} referensi gallery di DB tidak ada di gallery file, dilewati")
+        return embeddings, None
+
+    def _load_from_blobs(self, results):
+        """Fast path: satu np.frombuffer atas gabungan semua BLOB, tanpa file dan pickle"""
+        buffer = b"".join(blob for _, blob in results)
+        matrix = np.frombuffer(buffer, dtype="<f4").reshape(len(results), self.EMBEDDING_DIM)
+
+        ids = np.array([id_pegawai for id_pegawai, _ in results], dtype=np.int64)
+        gallery = EmbeddingGallery(ids, matrix)
+        embeddings = [(int(ids[i]), gallery.matrix[i]) for i in range(len(ids))]
+        return embeddings, gallery
+
+    def _load_gallery_matrix(self):
+        """Memmap gallery file; None (dengan warning) jika file hilang atau rusak"""
+        if not self.gallery_file.exists():
+            Logger.warning(f"Gallery file tidak ditemukan: {self.gallery_file.path}")
+            return None
+        try:
+            _, matrix = self.gallery_file.load()
+        except (OSError, ValueError) as e:
+            Logger.warning(f"Gallery file tidak bisa dibaca: {e}")
+            return None
+        return matrix
+
+    def _load_from_gallery_file(self, results, rows, matrix):
+        """Fast path: seluruh gallery dari satu memmap tanpa membuka file per pegawai"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if np.array_equal(rows, np.arange(matrix.shape[0])):
+            # Urutan identik dengan file: pakai memmap langsung (page cache dibagi antar proses)
+            gallery_matrix = matrix
+        else:
+            gallery_matrix = matrix[rows]
+
+        ids = np.array([id_pegawai for id_pegawai, _ in results], dtype=np.int64)
+        gallery = EmbeddingGallery(ids, gallery_matrix)
+        embeddings = [(int(ids[i]), gallery.matrix[i]) for i in range(len(ids))]
+        return embeddings, gallery
+
+    def _decode_legacy(self, embedding_blob):
+        """Decode embedding_vector format lama: path file .pkl atau pickle mentah"""
+        # If DB contains a path (string), load from file
+        if isinstance(embedding_blob, str):
+            return self._load_embedding_from_path(embedding_blob)
+
+        # try to unpickle raw blob (backwards compatibility)
+        try:
+            return pickle.loads(embedding_blob)
+        except Exception:
+            # if it's bytes representing a path, decode and try file
+            try:
+                path = embedding_blob.decode("utf-8")
+                return self._load_embedding_from_path(path)
+            except Exception:
+                return None
+
     def _load_embedding_from_path(self, path):
         """Load embedding from absolute path, with fallback if project folder moved."""
         try:
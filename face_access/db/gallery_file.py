@@ -0,0 +1,158 @@
+import os
+import struct
+import numpy as np
+
+
+class GalleryFile:
+    """
+    File gallery tunggal yang bisa di-memmap:
+    header versioned, matriks float32 (capacity, dim), lalu kolom id int64 (capacity,)
+
+    Baris ke-i pada file dirujuk dari face_embedding.embedding_vector sebagai "gallery:<i>".
+    Hanya satu proses yang boleh menulis (append) pada satu waktu.
+    """
+
+    MAGIC = b"FAGALLRY"
+    VERSION = 1
+    HEADER_FORMAT = "<8sIIQQ"  # magic, version, dim, count, capacity
+    HEADER_SIZE = 64
+    REF_PREFIX = "gallery:"
+
+    def __init__(self, path, dim=512, initial_capacity=1024):
+        self.path = path
+        self.dim = dim
+        self.initial_capacity = initial_capacity
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read_header(self):
+        """Return (dim, count, capacity)"""
+        with open(self.path, "rb") as f:
+            raw = f.read(struct.calcsize(self.HEADER_FORMAT))
+
+        magic, version, dim, count, capacity = struct.unpack(self.HEADER_FORMAT, raw)
+        if magic != self.MAGIC:
+            raise ValueError(f"Bukan file gallery: {self.path}")
+        if version != self.VERSION:
+            raise ValueError(f"Versi gallery tidak didukung: {version}")
+        return dim, count, capacity
+
+    def load(self):
+        """Memmap read-only; return (ids, matrix) sepanjang count baris"""
+        dim, count, capacity = self.read_header()
+        if count == 0:
+            return np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32)
+
+        matrix = np.memmap(self.path, dtype=np.float32, mode="r",
+                           offset=self._matrix_offset(), shape=(capacity, dim))
+        ids = np.memmap(self.path, dtype=np.int64, mode="r",
+                        offset=self._ids_offset(capacity, dim), shape=(capacity,))
+        return ids[:count], matrix[:count]
+
+    def append(self, id_pegawai, embedding):
+        """Tambah satu template, return index baris"""
+        embedding = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        if embedding.shape[0] != self.dim:
+            raise ValueError(f"Dimensi embedding {embedding.shape[0]} != {self.dim}")
+
+        if not self.exists():
+            self._create(self.initial_capacity)
+
+        dim, count, capacity = self.read_header()
+        if count >= capacity:
+            self._grow(capacity * 2)
+            dim, count, capacity = self.read_header()
+
+        matrix = np.memmap(self.path, dtype=np.float32, mode="r+",
+                           offset=self._matrix_offset(), shape=(capacity, dim))
+        matrix[count] = embedding
+        matrix.flush()
+        ids = np.memmap(self.path, dtype=np.int64, mode="r+",
+                        offset=self._ids_offset(capacity, dim), shape=(capacity,))
+        ids[count] = id_pegawai
+        ids.flush()
+        del matrix, ids
+
+        # Header ditulis terakhir agar baris setengah jadi tidak pernah terlihat
+        self._write_count(count + 1)
+        return count
+
+    def discard_last(self, row):
+        """Batalkan append terakhir (row) jika belum ada append sesudahnya"""
+        if not self.exists():
+            return False
+        _, count, _ = self.read_header()
+        if count != row + 1:
+            return False
+        self._write_count(row)
+        return True
+
+    def write_all(self, ids, matrix):
+        """Tulis ulang seluruh gallery secara atomik (dipakai migrasi)"""
+        ids = np.asarray(ids, dtype=np.int64)
+        matrix = np.asarray(matrix, dtype=np.float32).reshape(-1, self.dim)
+        capacity = max(self.initial_capacity, matrix.shape[0])
+        self._write_file(self.path + ".tmp", ids, matrix, capacity)
+        os.replace(self.path + ".tmp", self.path)
+
+    @classmethod
+    def make_ref(cls, row):
+        return f"{cls.REF_PREFIX}{row}"
+
+    @classmethod
+    def parse_ref(cls, value):
+        """Return index baris jika value adalah referensi gallery, selain itu None"""
+        if isinstance(value, (bytes, bytearray)):
+            if not value.startswith(cls.REF_PREFIX.encode("ascii")):
+                return None
+            value = value.decode("ascii")
+        if not isinstance(value, str) or not value.startswith(cls.REF_PREFIX):
+            return None
+        try:
+            return int(value[len(cls.REF_PREFIX):])
+        except ValueError:
+            return None
+
+    def _create(self, capacity):
+        self._write_file(self.path, np.empty(0, dtype=np.int64),
+                         np.empty((0, self.dim), dtype=np.float32), capacity)
+
+    def _grow(self, capacity):
+        ids, matrix = self.load()
+        tmp_path = self.path + ".tmp"
+        self._write_file(tmp_path, np.array(ids), np.array(matrix), capacity)
+        del ids, matrix
+        os.replace(tmp_path, self.path)
+
+    def _write_file(self, path, ids, matrix, capacity):
+        count = matrix.shape[0]
+        with open(path, "wb") as f:
+            f.write(self._pack_header(count, capacity))
+            f.truncate(self._ids_offset(capacity, self.dim) + capacity * 8)
+
+        if count > 0:
+            mm = np.memmap(path, dtype=np.float32, mode="r+",
+                           offset=self._matrix_offset(), shape=(capacity, self.dim))
+            mm[:count] = matrix
+            mm.flush()
+            mm_ids = np.memmap(path, dtype=np.int64, mode="r+",
+                               offset=self._ids_offset(capacity, self.dim), shape=(capacity,))
+            mm_ids[:count] = ids
+            mm_ids.flush()
+            del mm, mm_ids
+
+    def _write_count(self, count):
+        _, _, capacity = self.read_header()
+        with open(self.path, "r+b") as f:
+            f.write(self._pack_header(count, capacity))
+
+    def _pack_header(self, count, capacity):
+        header = struct.pack(self.HEADER_FORMAT, self.MAGIC, self.VERSION, self.dim, count, capacity)
+        return header.ljust(self.HEADER_SIZE, b"\0")
+
+    def _matrix_offset(self):
+        return self.HEADER_SIZE
+
+    def _ids_offset(self, capacity, dim):
+        return self.HEADER_SIZE + capacity * dim * 4
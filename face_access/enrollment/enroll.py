@@ -8,7 +8,8 @@ class Enrollment:
     """Alur pendaftaran pegawai dengan pilihan rekam video atau upload gambar"""
     
     def __init__(self, camera, detector, quality_checker, #liveness_checker, 
-                 embedding_extractor, pegawai_repo, embedding_repo, settings):
+                 embedding_extractor, pegawai_repo, embedding_repo, settings,
+                 ann_index=None):
         self.camera = camera
         self.detector = detector
         self.quality_checker = quality_checker
@@ -17,6 +18,7 @@ class Enrollment:
         self.pegawai_repo = pegawai_repo
         self.embedding_repo = embedding_repo
         self.settings = settings
+        self.ann_index = ann_index
     
     def enroll(self, nama, nip, mode='video', image_paths=None):
         """
@@ -490,8 +492,8 @@ class Enrollment:
         return image_paths
     
     def _process_uploaded_images(self, image_paths):
-        """Process uploaded images dan extract embeddings"""
-        embeddings = []
+        """Process uploaded images dan extract embeddings (ArcFace sekali batch di akhir)"""
+        aligned_crops = []
         
         Logger.info(f"Memproses {len(image_paths)} gambar...")
         
@@ -512,8 +514,8 @@ class Enrollment:
                 new_w, new_h = int(w*scale), int(h*scale)
                 frame = cv2.resize(frame, (new_w, new_h))
             
-            # Detect face
-            face, msg = self.detector.get_single_face(frame, self.settings.CONFIDENCE_THRESHOLD)
+            # Detect face (tanpa ArcFace; embedding dihitung batch setelah semua gambar)
+            face, msg = self.detector.get_single_face(frame, self.settings.CONFIDENCE_THRESHOLD, embed=False)
             
             if face is None:
                 Logger.warning(f"  ✗ {msg}")
@@ -526,11 +528,13 @@ class Enrollment:
                 Logger.warning(f"  ✗ {result}")
                 continue
             
-            # Extract embedding
-            embedding = self.embedding_extractor.extract(face)
-            embeddings.append(embedding)
+            # Simpan crop ter-align saja (112x112), bukan seluruh frame
+            aligned_crops.append(self.embedding_extractor.align(frame, face))
             
-            Logger.success(f"  ✓ Valid - embedding extracted")
+            Logger.success(f"  ✓ Valid - wajah ter-align")
+        
+        # Extract embedding semua gambar valid dalam satu batch ArcFace
+        embeddings = list(self.embedding_extractor.extract_batch(aligned_crops))
         
         Logger.info(f"Berhasil extract {len(embeddings)} embeddings dari {len(image_paths)} gambar")
         
@@ -616,6 +620,14 @@ class Enrollment:
             # Save embedding
             self.embedding_repo.save(id_pegawai, embedding)
             
+            # Insert incremental ke ANN index (tanpa rebuild); disimpan ke file delta
+            if self.ann_index is not None:
+                self.ann_index.add_persistent(
+                    self.settings.resolve_path(self.settings.ANN_INDEX_PATH),
+                    [id_pegawai], [embedding],
+                    compact_every=self.settings.ANN_DELTA_COMPACT
+                )
+            
             return id_pegawai
         
         except Exception as e:
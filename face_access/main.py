@@ -3,12 +3,15 @@ Face Recognition Door Access System
 Entry point untuk sistem
 """
 
+import os
+import functools
 from config.settings import Settings
 from core.camera import Camera
 from core.detector import FaceDetector
 from core.quality import QualityChecker
 from core.embedding import EmbeddingExtractor
 from core.matcher import FaceMatcher
+from core.ann_index import IVFIndex
 from db.database import Database
 from db.pegawai_repo import PegawaiRepository
 from db.embedding_repo import EmbeddingRepository
@@ -16,6 +19,7 @@ from db.log_repo import LogRepository
 from enrollment.enroll import Enrollment
 from recognition.recognize import Recognition
 from recognition.crowd_recognize import CrowdDetectionComplete
+from recognition.crowd_service import CrowdService
 from utils.logger import Logger
 
 
@@ -24,29 +28,49 @@ class FaceAccessSystem:
         Logger.info("Initializing Face Access System...")
 
         self.settings = Settings()
+        self.settings.apply_thread_budget()
 
         self.database = Database(self.settings.DB_CONFIG)
         if not self.database.connect():
             raise Exception("Database connection failed")
 
         self.pegawai_repo = PegawaiRepository(self.database)
-        self.embedding_repo = EmbeddingRepository(self.database)
+        self.embedding_repo = EmbeddingRepository(
+            self.database,
+            cache_check_interval=self.settings.EMBEDDING_CACHE_INTERVAL,
+            storage_mode=self.settings.EMBEDDING_STORAGE,
+            gallery_precision=self.settings.GALLERY_PRECISION,
+            rerank_k=self.settings.GALLERY_RERANK_K
+        )
         self.log_repo = LogRepository(self.database)
 
-        self.detector = FaceDetector()
+        self.detectors = self._init_detectors()
+        self.detector = self.detectors['door']
+        self.enrollment_detector = self.detectors['enrollment']
+        self.crowd_face_detector = self.detectors['crowd']
         self.quality_checker = QualityChecker(
             blur_threshold=self.settings.BLUR_THRESHOLD,
             yaw_threshold=self.settings.YAW_THRESHOLD,
             pitch_threshold=self.settings.PITCH_THRESHOLD
         )
-        self.embedding_extractor = EmbeddingExtractor(self.detector)
-        self.matcher = FaceMatcher(threshold=self.settings.RECOGNITION_SIMILARITY)
+        self.embedding_extractor = EmbeddingExtractor(
+            self.detector,
+            batch_size=self.settings.EMBEDDING_BATCH_SIZE
+        )
+        self.ann_index = self._init_ann_index()
+        self.matcher = FaceMatcher(
+            threshold=self.settings.RECOGNITION_SIMILARITY,
+            ann_index=self.ann_index,
+            ann_min_gallery=self.settings.ANN_MIN_GALLERY,
+            ann_candidates=self.settings.ANN_CANDIDATES,
+            ann_loader=self._ann_loader()
+        )
 
         self.camera = None
         self.recognition_instance = None
 
         self.crowd_detector = CrowdDetectionComplete(
-            detector=self.detector,
+            detector=self.crowd_face_detector,
             embedding_extractor=self.embedding_extractor,
             matcher=self.matcher,
             pegawai_repo=self.pegawai_repo,
@@ -57,6 +81,45 @@ class FaceAccessSystem:
 
         Logger.success("System initialized successfully!")
 
+    def _init_detectors(self):
+        """Satu FaceDetector per profil inferensi (berbagi bobot model), warmup + laporan latency"""
+        profiles = self.settings.INFERENCE_PROFILES
+        load_modules = sorted({m for profile in profiles.values() for m in profile['modules']})
+
+        detectors = {}
+        for name in profiles:
+            detectors[name] = FaceDetector.from_profile(name, self.settings, load_modules=load_modules)
+            detectors[name].warmup(runs=self.settings.WARMUP_RUNS)
+            latency = detectors[name].measure_latency()
+            Logger.info(
+                f"Profil '{name}' det_size={detectors[name].det_size}: "
+                f"deteksi {latency['detect_ms']:.1f} ms, embedding {latency['embed_ms']:.1f} ms"
+            )
+        return detectors
+
+    def _init_ann_index(self):
+        if not self.settings.ANN_ENABLED:
+            return None
+
+        gallery = self.embedding_repo.get_gallery()
+        if len(gallery) == 0:
+            Logger.warning("ANN index ditunda: gallery embedding kosong, dibangun saat gallery cukup besar")
+            return None
+
+        return self._ann_loader()(gallery)
+
+    def _ann_loader(self):
+        """Loader index untuk FaceMatcher: index disusulkan/dibangun ulang saat gallery berubah"""
+        if not self.settings.ANN_ENABLED:
+            return None
+        return functools.partial(
+            IVFIndex.load_or_build,
+            path=self.settings.resolve_path(self.settings.ANN_INDEX_PATH),
+            nlist=self.settings.ANN_NLIST,
+            nprobe=self.settings.ANN_NPROBE,
+            pq_m=self.settings.ANN_PQ_M
+        )
+
     def _init_camera_for_enrollment(self):
         self.camera = Camera(
             camera_index=self.settings.CAMERA_INDEX,
@@ -77,12 +140,13 @@ class FaceAccessSystem:
 
         enrollment = Enrollment(
             camera=self.camera,
-            detector=self.detector,
+            detector=self.enrollment_detector,
             quality_checker=self.quality_checker,
             embedding_extractor=self.embedding_extractor,
             pegawai_repo=self.pegawai_repo,
             embedding_repo=self.embedding_repo,
-            settings=self.settings
+            settings=self.settings,
+            ann_index=self.matcher.ann_index
         )
 
         return enrollment.enroll(nama, nip, mode, image_paths)
@@ -111,18 +175,83 @@ class FaceAccessSystem:
         is_outdoor=False,
         sample_fps=5,
         duration_sec=None,
-        source_type="VIDEO"
+        source_type="VIDEO",
+        camera_id=None,
+        workers=None
     ):
         # `duration_sec` and `source_type` are kept for backward compatibility
         # with older callers that still pass these arguments.
+        workers = workers or self.settings.CROWD_SEGMENT_WORKERS
+        if workers > 1 and isinstance(video_source, str) and os.path.isfile(video_source):
+            if duration_sec:
+                Logger.warning("duration_sec diabaikan pada mode segmen: seluruh video diproses")
+            return self.crowd_detector.detect_from_video_segmented(
+                video_source=video_source,
+                workers=workers,
+                is_outdoor=is_outdoor,
+                sample_fps=sample_fps,
+                source_type=source_type,
+                camera_id=camera_id
+            )
         return self.crowd_detector.detect_from_video(
             video_source=video_source,
             output_path=output_path,
             is_outdoor=is_outdoor,
             sample_fps=sample_fps,
             duration_sec=duration_sec,
-            source_type=source_type
+            source_type=source_type,
+            camera_id=camera_id
+        )
+
+    def iter_crowd_video(
+        self,
+        video_source,
+        is_outdoor=False,
+        sample_fps=5,
+        duration_sec=None,
+        source_type="VIDEO",
+        camera_id=None
+    ):
+        """Record crowd detection bertahap (lihat CrowdDetectionComplete.iter_video)"""
+        return self.crowd_detector.iter_video(
+            video_source=video_source,
+            is_outdoor=is_outdoor,
+            sample_fps=sample_fps,
+            duration_sec=duration_sec,
+            source_type=source_type,
+            camera_id=camera_id
+        )
+
+    def summarize_crowd_records(self, records, source_type="VIDEO", camera_id=None, on_record=None):
+        """
+        Summary dari record iter_crowd_video (reducer sama dengan detect_from_video:
+        detection log di-spill ke CROWD_LOG_SPILL_DIR jika diatur)
+
+        on_record(record, reducer): dipanggil per record, mis. progres UI (optional)
+        """
+        reducer = self.crowd_detector._new_summary(source_type, camera_id)
+        for record in records:
+            reducer.add(record)
+            if on_record is not None:
+                on_record(record, reducer)
+        return reducer.summary()
+
+    def recognize_from_crowd_cameras(self, cameras=None, duration_sec=None, workers=None):
+        """
+        Crowd detection banyak kamera sekaligus dengan satu set model
+
+        cameras: list dict (camera_id, source, sample_fps, priority, is_outdoor);
+        default Settings.CROWD_CAMERAS. Return dict camera_id -> summary.
+        """
+        service = CrowdService(
+            self.crowd_detector,
+            workers=workers or self.settings.CROWD_SERVICE_WORKERS,
+            queue_size=self.settings.CAPTURE_QUEUE_SIZE,
+            seek_min_interval_ms=self.settings.CAPTURE_SEEK_MIN_INTERVAL_MS
         )
+        for camera in (self.settings.CROWD_CAMERAS if cameras is None else cameras):
+            service.add_camera(**camera)
+        return service.run(duration_sec=duration_sec)
 
     def show_menu(self):
         while True:
@@ -153,11 +282,12 @@ class FaceAccessSystem:
     def _menu_recognition(self):
         self.recognize_face()
 
-    def recognize_from_crowd_image(self, image_path, is_outdoor=False, source_type="IMAGE"):
+    def recognize_from_crowd_image(self, image_path, is_outdoor=False, source_type="IMAGE", camera_id=None):
         return self.crowd_detector.detect_from_image(
             image_source=image_path,
             is_outdoor=is_outdoor,
-            source_type=source_type
+            source_type=source_type,
+            camera_id=camera_id
         )
 
     def recognize_from_crowd_video_legacy(
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Migrasi penyimpanan embedding di tabel face_embedding
+
+Contoh:
+    python migrate_embeddings.py --to gallery
+    python migrate_embeddings.py --to blob --batch-size 1000
+"""
+
+import argparse
+import numpy as np
+from config.settings import Settings
+from db.database import Database
+from db.embedding_repo import EmbeddingRepository
+from db.gallery_file import GalleryFile
+from utils.logger import Logger
+
+
+def _fetch_rows(database):
+    """Return list (embedding_id, id_pegawai, embedding_vector) urut embedding_id"""
+    conn = database.get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT embedding_id, id_pegawai, embedding_vector FROM face_embedding ORDER BY embedding_id"
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _iter_row_batches(database, batch_size):
+    """Iterasi (embedding_id, id_pegawai, embedding_vector) per batch (keyset pagination)"""
+    last_id = 0
+    while True:
+        conn = database.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT embedding_id, id_pegawai, embedding_vector FROM face_embedding "
+                "WHERE embedding_id > %s ORDER BY embedding_id LIMIT %s",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _update_vectors(database, updates, batch_size):
+    """UPDATE embedding_vector per batch; updates: list (embedding_vector, embedding_id)"""
+    conn = database.get_connection()
+    cursor = conn.cursor()
+    try:
+        for start in range(0, len(updates), batch_size):
+            batch = updates[start:start + batch_size]
+            cursor.executemany(
+                "UPDATE face_embedding SET embedding_vector = %s WHERE embedding_id = %s",
+                batch
+            )
+            conn.commit()
+            Logger.info(f"Updated {start + len(batch)}/{len(updates)} rows")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def _load_gallery_matrix(repo):
+    """Salin isi gallery file ke memori (file bisa ditulis ulang saat migrasi)"""
+    if not repo.gallery_file.exists():
+        return None
+    _, gallery_matrix = repo.gallery_file.load()
+    return np.array(gallery_matrix)
+
+
+def _decode_rows(repo, rows, gallery_matrix):
+    """Decode semua baris ke (embedding_id, id_pegawai, embedding float32)"""
+    decoded = []
+    skipped = 0
+    for embedding_id, id_pegawai, blob in rows:
+        row = GalleryFile.parse_ref(blob)
+        if row is not None:
+            embedding = gallery_matrix[row] if gallery_matrix is not None and row < len(gallery_matrix) else None
+        elif EmbeddingRepository.is_raw_blob(blob):
+            embedding = np.frombuffer(blob, dtype="<f4")
+        else:
+            embedding = repo._decode_legacy(blob)
+
+        if embedding is None:
+            Logger.warning(f"Embedding {embedding_id} (pegawai {id_pegawai}) tidak bisa dibaca, dilewati")
+            skipped += 1
+            continue
+        decoded.append((embedding_id, id_pegawai, np.asarray(embedding, dtype=np.float32).reshape(-1)))
+
+    return decoded, skipped
+
+
+def migrate_to_gallery(database, repo, batch_size=500):
+    """Konversi semua embedding (.pkl / pickle) ke satu gallery file memmap"""
+    rows = _fetch_rows(database)
+    decoded, skipped = _decode_rows(repo, rows, _load_gallery_matrix(repo))
+    if not decoded:
+        Logger.warning("Tidak ada embedding untuk dimigrasi")
+        return 0
+
+    ids = np.array([id_pegawai for _, id_pegawai, _ in decoded], dtype=np.int64)
+    matrix = np.stack([embedding for _, _, embedding in decoded])
+    repo.gallery_file.write_all(ids, matrix)
+    Logger.success(f"Gallery file ditulis: {repo.gallery_file.path} ({len(ids)} baris)")
+
+    updates = [(GalleryFile.make_ref(i), embedding_id) for i, (embedding_id, _, _) in enumerate(decoded)]
+    _update_vectors(database, updates, batch_size)
+
+    Logger.success(f"Migrasi selesai: {len(decoded)} dimigrasi, {skipped} dilewati")
+    Logger.info("File .pkl lama tidak dihapus; hapus manual setelah verifikasi")
+    return len(decoded)
+
+
+def migrate_to_blob(database, repo, batch_size=500):
+    """Tulis ulang embedding_vector menjadi buffer float32 mentah, per batch"""
+    migrated = 0
+    skipped = 0
+    gallery_matrix = _load_gallery_matrix(repo)
+    for rows in _iter_row_batches(database, batch_size):
+        # Baris yang sudah berformat blob tidak perlu ditulis ulang
+        pending = [row for row in rows if not EmbeddingRepository.is_raw_blob(row[2])]
+        decoded, batch_skipped = _decode_rows(repo, pending, gallery_matrix)
+        skipped += batch_skipped
+
+        updates = [(EmbeddingRepository.to_blob(embedding), embedding_id)
+                   for embedding_id, _, embedding in decoded]
+        if updates:
+            _update_vectors(database, updates, batch_size)
+        migrated += len(updates)
+
+    Logger.success(f"Migrasi selesai: {migrated} dimigrasi, {skipped} dilewati")
+    Logger.info("File .pkl / gallery lama tidak dihapus; hapus manual setelah verifikasi")
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrasi penyimpanan embedding")
+    parser.add_argument("--to", choices=["gallery", "blob"], required=True,
+                        help="Format tujuan penyimpanan embedding")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    settings = Settings()
+    database = Database(settings.DB_CONFIG)
+    if not database.connect():
+        raise SystemExit("Database connection failed")
+
+    try:
+        repo = EmbeddingRepository(database)
+        if args.to == "gallery":
+            migrate_to_gallery(database, repo, batch_size=args.batch_size)
+        elif args.to == "blob":
+            migrate_to_blob(database, repo, batch_size=args.batch_size)
+        Logger.info(f"Set Settings.EMBEDDING_STORAGE = '{args.to}' untuk enrollment berikutnya")
+    finally:
+        database.close()
+
+
+if __name__ == "__main__":
+    main()
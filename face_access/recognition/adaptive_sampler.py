@@ -0,0 +1,87 @@
+"""
+Laju sampel video crowd yang mengikuti aktivitas scene
+"""
+
+
+class AdaptiveSampler:
+    """
+    Sampling adaptif per sumber video
+
+    Track baru -> laju langsung ke max_fps (orang yang baru masuk tidak terlewat).
+    Wajah terdeteksi -> laju naik (x step) sampai max_fps.
+    idle_frames frame sampel berturut-turut tanpa wajah (stage0_no_face) -> laju turun
+    (/ step) sampai min_fps.
+
+    Setiap perubahan laju dicatat di timeline (posisi video, frame, fps, alasan).
+    """
+
+    def __init__(self, base_fps, min_fps=1.0, max_fps=10.0, idle_frames=3, step=2.0):
+        """
+        Args:
+            base_fps: laju awal (sample_fps pemanggil), dibatasi ke [min_fps, max_fps]
+            min_fps, max_fps: batas laju sampel
+            idle_frames: frame sampel tanpa wajah berturut-turut sebelum laju turun
+            step: faktor naik/turun laju
+        """
+        self.min_fps = max(0.01, float(min_fps))
+        self.max_fps = max(self.min_fps, float(max_fps))
+        self.idle_frames = max(1, int(idle_frames))
+        self.step = max(1.01, float(step))
+
+        self.fps = min(self.max_fps, max(self.min_fps, float(base_fps)))
+        self._idle = 0
+        self.timeline = [{'position_ms': 0.0, 'frame': 0, 'fps': self.fps, 'reason': 'start'}]
+
+        self.sampled_frames = 0
+        self._first_ms = None
+        self._last_ms = None
+
+    @property
+    def interval_ms(self):
+        return 1000.0 / self.fps
+
+    def update(self, position_ms, frame_num, faces_present, new_tracks=0):
+        """Catat hasil satu frame sampel; return True jika laju berubah"""
+        self.sampled_frames += 1
+        if self._first_ms is None:
+            self._first_ms = position_ms
+            self.timeline[0].update(position_ms=round(position_ms, 1), frame=frame_num)
+        self._last_ms = position_ms
+
+        if new_tracks > 0:
+            self._idle = 0
+            return self._set(self.max_fps, position_ms, frame_num, 'new_track')
+        if faces_present:
+            self._idle = 0
+            return self._set(self.fps * self.step, position_ms, frame_num, 'faces')
+
+        self._idle += 1
+        if self._idle < self.idle_frames:
+            return False
+        self._idle = 0
+        return self._set(self.fps / self.step, position_ms, frame_num, 'no_face')
+
+    def stats(self):
+        span_s = ((self._last_ms or 0.0) - (self._first_ms or 0.0)) / 1000
+        return {
+            'min_fps': self.min_fps,
+            'max_fps': self.max_fps,
+            'current_fps': round(self.fps, 3),
+            # Rata-rata laju sampel yang benar-benar terjadi sepanjang sumber
+            'effective_fps': round((self.sampled_frames - 1) / span_s, 3) if span_s > 0 else round(self.fps, 3),
+            'changes': len(self.timeline) - 1,
+            'timeline': self.timeline
+        }
+
+    def _set(self, fps, position_ms, frame_num, reason):
+        fps = min(self.max_fps, max(self.min_fps, fps))
+        if abs(fps - self.fps) < 1e-6:
+            return False
+        self.fps = fps
+        self.timeline.append({
+            'position_ms': round(position_ms, 1),
+            'frame': frame_num,
+            'fps': round(fps, 3),
+            'reason': reason
+        })
+        return True
@@ -2,9 +2,24 @@
 Complete Crowd Detection System dengan 5-Stage Filtering & Normalization
 """
 
+import os
 import cv2
+import heapq
 import numpy as np
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from insightface.app.common import Face
+from core.capture import CaptureReader
 from utils.logger import Logger
+from utils.math_utils import nms
+from recognition.crowd_stream import CrowdStream, CrowdSummary
+from recognition.detection_log import (
+    DetectionLog, DetectionLogWriter, export_columnar, new_log_path, person_stats
+)
+from recognition.motion_gate import MotionGate
+from recognition.frame_budget import FrameBudget
+from recognition.adaptive_sampler import AdaptiveSampler
+from recognition.roi import RoiStore
 from datetime import datetime
 import time
 
@@ -56,6 +71,44 @@ class CrowdDetectionComplete:
         
         # Recognition
         self.SIMILARITY_THRESHOLD = 0.5
+        
+        # Detection mode (full / tiled / adaptive) untuk frame CCTV resolusi tinggi
+        self.DETECTION_MODE = settings.CROWD_DETECTION_MODE
+        self.TILE_SIZE = settings.CROWD_TILE_SIZE
+        self.TILE_OVERLAP = settings.CROWD_TILE_OVERLAP
+        self.TILE_NMS_IOU = settings.CROWD_TILE_NMS_IOU
+        self.SMALL_FACE_PX = settings.CROWD_SMALL_FACE_PX
+        self.DETECTION_SCALE = settings.CROWD_DETECTION_SCALE
+        
+        # Tracking (video): template top-k kualitas per track, satu keputusan per track
+        self.TRACKING = settings.CROWD_TRACKING
+        self.TRACK_IOU_THRESHOLD = settings.TRACK_IOU_THRESHOLD
+        self.TRACK_MAX_AGE = settings.TRACK_MAX_AGE
+        self.TRACK_TOP_K = settings.TRACK_TOP_K
+        
+        # Motion gate (video): deteksi dilewati pada frame tanpa gerakan
+        self.MOTION_GATE_ENABLED = settings.MOTION_GATE_ENABLED
+        
+        # Deadline per frame sampel sumber live: degradasi bertahap saat pipeline tertinggal
+        self.DEADLINE_ENABLED = settings.CROWD_DEADLINE_ENABLED
+        
+        # Sampling adaptif (video): laju sampel mengikuti ada/tidaknya wajah
+        self.ADAPTIVE_SAMPLING = settings.CROWD_ADAPTIVE_SAMPLING
+        
+        # ROI per kamera: deteksi hanya di crop ROI, wajah di luar ROI dibuang
+        self.roi_store = RoiStore(settings.resolve_path(settings.ROI_DIR))
+        self._tile_pool = None
+        if settings.CROWD_TILE_WORKERS > 1:
+            self._tile_pool = ThreadPoolExecutor(max_workers=settings.CROWD_TILE_WORKERS)
+        
+        # Detection log video di disk (JSONL append-only); None = list di memori
+        self.LOG_SPILL_DIR = None
+        if settings.CROWD_LOG_SPILL_DIR:
+            self.LOG_SPILL_DIR = settings.resolve_path(settings.CROWD_LOG_SPILL_DIR)
+        self.LOG_SORT_RUN = max(1, int(settings.CROWD_LOG_SORT_RUN))
+        
+        # Repo memakai satu koneksi MySQL; CrowdService memproses beberapa kamera paralel
+        self._db_lock = threading.RLock()
     
     def detect_from_video(
         self,
@@ -64,34 +117,109 @@ class CrowdDetectionComplete:
         is_outdoor=False,
         sample_fps=5,
         duration_sec=None,
-        source_type="VIDEO"
+        source_type="VIDEO",
+        camera_id=None,
+        start_ms=None,
+        end_ms=None,
+        display=True,
+        log_unknown=True,
+        defer_edge_logs=False
     ):
         """
-        Main detection dari video/webcam
+        Main detection dari video/webcam: summary dibangun incremental dari iter_video
         
         Args:
             video_source: Path video atau 0 untuk webcam
             output_path: Path output video (optional)
             is_outdoor: True jika outdoor (blur threshold lebih tinggi)
-            sample_fps: Process N frame per second
+            sample_fps: Process N frame per second (boleh pecahan, mis. 0.2 = satu frame per 5 detik);
+                dengan CROWD_ADAPTIVE_SAMPLING hanya laju awal
             duration_sec: Stop processing after N seconds (optional)
+            camera_id: ID kamera untuk ROI tersimpan (optional)
+            start_ms, end_ms: proses hanya segmen [start, end) dari file video (optional)
+            display: tampilkan jendela preview OpenCV
+            log_unknown: tulis crowd_log UNKNOWN jika tidak ada yang dikenali
+            defer_edge_logs: segmen dari detect_from_video_segmented; crowd_log track di
+                batas segmen ditulis merge_summaries setelah digabung dengan segmen tetangga
+        """
+        reducer = self._new_summary(source_type, camera_id)
+        for record in self.iter_video(
+            video_source,
+            output_path=output_path,
+            is_outdoor=is_outdoor,
+            sample_fps=sample_fps,
+            duration_sec=duration_sec,
+            source_type=source_type,
+            camera_id=camera_id,
+            start_ms=start_ms,
+            end_ms=end_ms,
+            display=display,
+            log_unknown=log_unknown,
+            defer_edge_logs=defer_edge_logs
+        ):
+            reducer.add(record)
+        return reducer.summary()
+    
+    def iter_video(
+        self,
+        video_source,
+        output_path=None,
+        is_outdoor=False,
+        sample_fps=5,
+        duration_sec=None,
+        source_type="VIDEO",
+        camera_id=None,
+        start_ms=None,
+        end_ms=None,
+        display=False,
+        log_unknown=True,
+        defer_edge_logs=False
+    ):
+        """
+        Generator record hasil crowd detection selama video diproses (argumen = detect_from_video)
+        
+        Yield record 'frame' per frame yang diproses, 'detection' per keputusan (per track
+        yang selesai), dan satu 'end' di akhir (lihat CrowdStream). Tidak ada yang
+        diakumulasi di sini: memori tetap, pemanggil memilih apa yang disimpan
+        (CrowdSummary untuk summary detect_from_video). Tidak ada record jika sumber gagal dibuka.
+        
+        Jika generator ditutup sebelum habis (close()/break pemanggil), track yang masih aktif
+        tetap diputuskan dan ditulis ke crowd_log, tapi record 'detection' sisanya dan
+        record 'end' tidak di-yield.
         """
         Logger.info(f"Starting crowd detection from video: {video_source}")
         
-        cap = cv2.VideoCapture(video_source)
-        if not cap.isOpened():
+        # Decode di thread terpisah: file lewat antrian terbatas, webcam/stream frame terbaru.
+        # Sampel mengikuti timestamp; tanpa writer frame non-sampel hanya di-grab (atau di-seek)
+        sample_fps = max(0.01, float(sample_fps))
+        sampler = self._build_sampler(sample_fps)
+        cap = CaptureReader(
+            video_source,
+            queue_size=self.settings.CAPTURE_QUEUE_SIZE,
+            sample_interval_ms=sampler.interval_ms if sampler is not None else 1000.0 / sample_fps,
+            decode_all=bool(output_path),
+            seek_min_interval_ms=self._seek_min_interval(self.settings.CAPTURE_SEEK_MIN_INTERVAL_MS, sampler),
+            start_ms=start_ms,
+            end_ms=end_ms
+        )
+        if not cap.open():
+            cap.release()
             Logger.error("Failed to open video source")
-            return None
+            return
         
         # Video properties
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
+        fps = int(cap.fps)
         if fps <= 0:
             # Webcam/device streams can return 0 FPS metadata.
             fps = 30
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        width = cap.width
+        height = cap.height
         
-        Logger.info(f"Video: {width}x{height} @ {fps}fps")
+        if sampler is not None:
+            sampling = f"adaptive {sampler.min_fps:g}-{sampler.max_fps:g} fps"
+        else:
+            sampling = f"{sample_fps:g} fps"
+        Logger.info(f"Video: {width}x{height} @ {fps}fps, sampling {sampling} ({cap.stats()['ingest']})")
         
         # Video writer
         writer = None
@@ -99,140 +227,351 @@ class CrowdDetectionComplete:
             fourcc = cv2.VideoWriter_fourcc(*'mp4v')
             writer = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
         
-        # Set blur threshold based on environment
-        blur_threshold = self.BLUR_OUTDOOR if is_outdoor else self.BLUR_INDOOR
-        
-        # Tracking
-        detection_log = []  # Log semua deteksi
-        unique_people = {}  # Track unique people
-        filtered_totals = {
-            'stage0_no_face': 0,
-            'stage1_detection': 0,
-            'stage2_size': 0,
-            'stage3_blur': 0,
-            'stage4_pose': 0,
-            'stage5_landmark': 0
-        }
+        # State per sumber: tracker, motion gate, ROI, budget & sampler
+        stream = CrowdStream(
+            self,
+            is_outdoor=is_outdoor,
+            source_type=source_type,
+            camera_id=camera_id,
+            budget=self._build_frame_budget(sample_fps) if cap.live else None,
+            sampler=sampler,
+            defer_start=defer_edge_logs and bool(start_ms),
+            defer_end=defer_edge_logs and end_ms is not None
+        )
         frame_count = 0
-        sampled_frame_count = 0
-        sample_fps = max(1, int(sample_fps))
-        process_interval = max(1, fps // sample_fps)  # Process every N frames
         start_time = time.time()
-        
-        while True:
-            if duration_sec and (time.time() - start_time) >= duration_sec:
-                Logger.info(f"Reached duration limit: {duration_sec}s")
-                break
+        source_ended = False
+        
+        # finally: sumber & writer tetap dilepas jika pemanggil berhenti di tengah
+        try:
+            while True:
+                if duration_sec and (time.time() - start_time) >= duration_sec:
+                    Logger.info(f"Reached duration limit: {duration_sec}s")
+                    break
 
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            frame_count += 1
-            
-            # Sample frames
-            if frame_count % process_interval != 0:
+                ret, frame = cap.read(timeout=5.0)
+                if not ret:
+                    source_ended = True
+                    break
+                
+                frame_count = cap.frame_index
+                
+                # Sample frames (berdasarkan timestamp, ditandai CaptureReader);
+                # motion gate: frame tanpa perubahan berarti tidak dideteksi
+                skip_reason = stream.skip_reason(frame) if cap.is_sample else None
+                if skip_reason is not None:
+                    stream.skip(frame_count, cap.position_ms, skip_reason)
+                    if sampler is not None:
+                        cap.set_sample_interval(sampler.interval_ms)
+                if not cap.is_sample or skip_reason is not None:
+                    if writer:
+                        writer.write(frame)
+                    continue
+                
+                # Process frame dengan 5-stage filtering
+                records = stream.process(frame, frame_count, cap.position_ms)
+                if sampler is not None:
+                    cap.set_sample_interval(sampler.interval_ms)
+                annotated_frame = records[0]['annotated_frame']
+                
+                # Write annotated frame
                 if writer:
-                    writer.write(frame)
-                continue
-            
-            # Process frame dengan 5-stage filtering
-            result = self._process_frame_5stage(
-                frame, 
-                frame_count, 
-                blur_threshold
-            )
-            sampled_frame_count += 1
-            for key in filtered_totals:
-                filtered_totals[key] += result['filtered'].get(key, 0)
-            
-            # Log detections
-            timestamp = datetime.now()
-            for person in result['detected']:
-                detection_log.append({
-                    'frame': frame_count,
-                    'timestamp': timestamp,
-                    'id_pegawai': person['id_pegawai'],
-                    'nama': person['nama'],
-                    'nip': person['nip'],
-                    'similarity': person['similarity'],
-                    'bbox': person['bbox']
-                })
+                    writer.write(annotated_frame)
                 
-                # Track unique people
-                id_peg = person['id_pegawai']
-                if id_peg not in unique_people:
-                    unique_people[id_peg] = {
-                        'nama': person['nama'],
-                        'nip': person['nip'],
-                        'first_seen': frame_count,
-                        'last_seen': frame_count,
-                        'count': 0
-                    }
-                unique_people[id_peg]['last_seen'] = frame_count
-                unique_people[id_peg]['count'] += 1
-
-                # Persist crowd detection to DB (no frame/similarity in table schema)
-                try:
-                    self.log_repo.log_crowd_detection(
-                        id_pegawai=person['id_pegawai'],
-                        nama=person['nama'],
-                        nip=person['nip'],
-                        source_type=source_type
-                    )
-                except Exception as e:
-                    Logger.error(f"Failed to write crowd_log: {e}")
-            
-            # Write annotated frame
+                yield from records
+                
+                # Display
+                if display:
+                    cv2.imshow('Crowd Detection', annotated_frame)
+                    if cv2.waitKey(1) & 0xFF == ord('q'):
+                        Logger.warning("Stopped by user")
+                        break
+        except GeneratorExit:
+            # Pemanggil menutup generator di tengah: track yang masih aktif tetap
+            # diputuskan (crowd_log ditulis), record-nya tidak bisa di-yield lagi
+            stream.finish(frame_count, capture_stats=cap.stats(), log_unknown=log_unknown)
+            raise
+        finally:
+            # Cleanup
+            cap.release()
             if writer:
-                writer.write(result['annotated_frame'])
-            
-            # Display
-            cv2.imshow('Crowd Detection', result['annotated_frame'])
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                Logger.warning("Stopped by user")
-                break
-        
-        # Cleanup
-        cap.release()
-        if writer:
-            writer.release()
-        cv2.destroyAllWindows()
-        
-        # Summary
-        summary = {
-            'total_frames': frame_count,
-            'processed_frames': sampled_frame_count,
+                writer.release()
+            if display:
+                cv2.destroyAllWindows()
+        
+        if source_ended:
+            # Frame yang hanya di-grab/di-seek tetap dihitung
+            frame_count = max(frame_count, cap.source_frames)
+            if end_ms is None:
+                frame_count = max(frame_count, cap.frame_count)
+        
+        # Track yang masih aktif di akhir video tetap diputuskan
+        yield from stream.finish(frame_count, capture_stats=cap.stats(), log_unknown=log_unknown)
+    
+    def detect_from_video_segmented(
+        self,
+        video_source,
+        workers=2,
+        is_outdoor=False,
+        sample_fps=5,
+        source_type="VIDEO",
+        camera_id=None
+    ):
+        """
+        Detection file video panjang: dibagi per segmen waktu, tiap segmen di proses worker
+        terpisah (detector & VideoCapture sendiri), lalu summary digabung deterministik
+        """
+        from recognition.segmented import run_segments
+        
+        summaries = run_segments(
+            video_source,
+            workers=workers,
+            is_outdoor=is_outdoor,
+            sample_fps=sample_fps,
+            source_type=source_type,
+            camera_id=camera_id
+        )
+        if summaries is None:
+            Logger.warning("Durasi video tidak diketahui, proses tanpa segmentasi")
+            return self.detect_from_video(
+                video_source, is_outdoor=is_outdoor, sample_fps=sample_fps,
+                source_type=source_type, camera_id=camera_id, display=False
+            )
+        
+        summary = self.merge_summaries(summaries, source_type=source_type)
+        if len(summary['detection_log']) == 0:
+            self._log_unknown(source_type)
+        
+        Logger.success(
+            f"Segmented detection complete ({len(summaries)} segmen)! Unique people: {summary['unique_people']}"
+        )
+        return summary
+    
+    def merge_summaries(self, summaries, source_type="VIDEO"):
+        """
+        Gabungkan summary detect_from_video per segmen (urutan segmen) menjadi satu summary
+        
+        detection_log diurutkan (frame, segmen, track) dan unique_people dibangun ulang
+        darinya, sehingga hasil tidak bergantung pada urutan selesainya worker.
+        Log di disk (DetectionLog) diurutkan sama lewat merge run terurut (memori sebatas satu run).
+        
+        Tiap worker punya tracker sendiri: track yang masih aktif di akhir segmen dan track
+        di frame pertama segmen berikutnya dengan id_pegawai sama digabung menjadi satu entry,
+        lalu crowd_log yang ditunda worker (defer_edge_logs) ditulis sekali per entry.
+        """
+        boundaries = self._resolve_segment_boundaries([summary['detection_log'] for summary in summaries])
+        unique_people = {}
+        if any(isinstance(summary['detection_log'], DetectionLog) for summary in summaries):
+            detection_log = self._merge_spilled_logs(summaries, unique_people, boundaries, source_type)
+        else:
+            detection_log = []
+            for index, summary in enumerate(summaries):
+                detection_log.extend(
+                    self._segment_entries(summary['detection_log'], index, boundaries, source_type)
+                )
+            detection_log.sort(key=self._log_order)
+            for entry in detection_log:
+                self._accumulate_person(unique_people, entry)
+        
+        filter_summary = {}
+        for summary in summaries:
+            for key, count in summary['filter_summary'].items():
+                filter_summary[key] = filter_summary.get(key, 0) + count
+        
+        processed = sum(summary['processed_frames'] for summary in summaries)
+        detect_ms_total = sum(
+            summary['detection']['avg_detect_ms'] * summary['processed_frames'] for summary in summaries
+        )
+        
+        merged = {
+            'total_frames': max([summary['total_frames'] for summary in summaries] or [0]),
+            'processed_frames': processed,
             'unique_people': len(unique_people),
             'people': list(unique_people.values()),
             'detection_log': detection_log,
-            'filter_summary': filtered_totals,
-            'failure_reasons': self._build_failure_reasons(filtered_totals, sampled_frame_count)
+            'filter_summary': filter_summary,
+            'failure_reasons': self._build_failure_reasons(filter_summary, processed),
+            'detection': self._detection_stats(detect_ms_total, processed),
+            'tracking': {
+                'enabled': any(summary['tracking']['enabled'] for summary in summaries),
+                'tracks': sum(summary['tracking']['tracks'] for summary in summaries),
+                'embedded_faces': sum(summary['tracking']['embedded_faces'] for summary in summaries),
+                'reused_faces': sum(summary['tracking']['reused_faces'] for summary in summaries)
+            },
+            'motion_gate': self._merge_counters([summary['motion_gate'] for summary in summaries]),
+            'capture': self._merge_counters([summary['capture'] for summary in summaries]),
+            'degradation': None,
+            'sampling': self._merge_sampling(summaries),
+            'segments': len(summaries),
+            'segment_boundaries': {
+                'merged_tracks': len(boundaries[1]),
+                'note': (
+                    "Track lintas batas segmen hanya digabung jika aktif tepat di batas dan "
+                    "id_pegawai sama; orang yang dikenali di satu sisi saja tetap bisa tercatat dua kali"
+                )
+            }
         }
-
-        # Tetap catat percobaan crowd meskipun tidak ada wajah yang recognized.
-        if len(detection_log) == 0:
-            try:
+        if merged['motion_gate']:
+            gate = merged['motion_gate']
+            gate['gated_ratio'] = round(gate['gated_frames'] / max(1, gate['checked_frames']), 3)
+        return merged
+    
+    @staticmethod
+    def _log_order(entry):
+        """Urutan detection_log gabungan: (frame, segmen, track); tanpa track = -1"""
+        track_id = entry.get('track_id')
+        return entry['frame'], entry['segment'], track_id if track_id is not None else -1
+    
+    def _merge_spilled_logs(self, summaries, unique_people, boundaries, source_type):
+        """
+        Gabung log segmen ke satu file baru dengan urutan yang sama seperti jalur di memori
+        
+        Log segmen tidak urut frame (entry ditulis saat track selesai), jadi entry ditulis
+        dulu ke run terurut berisi maksimal LOG_SORT_RUN entry, lalu semua run digabung
+        dengan heapq.merge. File segmen & run dihapus.
+        """
+        logs = [summary['detection_log'] for summary in summaries]
+        log_dir = self.LOG_SPILL_DIR
+        if log_dir is None:
+            log_dir = os.path.dirname(next(log.path for log in logs if isinstance(log, DetectionLog)))
+        
+        runs, run = [], []
+        
+        def write_run():
+            run.sort(key=self._log_order)
+            run_writer = DetectionLogWriter(new_log_path(log_dir, 'RUN'))
+            for entry in run:
+                run_writer.append(entry)
+            runs.append(run_writer.close())
+            run.clear()
+        
+        for index, log in enumerate(logs):
+            for entry in self._segment_entries(log, index, boundaries, source_type):
+                run.append(entry)
+                if len(run) >= self.LOG_SORT_RUN:
+                    write_run()
+        if run:
+            write_run()
+        
+        # Urutan stabil: entry dengan key sama tetap urut segmen/run seperti sort di memori
+        writer = DetectionLogWriter(new_log_path(log_dir, 'MERGED'))
+        for entry in heapq.merge(*runs, key=self._log_order):
+            writer.append(entry)
+            self._accumulate_person(unique_people, entry)
+        for log in logs + runs:
+            if isinstance(log, DetectionLog) and os.path.exists(log.path):
+                os.remove(log.path)
+        return writer.close()
+    
+    @staticmethod
+    def _resolve_segment_boundaries(logs):
+        """
+        Pasangkan track open_end segmen i dengan track open_start segmen i+1 (id_pegawai sama)
+        
+        Entry segmen i+1 dibuang dan dilebur ke entry segmen i (last_seen, similarity terbaik);
+        track yang membentang beberapa segmen dilebur berantai ke entry pertamanya.
+        Return (merged: key -> entry gabungan, dropped: set key); key = (segmen, track_id).
+        """
+        open_end, open_start = [], []
+        for log in logs:
+            ends, starts = [], []
+            for entry in log:
+                if entry.get('open_end'):
+                    ends.append(entry)
+                if entry.get('open_start'):
+                    starts.append(entry)
+            open_end.append(ends)
+            open_start.append(starts)
+        
+        merged, dropped, roots = {}, set(), {}
+        for index in range(len(logs) - 1):
+            candidates = list(open_start[index + 1])
+            for end in open_end[index]:
+                match = next((e for e in candidates if e['id_pegawai'] == end['id_pegawai']), None)
+                if match is None:
+                    continue
+                candidates.remove(match)
+                
+                key = roots.get((index, end['track_id']), (index, end['track_id']))
+                target = merged.get(key) or dict(end)
+                target['last_seen'] = max(target['last_seen'], match['last_seen'])
+                if match['similarity'] > target['similarity']:
+                    target.update(similarity=match['similarity'], frame=match['frame'], bbox=match['bbox'])
+                merged[key] = target
+                
+                match_key = (index + 1, match['track_id'])
+                dropped.add(match_key)
+                roots[match_key] = key
+        return merged, dropped
+    
+    def _segment_entries(self, log, index, boundaries, source_type):
+        """Entry satu segmen (diberi index segmen) setelah track lintas batas digabung"""
+        merged, dropped = boundaries
+        for entry in log:
+            key = (index, entry.get('track_id'))
+            if key in dropped:
+                continue
+            entry = dict(merged.get(key, entry), segment=index)
+            deferred = entry.pop('open_start', False)
+            deferred = entry.pop('open_end', False) or deferred
+            if deferred:
+                self._write_crowd_log(entry, source_type)
+            yield entry
+    
+    @staticmethod
+    def _merge_sampling(summaries):
+        """Timeline sampling adaptif per segmen digabung (entry diberi index segmen)"""
+        sampled = [(index, summary) for index, summary in enumerate(summaries) if summary.get('sampling')]
+        if not sampled:
+            return None
+        processed = sum(summary['processed_frames'] for _, summary in sampled)
+        first, last = sampled[0][1]['sampling'], sampled[-1][1]['sampling']
+        return {
+            'min_fps': first['min_fps'],
+            'max_fps': first['max_fps'],
+            'current_fps': last['current_fps'],
+            'effective_fps': round(sum(
+                summary['sampling']['effective_fps'] * summary['processed_frames'] for _, summary in sampled
+            ) / max(1, processed), 3),
+            'changes': sum(summary['sampling']['changes'] for _, summary in sampled),
+            'timeline': [
+                dict(entry, segment=index) for index, summary in sampled for entry in summary['sampling']['timeline']
+            ]
+        }
+    
+    @staticmethod
+    def _merge_counters(stats_list):
+        """Jumlahkan counter numerik; field non-numerik diambil dari stats pertama"""
+        stats_list = [stats for stats in stats_list if stats]
+        if not stats_list:
+            return None
+        merged = dict(stats_list[0])
+        for stats in stats_list[1:]:
+            for key, value in stats.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    merged[key] += value
+        return merged
+    
+    def _log_unknown(self, source_type):
+        try:
+            with self._db_lock:
                 self.log_repo.log_crowd_detection(
                     id_pegawai=None,
                     nama="UNKNOWN",
                     nip="-",
                     source_type=source_type
                 )
-            except Exception as e:
-                Logger.error(f"Failed to write unknown crowd_log: {e}")
-        
-        Logger.success(f"Detection complete! Unique people: {len(unique_people)}")
-        
-        return summary
+        except Exception as e:
+            Logger.error(f"Failed to write unknown crowd_log: {e}")
 
-    def detect_from_image(self, image_source, is_outdoor=False, source_type="IMAGE"):
+    def detect_from_image(self, image_source, is_outdoor=False, source_type="IMAGE", camera_id=None):
         """
         Detection dari satu gambar.
 
         Args:
             image_source: Path gambar
             is_outdoor: True jika outdoor (blur threshold lebih tinggi)
+            camera_id: ID kamera untuk ROI tersimpan (optional)
         """
         frame = cv2.imread(image_source)
         if frame is None:
@@ -240,7 +579,9 @@ class CrowdDetectionComplete:
             return None
 
         blur_threshold = self.BLUR_OUTDOOR if is_outdoor else self.BLUR_INDOOR
-        result = self._process_frame_5stage(frame, frame_num=1, blur_threshold=blur_threshold)
+        result = self._process_frame_5stage(
+            frame, frame_num=1, blur_threshold=blur_threshold, roi=self._load_roi(camera_id)
+        )
 
         unique_people = {}
         detection_log = []
@@ -261,7 +602,10 @@ class CrowdDetectionComplete:
                 'nama': person['nama'],
                 'nip': person['nip'],
                 'similarity': person['similarity'],
-                'bbox': person['bbox']
+                'bbox': person['bbox'],
+                'track_id': None,
+                'first_seen': 1,
+                'last_seen': 1
             })
             try:
                 self.log_repo.log_crowd_detection(
@@ -300,13 +644,26 @@ class CrowdDetectionComplete:
             'people': list(unique_people.values()),
             'detection_log': detection_log,
             'filter_summary': filter_summary,
-            'failure_reasons': self._build_failure_reasons(filter_summary, 1)
+            'failure_reasons': self._build_failure_reasons(filter_summary, 1),
+            'detection': self._detection_stats(result['detect_ms'], 1)
         }
     
-    def _process_frame_5stage(self, frame, frame_num, blur_threshold):
+    def _process_frame_5stage(self, frame, frame_num, blur_threshold, tracker=None, roi=None, budget=None):
         """
         Process single frame dengan 5-stage filtering
+        
+        tracker: FaceTracker video; semua wajah yang lolos stage 1 diasosiasikan ke track
+        (frame berkualitas rendah tidak memutus track), stage 2-5 hanya menentukan crop
+        yang di-embed. ArcFace dijalankan untuk crop yang masuk top-k kualitas track, atau
+        setiap crop layak selama identitas track belum recognized (re-match)
+        roi: RegionOfInterest kamera; deteksi hanya di crop ROI, wajah di luar ROI dibuang
+        budget: FrameBudget sumber live; level degradasi menurunkan skala deteksi,
+        melewati stage opsional dan memakai ulang identitas track
         """
+        scale = budget.detection_scale(self.DETECTION_SCALE) if budget is not None else self.DETECTION_SCALE
+        skip_optional = budget is not None and budget.skip_optional_stages
+        reuse_tracks = budget is not None and budget.reuse_tracks
+        
         h, w = frame.shape[:2]
         frame_area = h * w
         
@@ -321,13 +678,23 @@ class CrowdDetectionComplete:
         }
         
         # STAGE 1: Face Detection (RetinaFace + NMS built-in)
-        faces = self.detector.detect(frame)
+        # Hanya bbox + kps; ArcFace dijalankan nanti untuk wajah yang lolos filter
+        detect_start = time.perf_counter()
+        faces = self._detect_roi(frame, roi, scale=scale) if roi is not None else self._detect(frame, scale=scale)
+        detect_ms = (time.perf_counter() - detect_start) * 1000
+        filter_start = time.perf_counter()
         
         if len(faces) == 0:
             filtered_out['stage0_no_face'] = 1
         
+        # Salinan bersih: crop & embedding tidak boleh ikut box/label yang digambar di frame
+        source = frame.copy() if len(faces) > 0 else frame
+        
         # Get stored embeddings once
-        stored_embeddings = self.embedding_repo.get_all()
+        stored_embeddings = self._get_gallery()
+        tracked_faces = []  # Lolos stage 1: diasosiasikan ke tracker
+        accepted = []  # Index tracked_faces yang lolos semua stage (layak di-embed)
+        qualities = []
         
         for face in faces:
             bbox = face.bbox
@@ -338,10 +705,12 @@ class CrowdDetectionComplete:
                 filtered_out['stage1_detection'] += 1
                 self._draw_box(frame, bbox, "LOW CONF", (128, 128, 128))
                 continue
+            tracked_faces.append(face)
             
             # STAGE 2: Face Size Check
+            # Relatif terhadap jendela deteksi wajah ini: tile (det_area) atau seluruh frame
             face_area = (x2 - x1) * (y2 - y1)
-            size_ratio = face_area / frame_area
+            size_ratio = face_area / (face.det_area or frame_area)
             
             if size_ratio < self.FACE_SIZE_THRESHOLD:
                 filtered_out['stage2_size'] += 1
@@ -349,7 +718,7 @@ class CrowdDetectionComplete:
                 continue
             
             # Extract face region
-            face_img = frame[y1:y2, x1:x2]
+            face_img = source[max(0, y1):y2, max(0, x1):x2]
             if face_img.size == 0:
                 continue
             
@@ -381,32 +750,95 @@ class CrowdDetectionComplete:
             
             # ALL STAGES PASSED - Proceed to normalization & recognition
             
-            # Normalization
-            normalized_face = self._normalize_face(face_img)
-            
-            # Face Alignment (already done by InsightFace internally)
-            # But we validate alignment quality
-            if not self._validate_alignment(face):
-                self._draw_box(frame, bbox, "ALIGN FAIL", (180, 180, 180))
-                continue
+            # Normalization & validasi alignment: stage opsional, dilewati saat pipeline tertinggal
+            if not skip_optional:
+                normalized_face = self._normalize_face(face_img)
+                
+                # Face Alignment (already done by InsightFace internally)
+                # But we validate alignment quality
+                if not self._validate_alignment(face):
+                    self._draw_box(frame, bbox, "ALIGN FAIL", (180, 180, 180))
+                    continue
             
-            # Extract embedding (ArcFace via InsightFace)
-            embedding = face.normed_embedding
+            # Embedding (ArcFace via InsightFace) dicocokkan setelah semua wajah difilter
+            accepted.append(len(tracked_faces) - 1)
+            qualities.append(self._face_quality(
+                blur_score, (yaw, pitch, roll), landmark_quality['eye_distance'], blur_threshold
+            ))
+        
+        filter_ms = (time.perf_counter() - filter_start) * 1000
+        
+        accepted_faces = [tracked_faces[i] for i in accepted]
+        tracks = [None] * len(accepted_faces)
+        if tracker is not None:
+            all_tracks = tracker.update([face.bbox for face in tracked_faces])
+            tracks = [all_tracks[i] for i in accepted]
+            for track in all_tracks:
+                track.mark_seen(frame_num)
+        
+        # ArcFace on-demand (satu batch) hanya untuk wajah yang lolos 5 stage dan, bila
+        # di-track, kualitasnya masuk top-k track atau identitas track belum recognized
+        # (saat degradasi: hanya track yang belum punya sampel)
+        def needs_embedding(i):
+            track = tracks[i]
+            if track is None:
+                return True
+            if reuse_tracks and track.samples:
+                return False
+            return (track.accepts(qualities[i], self.TRACK_TOP_K)
+                    or track.is_uncertain(self.SIMILARITY_THRESHOLD))
+        
+        to_embed = [i for i in range(len(accepted_faces)) if needs_embedding(i)]
+        embed_start = time.perf_counter()
+        embeddings = self.embedding_extractor.extract_faces(source, [accepted_faces[i] for i in to_embed])
+        embed_ms = (time.perf_counter() - embed_start) * 1000
+        match_start = time.perf_counter()
+        
+        matches = [None] * len(accepted_faces)
+        if tracker is None:
+            for i, match in zip(to_embed, self.matcher.match_batch(embeddings, stored_embeddings)):
+                matches[i] = match
+        else:
+            # Re-match: track yang template-nya belum recognized tetapi crop baru recognized
+            # sendiri dimulai ulang dari crop itu (sampel lama tidak cocok dengan gallery)
+            rematch = [k for k, i in enumerate(to_embed)
+                       if tracks[i].samples and tracks[i].is_uncertain(self.SIMILARITY_THRESHOLD)]
+            if rematch:
+                singles = self.matcher.match_batch([embeddings[k] for k in rematch], stored_embeddings)
+                for k, (employee_id, similarity) in zip(rematch, singles):
+                    track = tracks[to_embed[k]]
+                    if employee_id and similarity >= self.SIMILARITY_THRESHOLD and similarity > track.similarity:
+                        track.reset_samples()
             
-            # Match with database
-            employee_id, similarity = self.matcher.match(embedding, stored_embeddings)
+            # Template track yang berubah dicocokkan ulang (GEMM kecil) untuk label sementara
+            updated = []
+            for i, embedding in zip(to_embed, embeddings):
+                tracks[i].add_sample(qualities[i], embedding, frame_num, accepted_faces[i].bbox, self.TRACK_TOP_K)
+                updated.append(tracks[i])
+            templates = [track.template() for track in updated]
+            for track, match in zip(updated, self.matcher.match_batch(templates, stored_embeddings)):
+                track.set_identity(*match)
+        
+        for i, face in enumerate(accepted_faces):
+            bbox = face.bbox
+            track = tracks[i]
+            if matches[i] is not None:
+                employee_id, similarity = matches[i]
+            else:
+                employee_id, similarity = track.identity, track.similarity
             
             # Draw result
             if employee_id and similarity >= self.SIMILARITY_THRESHOLD:
                 # RECOGNIZED - Green box
-                employee = self.pegawai_repo.get_by_id(employee_id)
+                employee = self._get_employee(employee_id)
                 
                 detected_people.append({
                     'id_pegawai': employee_id,
                     'nama': employee['nama'],
                     'nip': employee['nip'],
                     'similarity': similarity,
-                    'bbox': bbox
+                    'bbox': bbox,
+                    'track_id': track.track_id if track is not None else None
                 })
                 
                 self._draw_recognized(frame, bbox, employee['nama'], similarity)
@@ -420,9 +852,315 @@ class CrowdDetectionComplete:
         return {
             'detected': detected_people,
             'filtered': filtered_out,
-            'annotated_frame': frame
+            'annotated_frame': frame,
+            'detect_ms': detect_ms,
+            'stage_ms': {
+                'detect': detect_ms,
+                'filter': filter_ms,
+                'embed': embed_ms,
+                'match': (time.perf_counter() - match_start) * 1000
+            },
+            'embedded': len(to_embed),
+            'reused': len(accepted_faces) - len(to_embed)
         }
 
+    def _detect(self, frame, fit_input=False, scale=None):
+        """
+        Stage 1 sesuai DETECTION_MODE
+        
+        DETECTION_SCALE < 1.0: deteksi pada salinan frame diperkecil, lalu bbox & kps
+        dipetakan balik sehingga crop, align & ArcFace memakai piksel resolusi asli.
+        fit_input: input RetinaFace dibatasi ukuran frame (crop ROI tidak di-upscale).
+        scale: override DETECTION_SCALE (degradasi FrameBudget).
+        """
+        scale = self.DETECTION_SCALE if scale is None else scale
+        if scale >= 1.0:
+            input_size = self.detector.fit_input_size(frame) if fit_input else None
+            return self._detect_mode(frame, input_size=input_size)
+        
+        small, factors = self.detector.downscale(frame, scale)
+        small_faces = self._detect_mode(small, input_size=self.detector.fit_input_size(small))
+        faces = self.detector.rescale_faces(small_faces, factors)
+        for face, small_face in zip(faces, small_faces):
+            if small_face.det_area:
+                face.det_area = small_face.det_area * factors[0] * factors[1]
+        return faces
+    
+    def _detect_roi(self, frame, roi, scale=None):
+        """Deteksi hanya pada bounding crop ROI; wajah yang titik tengahnya di luar ROI dibuang"""
+        h, w = frame.shape[:2]
+        rects = roi.crop_rects(w, h)
+        faces = []
+        for x1, y1, x2, y2 in rects:
+            crop_faces = self._detect(frame[y1:y2, x1:x2], fit_input=True, scale=scale)
+            faces.extend(self._offset_faces(crop_faces, x1, y1))
+        if len(rects) > 1:
+            faces = self._merge_faces(faces)
+        return [face for face in faces if roi.contains(face.bbox, w, h)]
+    
+    def _load_roi(self, camera_id):
+        if camera_id is None:
+            return None
+        try:
+            roi = self.roi_store.get(camera_id)
+        except Exception as e:
+            Logger.error(f"Failed to load ROI for camera {camera_id}: {e}")
+            return None
+        if roi is None or roi.is_empty:
+            return None
+        Logger.info(f"ROI camera {camera_id}: {len(roi.include)} include, {len(roi.exclude)} exclude")
+        return roi
+    
+    @staticmethod
+    def _offset_faces(faces, x, y):
+        """Geser bbox & kps hasil deteksi crop ke koordinat frame (det_area ikut disalin)"""
+        if x == 0 and y == 0:
+            return faces
+        offset = np.array([x, y], dtype=np.float32)
+        return [
+            Face(
+                bbox=face.bbox + np.tile(offset, 2),
+                kps=face.kps + offset if face.kps is not None else None,
+                det_score=face.det_score,
+                det_area=face.det_area
+            )
+            for face in faces
+        ]
+    
+    def _detect_mode(self, frame, input_size=None):
+        if self.DETECTION_MODE == 'tiled':
+            h, w = frame.shape[:2]
+            return self._detect_tiled(frame, self._tile_grid(w, h))
+        if self.DETECTION_MODE == 'adaptive':
+            return self._detect_adaptive(frame, input_size)
+        return self.detector.detect_faces(frame, input_size=input_size)
+    
+    def _tile_grid(self, width, height):
+        """Tile overlap berukuran TILE_SIZE yang menutup seluruh frame; tile terakhir rata tepi"""
+        def starts(length):
+            size = min(self.TILE_SIZE, length)
+            step = max(1, int(size * (1 - self.TILE_OVERLAP)))
+            positions = list(range(0, max(1, length - size + 1), step))
+            if positions[-1] + size < length:
+                positions.append(length - size)
+            return positions, size
+        
+        xs, tile_w = starts(width)
+        ys, tile_h = starts(height)
+        return [(x, y, x + tile_w, y + tile_h) for y in ys for x in xs]
+    
+    def _detect_tiled(self, frame, tiles):
+        """Deteksi per tile pada resolusi asli (paralel), lalu NMS lintas tile"""
+        def detect_tile(tile):
+            x1, y1, x2, y2 = tile
+            # Input kelipatan 32 tanpa resize: tile di-pad, bukan di-scale
+            crop = self.detector.pad_to_stride(frame[y1:y2, x1:x2])
+            faces = self.detector.detect_faces(crop, input_size=(crop.shape[1], crop.shape[0]))
+            # Luas tile (tanpa padding) untuk cek ukuran relatif stage 2
+            for face in faces:
+                face.det_area = float((x2 - x1) * (y2 - y1))
+            return self._offset_faces(faces, x1, y1)
+        
+        if self._tile_pool is not None and len(tiles) > 1:
+            results = list(self._tile_pool.map(detect_tile, tiles))
+        else:
+            results = [detect_tile(tile) for tile in tiles]
+        
+        return self._merge_faces([face for faces in results for face in faces])
+    
+    def _detect_adaptive(self, frame, input_size=None):
+        """Full-frame pass dulu; tile resolusi asli hanya di tile yang berisi wajah kecil"""
+        faces = self.detector.detect_faces(frame, input_size=input_size)
+        small = [face for face in faces if face.bbox[2] - face.bbox[0] < self.SMALL_FACE_PX]
+        if not small:
+            return faces
+        
+        h, w = frame.shape[:2]
+        tiles = [
+            tile for tile in self._tile_grid(w, h)
+            if any(self._box_overlaps(face.bbox, tile) for face in small)
+        ]
+        return self._merge_faces(faces + self._detect_tiled(frame, tiles))
+    
+    def _merge_faces(self, faces):
+        """NMS atas gabungan deteksi (duplikat di area overlap tile)"""
+        if len(faces) <= 1:
+            return faces
+        keep = nms([face.bbox for face in faces], [face.det_score for face in faces], self.TILE_NMS_IOU)
+        return [faces[i] for i in keep]
+    
+    @staticmethod
+    def _box_overlaps(bbox, tile):
+        x1, y1, x2, y2 = tile
+        return bbox[0] < x2 and bbox[2] > x1 and bbox[1] < y2 and bbox[3] > y1
+    
+    def _build_motion_gate(self):
+        settings = self.settings
+        return MotionGate(
+            method=settings.MOTION_GATE_METHOD,
+            width=settings.MOTION_GATE_WIDTH,
+            pixel_threshold=settings.MOTION_PIXEL_THRESHOLD,
+            sensitivity=settings.MOTION_SENSITIVITY,
+            hold_frames=settings.MOTION_HOLD_FRAMES,
+            mask_polygons=settings.MOTION_MASK
+        )
+    
+    def _build_frame_budget(self, sample_fps):
+        """FrameBudget sumber live (None jika deadline dimatikan); default budget = interval sampel"""
+        if not self.DEADLINE_ENABLED:
+            return None
+        settings = self.settings
+        return FrameBudget(
+            budget_ms=settings.CROWD_FRAME_BUDGET_MS or 1000.0 / sample_fps,
+            scale_step=settings.CROWD_DEGRADE_SCALE_STEP,
+            max_interval=settings.CROWD_DEGRADE_MAX_INTERVAL
+        )
+    
+    def _build_sampler(self, sample_fps):
+        """AdaptiveSampler mulai dari sample_fps (None jika sampling adaptif dimatikan)"""
+        if not self.ADAPTIVE_SAMPLING:
+            return None
+        settings = self.settings
+        return AdaptiveSampler(
+            sample_fps,
+            min_fps=settings.CROWD_SAMPLE_FPS_MIN,
+            max_fps=settings.CROWD_SAMPLE_FPS_MAX,
+            idle_frames=settings.CROWD_SAMPLING_IDLE_FRAMES
+        )
+    
+    @staticmethod
+    def _seek_min_interval(seek_min_interval_ms, sampler):
+        """Ingest 'seek' hanya jika laju tercepat sampler pun masih di atas ambang seek"""
+        if sampler is None or seek_min_interval_ms is None:
+            return seek_min_interval_ms
+        return seek_min_interval_ms if 1000.0 / sampler.max_fps >= seek_min_interval_ms else None
+    
+    def _face_quality(self, blur_score, pose, eye_distance, blur_threshold):
+        """
+        Skor kualitas crop (0..1) dari ketajaman, pose, dan jarak antar mata
+        
+        Dipakai sebagai bobot template track; wajah yang baru lolos threshold
+        mendapat bobot kecil, wajah tajam, frontal dan dekat mendekati 1.
+        """
+        yaw, pitch, roll = pose
+        sharpness = blur_score / (blur_score + blur_threshold)
+        frontal = 1.0 - max(yaw / self.YAW_THRESHOLD, pitch / self.PITCH_THRESHOLD, roll / self.ROLL_THRESHOLD)
+        resolution = min(1.0, eye_distance / (2 * self.MIN_INTER_EYE_DISTANCE))
+        return sharpness * max(frontal, 0.05) * resolution
+    
+    def _decide_tracks(self, tracks):
+        """Satu keputusan per track: template top-k dicocokkan sekali (satu GEMM)"""
+        tracks = [track for track in tracks if track.samples]
+        if not tracks:
+            return []
+        
+        matches = self.matcher.match_batch(
+            [track.template() for track in tracks], self._get_gallery()
+        )
+        decisions = []
+        for track, (employee_id, similarity) in zip(tracks, matches):
+            if not employee_id or similarity < self.SIMILARITY_THRESHOLD:
+                continue
+            employee = self._get_employee(employee_id)
+            best = track.best_sample
+            decisions.append({
+                'id_pegawai': employee_id,
+                'nama': employee['nama'],
+                'nip': employee['nip'],
+                'similarity': similarity,
+                'bbox': best['bbox'],
+                'track_id': track.track_id,
+                'frame': best['frame'],
+                'first_seen': track.first_frame,
+                'last_seen': track.last_frame,
+                'samples': len(track.samples)
+            })
+        return decisions
+    
+    def _get_gallery(self):
+        with self._db_lock:
+            return self.embedding_repo.get_gallery()
+    
+    def _get_employee(self, employee_id):
+        with self._db_lock:
+            return self.pegawai_repo.get_by_id(employee_id)
+    
+    @staticmethod
+    def _accumulate_person(unique_people, person):
+        """Counter per pegawai (tanpa detection log): dasar section people di report"""
+        id_peg = person['id_pegawai']
+        if id_peg not in unique_people:
+            unique_people[id_peg] = {
+                'nama': person['nama'],
+                'nip': person['nip'],
+                'first_seen': person['first_seen'],
+                'last_seen': person['last_seen'],
+                'count': 0,
+                'avg_similarity': 0.0,
+                'max_similarity': 0.0
+            }
+        people = unique_people[id_peg]
+        similarity = float(person['similarity'])
+        people['first_seen'] = min(people['first_seen'], person['first_seen'])
+        people['last_seen'] = max(people['last_seen'], person['last_seen'])
+        people['count'] += 1
+        people['avg_similarity'] += (similarity - people['avg_similarity']) / people['count']
+        people['max_similarity'] = max(people['max_similarity'], similarity)
+    
+    def _record_decisions(self, decisions, source_type):
+        """Keputusan -> entry detection log (tanpa diakumulasi) dan tulis crowd_log"""
+        timestamp = datetime.now()
+        entries = []
+        for person in decisions:
+            entries.append({
+                'frame': person['frame'],
+                'timestamp': timestamp,
+                'id_pegawai': person['id_pegawai'],
+                'nama': person['nama'],
+                'nip': person['nip'],
+                'similarity': person['similarity'],
+                'bbox': person['bbox'],
+                'track_id': person['track_id'],
+                'first_seen': person['first_seen'],
+                'last_seen': person['last_seen']
+            })
+            
+            # Track di batas segmen: crowd_log ditulis merge_summaries setelah digabung
+            if person.get('open_start') or person.get('open_end'):
+                entries[-1].update(open_start=person.get('open_start', False),
+                                   open_end=person.get('open_end', False))
+                continue
+            self._write_crowd_log(person, source_type)
+        return entries
+    
+    def _write_crowd_log(self, person, source_type):
+        # Persist crowd detection to DB (no frame/similarity in table schema)
+        try:
+            with self._db_lock:
+                self.log_repo.log_crowd_detection(
+                    id_pegawai=person['id_pegawai'],
+                    nama=person['nama'],
+                    nip=person['nip'],
+                    source_type=source_type
+                )
+        except Exception as e:
+            Logger.error(f"Failed to write crowd_log: {e}")
+    
+    def _new_summary(self, source_type, camera_id=None):
+        """CrowdSummary satu sumber; log di-spill ke disk jika CROWD_LOG_SPILL_DIR diatur"""
+        log_path = None
+        if self.LOG_SPILL_DIR is not None:
+            log_path = new_log_path(self.LOG_SPILL_DIR, source_type, camera_id)
+        return CrowdSummary(self, log_path=log_path)
+    
+    def _detection_stats(self, detect_ms_total, sampled_frame_count):
+        """Mode/skala deteksi + rata-rata waktu Stage 1 per frame (ms)"""
+        return {
+            'mode': self.DETECTION_MODE,
+            'scale': self.DETECTION_SCALE,
+            'avg_detect_ms': round(detect_ms_total / max(1, sampled_frame_count), 2)
+        }
+    
     def _build_failure_reasons(self, filter_summary, sampled_frame_count):
         reason_map = {
             'stage0_no_face': "Wajah tidak terdeteksi (posisi terlalu jauh/sudut tidak pas)",
@@ -506,7 +1244,7 @@ class CrowdDetectionComplete:
             return {'pass': False, 'reason': 'FACE TOO FAR'}
         
         # All checks passed
-        return {'pass': True, 'reason': 'OK'}
+        return {'pass': True, 'reason': 'OK', 'eye_distance': eye_distance}
     
     def _normalize_face(self, face_img):
         """
@@ -644,51 +1382,114 @@ class CrowdDetectionComplete:
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
                 y_offset += 20
     
-    def generate_detection_report(self, summary, output_file=None):
-        """Generate comprehensive detection report"""
-        report_lines = []
-        report_lines.append("="*70)
-        report_lines.append("CROWD DETECTION REPORT")
-        report_lines.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report_lines.append("="*70)
-        report_lines.append("")
-        
-        report_lines.append(f"Total Frames Processed: {summary['total_frames']}")
-        report_lines.append(f"Detections Made: {summary['processed_frames']}")
-        report_lines.append(f"Unique People: {summary['unique_people']}")
-        report_lines.append("")
-        report_lines.append("-"*70)
-        report_lines.append("DETECTED PEOPLE:")
-        report_lines.append("-"*70)
-        
-        for person in summary['people']:
-            report_lines.append(f"\n{person['nama']} (NIP: {person['nip']})")
-            report_lines.append(f"  First Seen: Frame {person['first_seen']}")
-            report_lines.append(f"  Last Seen: Frame {person['last_seen']}")
-            report_lines.append(f"  Appearances: {person['count']} times")
-        
-        report_lines.append("")
-        report_lines.append("="*70)
-        report_lines.append("DETECTION LOG (Chronological):")
-        report_lines.append("="*70)
-        
-        for log in summary['detection_log']:
-            report_lines.append(
-                f"Frame {log['frame']:5d} | {log['timestamp'].strftime('%H:%M:%S')} | "
-                f"{log['nama']:20s} | Sim: {log['similarity']:.3f}"
-            )
-        
-        report_lines.append("="*70)
+    def generate_detection_report(self, summary, output_file=None, print_report=True, keep_text=True,
+                                  columnar_dir=None):
+        """
+        Generate comprehensive detection report
+
+        Report ditulis baris per baris sambil membaca detection_log (list atau DetectionLog
+        di disk). Section people diambil dari summary['people'] (counter reducer), jadi tetap
+        lengkap untuk summary keep_log=False atau log di disk yang sudah dihapus.
         
-        report_text = "\n".join(report_lines)
+        Args:
+            summary: summary detect_from_video/detect_from_image/merge_summaries
+            output_file: path file report (optional)
+            print_report: cetak report ke stdout
+            keep_text: False untuk log berjam-jam - teks tidak dikumpulkan di memori
+                (butuh output_file atau print_report)
+            columnar_dir: folder ekspor detection log per kolom .npy (optional, lihat
+                detection_log.export_columnar)
+        
+        Returns:
+            Teks report; dengan keep_text=False return output_file
+        """
+        report_file = open(output_file, 'w', encoding='utf-8') if output_file else None
+        report_lines = [] if keep_text else None
+        
+        def emit(line=""):
+            if print_report:
+                print(line)
+            if report_file is not None:
+                report_file.write(line + "\n")
+            if report_lines is not None:
+                report_lines.append(line)
+        
+        try:
+            emit("="*70)
+            emit("CROWD DETECTION REPORT")
+            emit(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            emit("="*70)
+            emit()
+            
+            emit(f"Total Frames Processed: {summary['total_frames']}")
+            emit(f"Detections Made: {summary['processed_frames']}")
+            emit(f"Unique People: {summary['unique_people']}")
+            if summary.get('motion_gate'):
+                motion = summary['motion_gate']
+                emit(
+                    f"Motion Gated Frames: {motion['gated_frames']}/{motion['checked_frames']} "
+                    f"({motion['gated_ratio'] * 100:.1f}%)"
+                )
+            if summary.get('sampling'):
+                sampling = summary['sampling']
+                emit(
+                    f"Sampling Rate: effective {sampling['effective_fps']} fps "
+                    f"(adaptive {sampling['min_fps']:g}-{sampling['max_fps']:g} fps, {sampling['changes']} changes)"
+                )
+            if summary.get('degradation'):
+                degradation = summary['degradation']
+                emit(
+                    f"Degradation Level: {degradation['level']} ({degradation['level_name']}), "
+                    f"max {degradation['max_level']}, budget {degradation['budget_ms']} ms/frame"
+                )
+            emit()
+            emit("-"*70)
+            emit("DETECTED PEOPLE:")
+            emit("-"*70)
+            
+            # Counter per orang dari reducer (tetap ada tanpa detection log);
+            # summary lama tanpa 'people' dihitung dari log
+            detection_log = summary['detection_log']
+            log_missing = isinstance(detection_log, DetectionLog) and not os.path.exists(detection_log.path)
+            people = summary.get('people')
+            if people is None:
+                people = [] if log_missing else list(person_stats(detection_log).values())
+            for person in people:
+                emit(f"\n{person['nama']} (NIP: {person['nip']})")
+                emit(f"  First Seen: Frame {person['first_seen']}")
+                emit(f"  Last Seen: Frame {person['last_seen']}")
+                emit(f"  Appearances: {person['count']} times")
+                if 'avg_similarity' in person:
+                    emit(f"  Similarity: avg {person['avg_similarity']:.3f}, max {person['max_similarity']:.3f}")
+            
+            emit()
+            emit("="*70)
+            emit("DETECTION LOG (Chronological):")
+            emit("="*70)
+            
+            if log_missing:
+                emit(f"(file detection log tidak ditemukan: {detection_log.path})")
+            elif not detection_log and people:
+                emit("(detection log tidak disimpan untuk summary ini)")
+            else:
+                for log in detection_log:
+                    emit(
+                        f"Frame {log['frame']:5d} | {log['timestamp'].strftime('%H:%M:%S')} | "
+                        f"{log['nama']:20s} | Sim: {log['similarity']:.3f}"
+                    )
+            
+            emit("="*70)
+        finally:
+            if report_file is not None:
+                report_file.close()
         
         if output_file:
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(report_text)
             Logger.success(f"Report saved: {output_file}")
-        
-        print(report_text)
-        
-        return report_text
+        if columnar_dir and not log_missing:
+            export_columnar(summary['detection_log'], columnar_dir)
+            Logger.success(f"Detection log columns saved: {columnar_dir}")
+        if report_lines is None:
+            return output_file
+        return "\n".join(report_lines)
     
     
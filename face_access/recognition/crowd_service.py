@@ -0,0 +1,266 @@
+"""
+Crowd detection multi-kamera: satu CaptureReader per kamera, satu pool worker inferensi bersama
+"""
+
+import threading
+import time
+from core.capture import CaptureReader
+from recognition.crowd_stream import CrowdStream
+from utils.logger import Logger
+
+
+class CameraSource:
+    """Konfigurasi & state scheduler satu kamera di CrowdService"""
+
+    def __init__(self, camera_id, source, sample_fps=5, priority=1, is_outdoor=False, source_type="CCTV"):
+        """
+        Args:
+            camera_id: ID kamera (kunci summary & ROI tersimpan)
+            source: URL stream, index webcam, atau path video
+            sample_fps: frame sampel per detik (boleh pecahan)
+            priority: bobot round-robin (>= 1); kamera prioritas 2 mendapat giliran
+                      dua kali lebih sering daripada prioritas 1 saat worker jenuh
+            is_outdoor: True jika outdoor (blur threshold lebih rendah)
+        """
+        self.camera_id = camera_id
+        self.source = source
+        self.sample_fps = max(0.01, float(sample_fps))
+        self.priority = max(1, int(priority))
+        self.is_outdoor = is_outdoor
+        self.source_type = source_type
+
+        self.reader = None
+        self.stream = None
+        self.reducer = None
+        self.frame_count = 0
+        self.source_ended = False
+
+        # State scheduler (hanya diubah di bawah lock CrowdService)
+        self.busy = False
+        self.finished = False
+        self.next_due = 0.0
+        self.current_weight = 0
+        self.turns = 0
+        self.late_turns = 0  # Live: giliran yang terlambat > 1 interval sampel (worker jenuh)
+
+    @property
+    def interval(self):
+        """Interval sampel (detik); mengikuti AdaptiveSampler stream jika aktif"""
+        sampler = self.stream.sampler if self.stream is not None else None
+        return 1.0 / (sampler.fps if sampler is not None else self.sample_fps)
+
+    def stats(self):
+        return {
+            'priority': self.priority,
+            'sample_fps': self.sample_fps,
+            'turns': self.turns,
+            'late_turns': self.late_turns
+        }
+
+
+class CrowdService:
+    """
+    Banyak kamera, satu set model: worker thread mengambil giliran kamera lewat
+    smooth weighted round-robin (bobot = priority) dan memproses satu frame sampel
+    per giliran dengan CrowdDetectionComplete yang sama.
+
+    Sumber live dijadwalkan per interval sampel (frame terbaru dari slot CaptureReader);
+    sumber file mengikuti grid timestamp CaptureReader dan selalu siap diproses.
+    Satu kamera tidak pernah diproses dua worker sekaligus, sehingga tracker &
+    motion gate tetap berurutan. Dengan N worker, set ORT_INTRA_OP_THREADS ~ core / N.
+    """
+
+    def __init__(self, crowd, workers=2, queue_size=8, seek_min_interval_ms=None, read_timeout=5.0,
+                 on_record=None):
+        """
+        Args:
+            crowd: CrowdDetectionComplete yang dibagi semua kamera
+            workers: jumlah worker inferensi (thread)
+            queue_size: antrian decode sumber file per kamera
+            seek_min_interval_ms: interval sampel minimal untuk ingest 'seek' sumber file
+            read_timeout: detik menunggu frame sebelum kamera dianggap berhenti
+            on_record: callback(camera_id, record) untuk setiap record CrowdStream, dipanggil
+                       dari thread worker (progres streaming)
+        """
+        self.crowd = crowd
+        self.workers = max(1, int(workers))
+        self.queue_size = queue_size
+        self.seek_min_interval_ms = seek_min_interval_ms
+        self.read_timeout = read_timeout
+        self.on_record = on_record
+
+        self.cameras = []
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+
+    def add_camera(self, camera_id, source, sample_fps=5, priority=1, is_outdoor=False, source_type="CCTV"):
+        if any(camera.camera_id == camera_id for camera in self.cameras):
+            raise ValueError(f"Kamera sudah terdaftar: {camera_id}")
+        camera = CameraSource(camera_id, source, sample_fps, priority, is_outdoor, source_type)
+        self.cameras.append(camera)
+        return camera
+
+    def run(self, duration_sec=None):
+        """
+        Proses semua kamera sampai sumber habis, duration_sec tercapai, atau stop()
+
+        Return dict camera_id -> summary (format detect_from_video, plus 'scheduler');
+        summary dibangun incremental oleh CrowdSummary dari record tiap kamera
+        """
+        self._stop.clear()
+        cameras = [camera for camera in self.cameras if self._open(camera)]
+        if not cameras:
+            Logger.error("Tidak ada kamera yang bisa dibuka")
+            return {}
+
+        Logger.info(f"Crowd service: {len(cameras)} kamera, {self.workers} worker")
+        threads = [
+            threading.Thread(target=self._worker, name=f"CrowdWorker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        deadline = time.monotonic() + duration_sec if duration_sec else None
+        for thread in threads:
+            while thread.is_alive():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    Logger.info(f"Reached duration limit: {duration_sec}s")
+                    self.stop()
+                    remaining = None
+                thread.join(timeout=remaining)
+
+        return {camera.camera_id: self._finish(camera) for camera in cameras}
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def _open(self, camera):
+        camera.stream = None
+        camera.frame_count = 0
+        camera.source_ended = False
+        camera.turns = 0
+        camera.late_turns = 0
+        live = CaptureReader._is_live(camera.source)
+        sampler = self.crowd._build_sampler(camera.sample_fps)
+        start_fps = sampler.fps if sampler is not None else camera.sample_fps
+        camera.reader = CaptureReader(
+            camera.source,
+            queue_size=self.queue_size,
+            # Live: laju sampel diatur scheduler; file: grid timestamp CaptureReader
+            sample_interval_ms=None if live else 1000.0 / start_fps,
+            seek_min_interval_ms=self.crowd._seek_min_interval(self.seek_min_interval_ms, sampler)
+        )
+        if not camera.reader.open():
+            camera.reader.release()
+            Logger.error(f"Failed to open camera {camera.camera_id}: {camera.source}")
+            return False
+
+        camera.stream = CrowdStream(
+            self.crowd,
+            is_outdoor=camera.is_outdoor,
+            source_type=camera.source_type,
+            camera_id=camera.camera_id,
+            budget=self.crowd._build_frame_budget(camera.sample_fps) if live else None,
+            sampler=sampler
+        )
+        camera.reducer = self.crowd._new_summary(camera.source_type, camera.camera_id)
+        camera.busy = False
+        camera.finished = False
+        camera.next_due = 0.0
+        camera.current_weight = 0
+        return True
+
+    def _worker(self):
+        while True:
+            camera = self._acquire()
+            if camera is None:
+                return
+            try:
+                self._step(camera)
+            except Exception as e:
+                Logger.error(f"Camera {camera.camera_id} error: {e}")
+                camera.finished = True
+            finally:
+                self._release(camera)
+
+    def _acquire(self):
+        """Giliran kamera berikutnya (smooth weighted round-robin); None jika semua selesai"""
+        with self._cond:
+            while not self._stop.is_set():
+                pending = [camera for camera in self.cameras if camera.stream is not None and not camera.finished]
+                if not pending:
+                    return None
+
+                now = time.monotonic()
+                ready = [camera for camera in pending if not camera.busy and camera.next_due <= now]
+                if ready:
+                    total = sum(camera.priority for camera in ready)
+                    for camera in ready:
+                        camera.current_weight += camera.priority
+                    camera = max(ready, key=lambda c: c.current_weight)
+                    camera.current_weight -= total
+
+                    camera.busy = True
+                    camera.turns += 1
+                    if camera.reader.live:
+                        if camera.next_due and now - camera.next_due > camera.interval:
+                            camera.late_turns += 1
+                        camera.next_due = now + camera.interval
+                    return camera
+
+                waits = [camera.next_due - now for camera in pending if not camera.busy]
+                self._cond.wait(timeout=min(waits) if waits else None)
+            return None
+
+    def _release(self, camera):
+        with self._cond:
+            camera.busy = False
+            self._cond.notify_all()
+
+    def _step(self, camera):
+        """Satu giliran: baca frame sampel berikutnya dan proses di stream kamera"""
+        reader = camera.reader
+        while True:
+            ret, frame = reader.read(timeout=self.read_timeout)
+            if not ret:
+                if reader.live:
+                    Logger.warning(f"Camera {camera.camera_id}: tidak ada frame, kamera dihentikan")
+                camera.source_ended = True
+                camera.finished = True
+                return
+            camera.frame_count = reader.frame_index
+            if reader.is_sample:
+                break
+
+        stream = camera.stream
+        skip_reason = stream.skip_reason(frame)
+        if skip_reason is None:
+            self._emit(camera, stream.process(frame, camera.frame_count, reader.position_ms))
+        else:
+            stream.skip(camera.frame_count, reader.position_ms, skip_reason)
+        if stream.sampler is not None and not reader.live:
+            reader.set_sample_interval(stream.sampler.interval_ms)
+
+    def _emit(self, camera, records):
+        for record in records:
+            camera.reducer.add(record)
+            if self.on_record is not None:
+                self.on_record(camera.camera_id, record)
+
+    def _finish(self, camera):
+        reader = camera.reader
+        reader.release()
+        frame_count = camera.frame_count
+        if camera.source_ended:
+            # Frame yang hanya di-grab/di-seek tetap dihitung
+            frame_count = max(frame_count, reader.source_frames, reader.frame_count)
+
+        self._emit(camera, camera.stream.finish(frame_count, capture_stats=reader.stats()))
+        summary = camera.reducer.summary()
+        summary['camera_id'] = camera.camera_id
+        summary['scheduler'] = camera.stats()
+        return summary
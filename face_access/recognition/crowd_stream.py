@@ -0,0 +1,252 @@
+"""
+Pemrosesan crowd per sumber video sebagai aliran record, plus reducer summary-nya
+"""
+
+import time
+from recognition.detection_log import DetectionLogWriter
+from recognition.tracker import FaceTracker
+from utils.logger import Logger
+
+
+class CrowdStream:
+    """
+    State satu sumber crowd yang menghasilkan record (lihat iter_video)
+
+    Hanya state terbatas yang disimpan (tracker, motion gate, ROI, FrameBudget,
+    AdaptiveSampler, counter); detection log tidak diakumulasi di sini.
+    Dipakai iter_video (satu sumber) dan CrowdService (banyak kamera).
+    Frame satu stream harus diproses berurutan: tracker & motion gate bergantung urutan.
+
+    Record:
+      {'type': 'frame', frame, position_ms, detected, filtered, detect_ms, embedded, reused, annotated_frame}
+      {'type': 'detection', frame, timestamp, id_pegawai, nama, nip, similarity, bbox, track_id,
+       first_seen, last_seen} - satu per track yang selesai (tanpa tracker: per wajah per frame);
+       track yang menyentuh batas segmen (defer_start/defer_end) diberi open_start/open_end
+       dan crowd_log-nya ditunda ke merge_summaries
+      {'type': 'end', total_frames, tracking, motion_gate, capture, degradation, sampling}
+    """
+
+    def __init__(self, crowd, is_outdoor=False, source_type="VIDEO", camera_id=None, budget=None,
+                 sampler=None, defer_start=False, defer_end=False):
+        """
+        Args:
+            crowd: CrowdDetectionComplete (model & repo dibagi antar stream)
+            is_outdoor: True jika outdoor (blur threshold lebih rendah)
+            source_type: source_type crowd_log
+            camera_id: ID kamera untuk ROI tersimpan (optional)
+            budget: FrameBudget sumber live (optional)
+            sampler: AdaptiveSampler; pemanggil menerapkan sampler.interval_ms ke sumber (optional)
+            defer_start, defer_end: sumber adalah segmen video; track yang sudah ada di frame
+                pertama / masih aktif di akhir segmen ditandai agar bisa digabung lintas segmen
+        """
+        self.crowd = crowd
+        self.source_type = source_type
+        self.camera_id = camera_id
+        self.blur_threshold = crowd.BLUR_OUTDOOR if is_outdoor else crowd.BLUR_INDOOR
+
+        self.tracker = None
+        if crowd.TRACKING:
+            self.tracker = FaceTracker(iou_threshold=crowd.TRACK_IOU_THRESHOLD, max_age=crowd.TRACK_MAX_AGE)
+        self.motion_gate = crowd._build_motion_gate() if crowd.MOTION_GATE_ENABLED else None
+        self.roi = crowd._load_roi(camera_id)
+        self.budget = budget
+        self.sampler = sampler
+
+        self.defer_start = defer_start and self.tracker is not None
+        self.defer_end = defer_end and self.tracker is not None
+        self.first_frame = None  # Frame pertama yang diproses
+
+        self.recognized = 0  # Record 'detection' yang sudah dihasilkan
+
+    def should_process(self, frame):
+        """True jika frame sampel dideteksi (lihat skip_reason)"""
+        return self.skip_reason(frame) is None
+
+    def skip_reason(self, frame):
+        """
+        None jika frame sampel dideteksi; 'budget' jika dilewati process_interval
+        FrameBudget, 'motion' jika ditutup motion gate (tanpa perubahan berarti)
+        """
+        if self.budget is not None and not self.budget.admit():
+            return 'budget'
+        if self.motion_gate is not None and not self.motion_gate.should_process(frame):
+            return 'motion'
+        return None
+
+    def skip(self, frame_num, position_ms=0.0, reason='motion'):
+        """
+        Frame sampel yang tidak dideteksi. Frame yang ditutup motion gate dihitung sampler
+        sebagai frame tanpa wajah (scene statis menurunkan laju sampel); frame yang
+        dilewati budget tidak: sistem sedang overload, bukan scene kosong
+        """
+        if self.sampler is not None and reason == 'motion':
+            self.sampler.update(position_ms, frame_num, False)
+
+    def process(self, frame, frame_num, position_ms=0.0):
+        """Proses satu frame sampel; return list record (frame lalu detection yang diputuskan)"""
+        if self.first_frame is None:
+            self.first_frame = frame_num
+        start = time.perf_counter()
+        tracks_before = self.tracker.total_tracks if self.tracker is not None else 0
+        result = self.crowd._process_frame_5stage(
+            frame,
+            frame_num,
+            self.blur_threshold,
+            tracker=self.tracker,
+            roi=self.roi,
+            budget=self.budget
+        )
+
+        # Satu keputusan per track yang selesai (tanpa tracker: per frame)
+        if self.tracker is not None:
+            decisions = self.crowd._decide_tracks(self.tracker.pop_finished())
+        else:
+            decisions = [
+                dict(person, frame=frame_num, first_seen=frame_num, last_seen=frame_num)
+                for person in result['detected']
+            ]
+        records = [{
+            'type': 'frame',
+            'frame': frame_num,
+            'position_ms': position_ms,
+            'detected': result['detected'],
+            'filtered': result['filtered'],
+            'detect_ms': result['detect_ms'],
+            'embedded': result['embedded'],
+            'reused': result['reused'],
+            'annotated_frame': result['annotated_frame']
+        }]
+        records.extend(self._record(decisions))
+
+        if self.budget is not None:
+            self.budget.record((time.perf_counter() - start) * 1000, result['stage_ms'])
+        if self.sampler is not None:
+            new_tracks = self.tracker.total_tracks - tracks_before if self.tracker is not None else 0
+            faces_present = result['filtered']['stage0_no_face'] == 0
+            self.sampler.update(position_ms, frame_num, faces_present, new_tracks)
+        return records
+
+    def finish(self, total_frames, capture_stats=None, log_unknown=True):
+        """Putuskan track yang masih aktif; return list record diakhiri record 'end'"""
+        records = []
+        if self.tracker is not None:
+            records = self._record(self.crowd._decide_tracks(self.tracker.flush()), at_end=True)
+
+        # Tetap catat percobaan crowd meskipun tidak ada wajah yang recognized.
+        if self.recognized == 0 and log_unknown:
+            self.crowd._log_unknown(self.source_type)
+
+        records.append({
+            'type': 'end',
+            'total_frames': total_frames,
+            'tracking': {
+                'enabled': self.tracker is not None,
+                'tracks': self.tracker.total_tracks if self.tracker is not None else 0
+            },
+            'motion_gate': self.motion_gate.stats() if self.motion_gate is not None else None,
+            'capture': capture_stats,
+            'degradation': self.budget.stats() if self.budget is not None else None,
+            'sampling': self.sampler.stats() if self.sampler is not None else None
+        })
+
+        label = f" [{self.camera_id}]" if self.camera_id is not None else ""
+        Logger.success(f"Detection complete{label}! Recognized: {self.recognized}")
+        return records
+
+    def _record(self, decisions, at_end=False):
+        for decision in decisions:
+            if self.defer_start and decision['first_seen'] == self.first_frame:
+                decision['open_start'] = True
+            if self.defer_end and at_end:
+                decision['open_end'] = True
+        entries = self.crowd._record_decisions(decisions, self.source_type)
+        self.recognized += len(entries)
+        return [dict(entry, type='detection') for entry in entries]
+
+
+class CrowdSummary:
+    """
+    Reducer incremental: record CrowdStream / iter_video -> summary detect_from_video
+
+    keep_log=False: detection_log tidak disimpan (memori tetap), unique_people & counter tetap.
+    log_path: detection_log ditulis append-only ke file JSONL ini (bukan list di memori);
+    summary['detection_log'] menjadi DetectionLog yang dibaca ulang secara streaming.
+    """
+
+    def __init__(self, crowd, keep_log=True, log_path=None):
+        self.crowd = crowd
+        self.keep_log = keep_log
+        self.log_writer = DetectionLogWriter(log_path) if log_path else None
+
+        self.detection_log = []  # Log semua deteksi
+        self.unique_people = {}  # Track unique people
+        self.filtered_totals = {
+            'stage0_no_face': 0,
+            'stage1_detection': 0,
+            'stage2_size': 0,
+            'stage3_blur': 0,
+            'stage4_pose': 0,
+            'stage5_landmark': 0
+        }
+        self.last_frame = 0
+        self.processed_frames = 0
+        self.detect_ms_total = 0.0
+        self.embedded_faces = 0
+        self.reused_faces = 0
+        self.end = None
+
+    @property
+    def finished(self):
+        return self.end is not None
+
+    def add(self, record):
+        kind = record['type']
+        if kind == 'frame':
+            self.last_frame = record['frame']
+            self.processed_frames += 1
+            self.detect_ms_total += record['detect_ms']
+            self.embedded_faces += record['embedded']
+            self.reused_faces += record['reused']
+            for key in self.filtered_totals:
+                self.filtered_totals[key] += record['filtered'].get(key, 0)
+        elif kind == 'detection':
+            entry = {key: value for key, value in record.items() if key != 'type'}
+            if self.log_writer is not None:
+                self.log_writer.append(entry)
+            elif self.keep_log:
+                self.detection_log.append(entry)
+            self.crowd._accumulate_person(self.unique_people, entry)
+        elif kind == 'end':
+            self.end = record
+        return record
+
+    def summary(self):
+        """Summary format detect_from_video; None jika record 'end' belum diterima"""
+        if self.end is None:
+            return None
+
+        crowd = self.crowd
+        end = self.end
+        detection_log = self.detection_log
+        if self.log_writer is not None:
+            detection_log = self.log_writer.close()
+        return {
+            'total_frames': end['total_frames'],
+            'processed_frames': self.processed_frames,
+            'unique_people': len(self.unique_people),
+            'people': list(self.unique_people.values()),
+            'detection_log': detection_log,
+            'filter_summary': self.filtered_totals,
+            'failure_reasons': crowd._build_failure_reasons(self.filtered_totals, self.processed_frames),
+            'detection': crowd._detection_stats(self.detect_ms_total, self.processed_frames),
+            'tracking': {
+                'enabled': end['tracking']['enabled'],
+                'tracks': end['tracking']['tracks'],
+                'embedded_faces': self.embedded_faces,
+                'reused_faces': self.reused_faces
+            },
+            'motion_gate': end['motion_gate'],
+            'capture': end['capture'],
+            'degradation': end['degradation'],
+            'sampling': end['sampling']
+        }
@@ -0,0 +1,179 @@
+"""
+Detection log crowd di disk: JSONL append-only yang dibaca ulang secara streaming
+"""
+
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+import numpy as np
+
+
+def new_log_path(log_dir, source_type="VIDEO", camera_id=None):
+    """Path file log unik per run (aman untuk beberapa proses/kamera sekaligus)"""
+    parts = ['crowd', datetime.now().strftime('%Y%m%d_%H%M%S'), str(source_type)]
+    if camera_id is not None:
+        parts.append(str(camera_id))
+    parts.append(f"{os.getpid()}_{uuid.uuid4().hex[:8]}")
+    name = re.sub(r'[^A-Za-z0-9_.-]', '_', '_'.join(parts))
+    return os.path.join(log_dir, f"{name}.jsonl")
+
+
+class DetectionLogWriter:
+    """Append satu entry per baris; timestamp -> ISO string, bbox/NumPy -> list/angka biasa"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def append(self, entry):
+        self._file.write(json.dumps(entry, default=_encode) + '\n')
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        return DetectionLog(self.path, count=self.count)
+
+
+class DetectionLog:
+    """
+    Detection log di file JSONL, dipakai seperti list untuk iterasi & len()
+
+    Entry dibaca per baris saat diiterasi (timestamp -> datetime, bbox -> np.ndarray),
+    sehingga memori tetap berapa pun panjang video.
+    """
+
+    def __init__(self, path, count=None):
+        self.path = path
+        self._count = count
+
+    def __len__(self):
+        if self._count is None:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._count = sum(1 for line in f if line.strip())
+        return self._count
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield _decode(json.loads(line))
+
+    def __repr__(self):
+        return f"DetectionLog({self.path!r}, entries={len(self)})"
+
+
+def person_stats(entries):
+    """
+    Statistik per pegawai dari entry detection log (list atau DetectionLog), satu pass
+
+    Return dict id_pegawai -> nama, nip, first_seen, last_seen, count, avg/max similarity.
+    Entry tanpa first_seen/last_seen (log lama, tanpa track) memakai frame-nya.
+    """
+    people = {}
+    for entry in entries:
+        first_seen = entry.get('first_seen', entry['frame'])
+        last_seen = entry.get('last_seen', entry['frame'])
+        person = people.get(entry['id_pegawai'])
+        if person is None:
+            person = people[entry['id_pegawai']] = {
+                'nama': entry['nama'],
+                'nip': entry['nip'],
+                'first_seen': first_seen,
+                'last_seen': last_seen,
+                'count': 0,
+                'similarity_sum': 0.0,
+                'max_similarity': 0.0
+            }
+        similarity = float(entry['similarity'])
+        person['first_seen'] = min(person['first_seen'], first_seen)
+        person['last_seen'] = max(person['last_seen'], last_seen)
+        person['count'] += 1
+        person['similarity_sum'] += similarity
+        person['max_similarity'] = max(person['max_similarity'], similarity)
+
+    for person in people.values():
+        person['avg_similarity'] = person.pop('similarity_sum') / person['count']
+    return people
+
+
+def export_columnar(entries, out_dir):
+    """
+    Tulis entry detection log (list atau DetectionLog) ke satu file .npy per kolom
+    (np.load(..., mmap_mode='r') untuk analisis)
+
+    Dua pass streaming: pass pertama menghitung jumlah baris & lebar string,
+    pass kedua mengisi array memmap. Nilai kosong: id/track -1, bbox NaN.
+    Return dict kolom -> path.
+    """
+    count = 0
+    widths = {'nama': 1, 'nip': 1}
+    has_segment = False
+    for entry in entries:
+        count += 1
+        for key in widths:
+            widths[key] = max(widths[key], len(str(entry[key])))
+        has_segment = has_segment or 'segment' in entry
+
+    columns = {
+        'frame': np.int64,
+        'timestamp': 'datetime64[us]',
+        'id_pegawai': np.int64,
+        'nama': f'<U{widths["nama"]}',
+        'nip': f'<U{widths["nip"]}',
+        'similarity': np.float32,
+        'track_id': np.int64,
+        'first_seen': np.int64,
+        'last_seen': np.int64
+    }
+    if has_segment:
+        columns['segment'] = np.int64
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, f"{name}.npy") for name in list(columns) + ['bbox']}
+    arrays = {
+        name: np.lib.format.open_memmap(paths[name], mode='w+', dtype=dtype, shape=(count,))
+        for name, dtype in columns.items()
+    }
+    arrays['bbox'] = np.lib.format.open_memmap(paths['bbox'], mode='w+', dtype=np.float32, shape=(count, 4))
+
+    for i, entry in enumerate(entries):
+        for name in columns:
+            value = entry.get(name)
+            if value is None:
+                value = -1
+            elif name == 'timestamp':
+                value = np.datetime64(value, 'us')
+            arrays[name][i] = value
+        arrays['bbox'][i] = entry['bbox'] if entry.get('bbox') is not None else np.nan
+
+    for array in arrays.values():
+        array.flush()
+    return paths
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipe tidak bisa disimpan di detection log: {type(value).__name__}")
+
+
+def _decode(entry):
+    if entry.get('timestamp') is not None:
+        entry['timestamp'] = datetime.fromisoformat(entry['timestamp'])
+    if entry.get('bbox') is not None:
+        entry['bbox'] = np.asarray(entry['bbox'], dtype=np.float32)
+    return entry
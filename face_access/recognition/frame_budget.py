@@ -0,0 +1,149 @@
+"""
+Budget waktu per frame sampel untuk sumber live: degradasi bertahap saat pipeline tertinggal
+"""
+
+
+class FrameBudget:
+    """
+    Deadline per frame sampel (live webcam/stream)
+
+    Waktu proses frame & per stage dirata-rata (EWMA). Jika rata-rata melewati budget,
+    level naik satu langkah; jika jauh di bawah budget, level turun kembali (otomatis
+    pulih). Perubahan level ditahan dwell_frames frame agar tidak berosilasi.
+
+    Level (kumulatif):
+      0 normal
+      1 resolusi deteksi diturunkan (skala deteksi x scale_step)
+      2 stage opsional (normalisasi, validasi alignment) dilewati; track yang sudah
+        punya sampel memakai identitas track tanpa ArcFace baru
+      3 process_interval naik: hanya 1 dari N frame sampel diproses (N <= max_interval)
+    Langkah yang stage sasarannya tidak dominan (mis. deteksi < 25% waktu frame) dilompati.
+    """
+
+    LEVEL_NAMES = ('normal', 'reduced_resolution', 'skip_stages', 'skip_frames')
+
+    def __init__(self, budget_ms, scale_step=0.75, max_interval=4, smoothing=0.3,
+                 recover_ratio=0.6, dwell_frames=5):
+        """
+        Args:
+            budget_ms: waktu proses maksimal per frame sampel (ms)
+            scale_step: pengali skala deteksi pada level >= 1
+            max_interval: process_interval maksimal pada level 3
+            smoothing: bobot frame terbaru pada EWMA
+            recover_ratio: turun level jika rata-rata < budget x recover_ratio
+            dwell_frames: frame minimal antar perubahan level
+        """
+        self.budget_ms = float(budget_ms)
+        self.scale_step = scale_step
+        self.max_interval = max(2, int(max_interval))
+        self.smoothing = smoothing
+        self.recover_ratio = recover_ratio
+        self.dwell_frames = dwell_frames
+
+        self.level = 0
+        self.process_interval = 1
+        self.avg_frame_ms = None
+        self.stage_ms = {}
+
+        self._since_change = 0
+        self._counter = 0
+
+        self.frames = 0
+        self.skipped_frames = 0
+        self.level_changes = 0
+        self.max_level = 0
+        self.frames_at_level = [0] * len(self.LEVEL_NAMES)
+
+    @property
+    def skip_optional_stages(self):
+        return self.level >= 2
+
+    @property
+    def reuse_tracks(self):
+        return self.level >= 2
+
+    def detection_scale(self, base_scale):
+        return base_scale * self.scale_step if self.level >= 1 else base_scale
+
+    def admit(self):
+        """False jika frame sampel dilewati karena process_interval (level 3)"""
+        self._counter += 1
+        if self._counter >= self.process_interval:
+            self._counter = 0
+            return True
+        self.skipped_frames += 1
+        return False
+
+    def record(self, frame_ms, stage_ms=None):
+        """Catat waktu satu frame yang diproses lalu sesuaikan level"""
+        self.frames += 1
+        self.frames_at_level[self.level] += 1
+        self.avg_frame_ms = self._ewma(self.avg_frame_ms, frame_ms)
+        for stage, ms in (stage_ms or {}).items():
+            self.stage_ms[stage] = self._ewma(self.stage_ms.get(stage), ms)
+
+        self._since_change += 1
+        if self._since_change < self.dwell_frames:
+            return
+        # Level 3: satu frame diproses per process_interval frame sampel
+        if self.avg_frame_ms > self.budget_ms * self.process_interval:
+            self._degrade()
+        elif self.avg_frame_ms < self.budget_ms * max(1, self.process_interval - 1) * self.recover_ratio:
+            self._recover()
+
+    def stats(self):
+        return {
+            'budget_ms': round(self.budget_ms, 1),
+            'level': self.level,
+            'level_name': self.LEVEL_NAMES[self.level],
+            'max_level': self.max_level,
+            'process_interval': self.process_interval,
+            'avg_frame_ms': round(self.avg_frame_ms or 0.0, 2),
+            'stage_ms': {stage: round(ms, 2) for stage, ms in self.stage_ms.items()},
+            'level_changes': self.level_changes,
+            'skipped_frames': self.skipped_frames,
+            'frames_at_level': dict(zip(self.LEVEL_NAMES, self.frames_at_level))
+        }
+
+    def _degrade(self):
+        if self.level == 3:
+            if self.process_interval < self.max_interval:
+                self.process_interval += 1
+                self._changed()
+            return
+
+        level = self.level + 1
+        if level == 1 and self._share('detect') < 0.25:
+            level = 2
+        if level == 2 and self._share('filter', 'embed') < 0.25:
+            level = 3
+        self._set_level(level)
+
+    def _recover(self):
+        if self.process_interval > 2:
+            self.process_interval -= 1
+            self._changed()
+        elif self.level > 0:
+            self._set_level(self.level - 1)
+
+    def _set_level(self, level):
+        self.level = level
+        self.process_interval = 2 if level == 3 else 1
+        self._counter = 0
+        self.max_level = max(self.max_level, level)
+        self._changed()
+
+    def _changed(self):
+        self.level_changes += 1
+        self._since_change = 0
+
+    def _share(self, *stages):
+        total = sum(self.stage_ms.values())
+        if total <= 0:
+            return 1.0
+        return sum(self.stage_ms.get(stage, 0.0) for stage in stages) / total
+
+    def _ewma(self, previous, value):
+        if previous is None:
+            return float(value)
+        return self.smoothing * value + (1 - self.smoothing) * previous
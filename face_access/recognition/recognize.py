@@ -100,7 +100,7 @@ class Recognition:
                     if is_valid:
                         embedding = self.embedding_extractor.extract(face)
                         
-                        stored_embeddings = self.embedding_repo.get_all()
+                        stored_embeddings = self.embedding_repo.get_gallery()
                         employee_id, similarity = self.matcher.match(embedding, stored_embeddings)
                         
                         if employee_id:
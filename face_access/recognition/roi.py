@@ -0,0 +1,141 @@
+"""
+Region of interest per kamera untuk crowd detection (poligon include/exclude, JSON per kamera)
+"""
+
+import json
+import os
+import re
+import cv2
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    Poligon ROI dalam koordinat ternormalisasi 0..1 agar tidak terikat resolusi
+
+    include: deteksi hanya di dalam poligon ini (kosong = seluruh frame)
+    exclude: area yang selalu diabaikan (pantulan, poster, parkiran jauh, ...)
+    """
+
+    def __init__(self, include=None, exclude=None):
+        self.include = [self._clean_polygon(p) for p in (include or [])]
+        self.exclude = [self._clean_polygon(p) for p in (exclude or [])]
+        self._masks = {}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(include=data.get('include'), exclude=data.get('exclude'))
+
+    def to_dict(self):
+        return {'include': self.include, 'exclude': self.exclude}
+
+    @property
+    def is_empty(self):
+        return not self.include and not self.exclude
+
+    def crop_rects(self, width, height):
+        """Bounding box piksel (x1, y1, x2, y2) tiap poligon include; yang overlap digabung"""
+        if not self.include:
+            return [(0, 0, width, height)]
+
+        rects = []
+        for polygon in self.include:
+            points = self._to_pixels(polygon, width, height)
+            x1, y1 = points.min(axis=0)
+            x2, y2 = points.max(axis=0)
+            rects.append([max(0, int(x1)), max(0, int(y1)), min(width, int(x2) + 1), min(height, int(y2) + 1)])
+
+        merged = True
+        while merged and len(rects) > 1:
+            merged = False
+            for i in range(len(rects)):
+                for j in range(i + 1, len(rects)):
+                    a, b = rects[i], rects[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        rects[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                        del rects[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return [tuple(rect) for rect in rects if rect[2] > rect[0] and rect[3] > rect[1]]
+
+    def mask(self, width, height):
+        """Mask bool (H, W): True di area yang relevan"""
+        key = (width, height)
+        if key not in self._masks:
+            if self.include:
+                mask = np.zeros((height, width), dtype=np.uint8)
+                for polygon in self.include:
+                    cv2.fillPoly(mask, [self._to_pixels(polygon, width, height)], 1)
+            else:
+                mask = np.ones((height, width), dtype=np.uint8)
+            for polygon in self.exclude:
+                cv2.fillPoly(mask, [self._to_pixels(polygon, width, height)], 0)
+            self._masks[key] = mask.astype(bool)
+        return self._masks[key]
+
+    def contains(self, bbox, width, height):
+        """True jika titik tengah bbox berada di area ROI"""
+        cx = int(np.clip((bbox[0] + bbox[2]) / 2, 0, width - 1))
+        cy = int(np.clip((bbox[1] + bbox[3]) / 2, 0, height - 1))
+        return bool(self.mask(width, height)[cy, cx])
+
+    def draw(self, frame):
+        """Gambar poligon include (hijau) & exclude (merah) di frame"""
+        h, w = frame.shape[:2]
+        for polygon in self.include:
+            cv2.polylines(frame, [self._to_pixels(polygon, w, h)], True, (0, 255, 0), 2)
+        for polygon in self.exclude:
+            cv2.polylines(frame, [self._to_pixels(polygon, w, h)], True, (0, 0, 255), 2)
+        return frame
+
+    @staticmethod
+    def _to_pixels(polygon, width, height):
+        return np.array([[x * width, y * height] for x, y in polygon], dtype=np.int32)
+
+    @staticmethod
+    def _clean_polygon(polygon):
+        points = [[float(np.clip(x, 0.0, 1.0)), float(np.clip(y, 0.0, 1.0))] for x, y in polygon]
+        if len(points) < 3:
+            raise ValueError("Poligon ROI minimal 3 titik")
+        return points
+
+
+class RoiStore:
+    """ROI tersimpan sebagai satu file JSON per kamera di roi_dir"""
+
+    def __init__(self, roi_dir):
+        self.roi_dir = roi_dir
+
+    def get(self, camera_id):
+        """RegionOfInterest kamera, atau None jika belum diatur"""
+        path = self._path(camera_id)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return RegionOfInterest.from_dict(json.load(f))
+
+    def save(self, camera_id, roi):
+        os.makedirs(self.roi_dir, exist_ok=True)
+        path = self._path(camera_id)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(roi.to_dict(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def delete(self, camera_id):
+        path = self._path(camera_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def list_cameras(self):
+        if not os.path.isdir(self.roi_dir):
+            return []
+        return sorted(name[:-5] for name in os.listdir(self.roi_dir) if name.endswith('.json'))
+
+    def _path(self, camera_id):
+        safe = re.sub(r'[^A-Za-z0-9_.-]', '_', str(camera_id).strip())
+        if not safe:
+            raise ValueError("ID kamera kosong")
+        return os.path.join(self.roi_dir, f"{safe}.json")
@@ -0,0 +1,155 @@
+"""
+Pemrosesan paralel video panjang per segmen waktu (satu proses worker per segmen)
+"""
+
+import functools
+import multiprocessing
+import os
+import cv2
+from config.settings import Settings
+from utils.logger import Logger
+
+# CrowdDetectionComplete milik proses worker (dibuat sekali di _init_worker)
+_worker_crowd = None
+
+
+def video_duration_ms(video_path):
+    """Durasi file video (ms) dari metadata; None jika tidak diketahui"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        if fps <= 0 or frames <= 0:
+            return None
+        return frames * 1000.0 / fps
+    finally:
+        cap.release()
+
+
+def split_segments(duration_ms, n_segments, sample_interval_ms):
+    """
+    Bagi [0, duration) menjadi n segmen [start, end); batas dibulatkan ke grid sampel
+    sehingga frame sampel identik dengan pemrosesan satu proses. Segmen terakhir end=None.
+    """
+    n_segments = max(1, min(n_segments, int(duration_ms // sample_interval_ms) or 1))
+    bounds = [0.0]
+    for i in range(1, n_segments):
+        bound = round(duration_ms * i / n_segments / sample_interval_ms) * sample_interval_ms
+        if bound > bounds[-1]:
+            bounds.append(bound)
+    ends = bounds[1:] + [None]
+    return list(zip(bounds, ends))
+
+
+def build_crowd_detector(settings):
+    """Komponen crowd lengkap (DB, repo, detector, matcher) untuk satu proses"""
+    from core.detector import FaceDetector
+    from core.embedding import EmbeddingExtractor
+    from core.matcher import FaceMatcher
+    from core.ann_index import IVFIndex
+    from db.database import Database
+    from db.pegawai_repo import PegawaiRepository
+    from db.embedding_repo import EmbeddingRepository
+    from db.log_repo import LogRepository
+    from recognition.crowd_recognize import CrowdDetectionComplete
+
+    database = Database(settings.DB_CONFIG)
+    if not database.connect():
+        raise Exception("Database connection failed")
+
+    embedding_repo = EmbeddingRepository(
+        database,
+        cache_check_interval=settings.EMBEDDING_CACHE_INTERVAL,
+        storage_mode=settings.EMBEDDING_STORAGE,
+        gallery_precision=settings.GALLERY_PRECISION,
+        rerank_k=settings.GALLERY_RERANK_K
+    )
+    detector = FaceDetector.from_profile('crowd', settings)
+    detector.warmup(runs=settings.WARMUP_RUNS)
+
+    ann_index = None
+    ann_loader = None
+    ann_path = settings.resolve_path(settings.ANN_INDEX_PATH)
+    if settings.ANN_ENABLED:
+        if os.path.exists(ann_path):
+            ann_index = IVFIndex.load(ann_path)
+            ann_index.nprobe = settings.ANN_NPROBE
+        # Index disusulkan ke gallery terbaru (enroll proses lain), lihat FaceMatcher
+        ann_loader = functools.partial(
+            IVFIndex.load_or_build, path=ann_path,
+            nlist=settings.ANN_NLIST, nprobe=settings.ANN_NPROBE, pq_m=settings.ANN_PQ_M
+        )
+
+    return CrowdDetectionComplete(
+        detector=detector,
+        embedding_extractor=EmbeddingExtractor(detector, batch_size=settings.EMBEDDING_BATCH_SIZE),
+        matcher=FaceMatcher(
+            threshold=settings.RECOGNITION_SIMILARITY,
+            ann_index=ann_index,
+            ann_min_gallery=settings.ANN_MIN_GALLERY,
+            ann_candidates=settings.ANN_CANDIDATES,
+            ann_loader=ann_loader
+        ),
+        pegawai_repo=PegawaiRepository(database),
+        embedding_repo=embedding_repo,
+        log_repo=LogRepository(database),
+        settings=settings
+    )
+
+
+def _init_worker(intra_op_threads):
+    global _worker_crowd
+    # Core dibagi rata antar worker agar proses tidak saling berebut thread
+    # (atribut kelas: hanya berlaku di proses worker ini)
+    Settings.ORT_INTRA_OP_THREADS = intra_op_threads
+    Settings.CV2_NUM_THREADS = 1
+    Settings.CROWD_TILE_WORKERS = 1
+    Settings.apply_thread_budget()
+    _worker_crowd = build_crowd_detector(Settings())
+
+
+def _process_segment(task):
+    start_ms, end_ms, options = task
+    Logger.info(f"Segmen {start_ms / 1000:.1f}s - {'akhir' if end_ms is None else f'{end_ms / 1000:.1f}s'}")
+    summary = _worker_crowd.detect_from_video(
+        start_ms=start_ms,
+        end_ms=end_ms,
+        display=False,
+        log_unknown=False,
+        defer_edge_logs=True,
+        **options
+    )
+    if summary is None:
+        raise RuntimeError(f"Segmen {start_ms}ms gagal diproses")
+    return summary
+
+
+def run_segments(video_path, workers=2, is_outdoor=False, sample_fps=5, source_type="VIDEO",
+                 camera_id=None):
+    """
+    Proses video per segmen di pool proses; return list summary urut segmen,
+    atau None jika durasi video tidak diketahui (tidak bisa dibagi)
+    """
+    duration_ms = video_duration_ms(video_path)
+    if duration_ms is None:
+        return None
+
+    sample_fps = max(0.01, float(sample_fps))
+    segments = split_segments(duration_ms, workers, 1000.0 / sample_fps)
+    options = {
+        'video_source': video_path,
+        'is_outdoor': is_outdoor,
+        'sample_fps': sample_fps,
+        'source_type': source_type,
+        'camera_id': camera_id
+    }
+    tasks = [(start_ms, end_ms, options) for start_ms, end_ms in segments]
+    threads = max(1, (os.cpu_count() or 1) // len(tasks))
+    Logger.info(f"Video {duration_ms / 1000:.0f}s dibagi {len(tasks)} segmen, {threads} thread ORT per worker")
+
+    # spawn: ORT session & koneksi MySQL tidak aman diwariskan lewat fork
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes=len(tasks), initializer=_init_worker, initargs=(threads,)) as pool:
+        return pool.map(_process_segment, tasks)
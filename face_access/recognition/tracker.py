@@ -0,0 +1,182 @@
+"""
+Face tracker (SORT-style): Kalman constant-velocity per wajah + asosiasi IoU antar frame
+"""
+
+import numpy as np
+from utils.math_utils import box_iou
+
+
+class FaceTrack:
+    """
+    Satu track wajah dengan Kalman filter state [cx, cy, s, r, vcx, vcy, vs]
+    (s = luas bbox, r = aspek rasio, dianggap konstan)
+    """
+
+    # Matriks Kalman dibagi semua track
+    F = np.eye(7)
+    F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+    H = np.eye(4, 7)
+    Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+    R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+    def __init__(self, track_id, bbox):
+        self.track_id = track_id
+        self.x = np.zeros(7)
+        self.x[:4] = self._to_z(bbox)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1000.0, 1000.0, 1000.0])
+
+        self.hits = 1
+        self.age = 0
+        self.time_since_update = 0
+
+        self.first_frame = None
+        self.last_frame = None
+
+        # Top-k sampel kualitas terbaik: dict quality, embedding, frame, bbox
+        self.samples = []
+
+        # Identitas dari matching template terakhir (sementara, untuk tampilan per frame)
+        self.identity = None
+        self.similarity = 0.0
+
+    def predict(self):
+        # Luas tidak boleh negatif setelah prediksi
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        self.age += 1
+        self.time_since_update += 1
+        return self.bbox
+
+    def update(self, bbox):
+        z = self._to_z(bbox)
+        y = z - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+        self.hits += 1
+        self.time_since_update = 0
+
+    def set_identity(self, identity, similarity):
+        self.identity = identity
+        self.similarity = float(similarity)
+
+    def mark_seen(self, frame_num):
+        if self.first_frame is None:
+            self.first_frame = frame_num
+        self.last_frame = frame_num
+
+    def accepts(self, quality, top_k):
+        """True jika sampel dengan kualitas ini akan masuk top-k (layak di-embed)"""
+        return len(self.samples) < top_k or quality > self.samples[-1]['quality']
+
+    def is_uncertain(self, threshold):
+        """True jika template belum menghasilkan identitas dengan similarity >= threshold"""
+        return self.identity is None or self.similarity < threshold
+
+    def reset_samples(self):
+        """Buang sampel template (re-match dari crop baru)"""
+        self.samples = []
+        self.identity = None
+        self.similarity = 0.0
+
+    def add_sample(self, quality, embedding, frame_num, bbox, top_k):
+        self.samples.append({
+            'quality': float(quality),
+            'embedding': np.asarray(embedding, dtype=np.float32),
+            'frame': frame_num,
+            'bbox': bbox
+        })
+        self.samples.sort(key=lambda sample: sample['quality'], reverse=True)
+        del self.samples[top_k:]
+
+    def template(self):
+        """Rata-rata embedding top-k berbobot kualitas, dinormalisasi (None jika belum ada sampel)"""
+        if not self.samples:
+            return None
+        weights = np.array([sample['quality'] for sample in self.samples], dtype=np.float32)
+        embeddings = np.stack([sample['embedding'] for sample in self.samples])
+        template = (weights[:, None] * embeddings).sum(axis=0)
+        return template / max(np.linalg.norm(template), 1e-12)
+
+    @property
+    def best_sample(self):
+        return self.samples[0] if self.samples else None
+
+    @property
+    def bbox(self):
+        cx, cy, s, r = self.x[:4]
+        w = np.sqrt(max(s * r, 0.0))
+        h = s / w if w > 0 else 0.0
+        return np.array([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], dtype=np.float32)
+
+    @staticmethod
+    def _to_z(bbox):
+        x1, y1, x2, y2 = [float(v) for v in bbox[:4]]
+        w, h = x2 - x1, y2 - y1
+        return np.array([x1 + w / 2, y1 + h / 2, w * h, w / max(h, 1e-6)])
+
+
+class FaceTracker:
+    """
+    Multi-object tracker untuk pipeline crowd
+
+    update() dipanggil sekali per frame sampel dengan bbox wajah; mengembalikan track
+    untuk setiap deteksi (urutan sama). Track yang tidak ter-update selama max_age
+    frame sampel dipindah ke daftar selesai dan diambil lewat pop_finished().
+    """
+
+    def __init__(self, iou_threshold=0.3, max_age=5):
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.tracks = []
+        self.finished = []
+        self.next_id = 1
+
+    @property
+    def total_tracks(self):
+        return self.next_id - 1
+
+    def update(self, bboxes):
+        predicted = np.array([track.predict() for track in self.tracks]).reshape(-1, 4)
+        bboxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+
+        assigned = [None] * len(bboxes)
+        if len(self.tracks) and len(bboxes):
+            iou = box_iou(bboxes, predicted)
+            used = set()
+            # Asosiasi greedy: pasangan IoU terbesar dulu
+            for flat in np.argsort(-iou, axis=None):
+                det, trk = np.unravel_index(flat, iou.shape)
+                if iou[det, trk] < self.iou_threshold:
+                    break
+                if assigned[det] is None and trk not in used:
+                    used.add(trk)
+                    assigned[det] = self.tracks[trk]
+                    self.tracks[trk].update(bboxes[det])
+
+        for det, track in enumerate(assigned):
+            if track is None:
+                track = FaceTrack(self.next_id, bboxes[det])
+                self.next_id += 1
+                self.tracks.append(track)
+                assigned[det] = track
+
+        alive = []
+        for track in self.tracks:
+            (alive if track.time_since_update <= self.max_age else self.finished).append(track)
+        self.tracks = alive
+        return assigned
+
+    def pop_finished(self):
+        """Track yang sudah berakhir sejak panggilan terakhir"""
+        finished, self.finished = self.finished, []
+        return finished
+
+    def flush(self):
+        """Akhiri semua track (akhir video)"""
+        self.finished.extend(self.tracks)
+        self.tracks = []
+        return self.pop_finished()
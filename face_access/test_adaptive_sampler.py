@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script untuk AdaptiveSampler: laju naik/turun per step, batas min/max, timeline perubahan
+"""
+
+from recognition.adaptive_sampler import AdaptiveSampler
+
+
+def test_steps_up_and_down():
+    sampler = AdaptiveSampler(4, min_fps=1, max_fps=10, idle_frames=2, step=2)
+
+    # Wajah terlihat: x step sampai max_fps
+    assert sampler.update(0, 0, faces_present=True)
+    assert sampler.fps == 8
+    assert sampler.update(125, 3, faces_present=True)
+    assert sampler.fps == 10
+    assert not sampler.update(225, 6, faces_present=True)
+
+    # Tanpa wajah: turun / step setiap idle_frames frame, sampai min_fps
+    fps = []
+    for i in range(8):
+        sampler.update(300 + i * 100, 10 + i, faces_present=False)
+        fps.append(sampler.fps)
+    assert fps == [10, 5, 5, 2.5, 2.5, 1.25, 1.25, 1]
+
+    # Satu frame dengan wajah mereset hitungan idle
+    sampler.update(1200, 20, faces_present=False)
+    sampler.update(1300, 21, faces_present=True)
+    sampler.update(1400, 22, faces_present=False)
+    assert sampler.fps == 2
+
+
+def test_new_track_jumps_to_max():
+    sampler = AdaptiveSampler(1, min_fps=1, max_fps=10, idle_frames=1)
+    assert sampler.update(0, 0, faces_present=True, new_tracks=1)
+    assert sampler.fps == 10 and sampler.interval_ms == 100
+
+
+def test_base_fps_clamped_and_timeline():
+    assert AdaptiveSampler(30, min_fps=1, max_fps=10).fps == 10
+    assert AdaptiveSampler(0.1, min_fps=1, max_fps=10).fps == 1
+
+    sampler = AdaptiveSampler(5, min_fps=1, max_fps=10, idle_frames=1)
+    sampler.update(1000, 30, faces_present=False)
+    sampler.update(2000, 60, faces_present=True, new_tracks=2)
+    sampler.update(3000, 90, faces_present=True)
+
+    stats = sampler.stats()
+    assert [(row['frame'], row['fps'], row['reason']) for row in stats['timeline']] == [
+        (30, 5.0, 'start'), (30, 2.5, 'no_face'), (60, 10.0, 'new_track')
+    ]
+    assert stats['changes'] == 2 and stats['current_fps'] == 10
+    assert stats['effective_fps'] == 1.0  # 3 frame sampel dalam 2 detik
+
+
+if __name__ == "__main__":
+    test_steps_up_and_down()
+    test_new_track_jumps_to_max()
+    test_base_fps_clamped_and_timeline()
+    print("OK")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script untuk CaptureReader sumber file: sampel dari grid timestamp, ingest grab/seek/all, segmen
+"""
+
+import cv2
+from core import capture
+from core.capture import CaptureReader
+
+
+class FakeVideoCapture:
+    """Video palsu 'fake:<frames>' 25 fps; frame = index-nya; catat grab/retrieve/seek"""
+
+    FPS = 25.0
+
+    def __init__(self, source, seekable=True, timestamps=True):
+        self.frames = int(source.split(':')[1])
+        self.seekable = seekable
+        self.timestamps = timestamps
+        self.pos = 0  # Index frame berikutnya
+        self.grabs = self.retrieves = self.seeks = 0
+
+    def isOpened(self):
+        return True
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            # Timestamp frame yang terakhir di-grab (0 jika container tidak memberi)
+            return (self.pos - 1) * 1000.0 / self.FPS if self.timestamps and self.pos else 0.0
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return self.pos
+        if prop == cv2.CAP_PROP_FPS:
+            return self.FPS
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.frames
+        return 0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_MSEC and self.seekable:
+            self.seeks += 1
+            self.pos = int(round(value * self.FPS / 1000.0))
+
+    def grab(self):
+        if self.pos >= self.frames:
+            return False
+        self.grabs += 1
+        self.pos += 1
+        return True
+
+    def retrieve(self):
+        self.retrieves += 1
+        return True, self.pos - 1
+
+    def read(self):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def release(self):
+        pass
+
+
+def _read_all(reader, **capture_kwargs):
+    """Jalankan reader dengan FakeVideoCapture; return (index, position_ms, is_sample, frame), cap"""
+    original = capture.cv2.VideoCapture
+    caps = []
+
+    def video_capture(source):
+        caps.append(FakeVideoCapture(source, **capture_kwargs))
+        return caps[-1]
+
+    capture.cv2.VideoCapture = video_capture
+    try:
+        assert reader.open()
+        frames = []
+        while True:
+            ret, frame = reader.read(timeout=2.0)
+            if not ret:
+                break
+            frames.append((reader.frame_index, round(reader.position_ms), reader.is_sample, frame))
+        reader.release()
+    finally:
+        capture.cv2.VideoCapture = original
+    return frames, caps[0]
+
+
+def test_grab_retrieves_only_samples():
+    """100 frame @25fps, sampel tiap 200 ms: hanya 20 frame di-retrieve (decode BGR)"""
+    reader = CaptureReader("fake:100", live=False, sample_interval_ms=200)
+    frames, cap = _read_all(reader)
+
+    assert reader.ingest == 'grab'
+    assert [frame for _, _, _, frame in frames] == list(range(0, 100, 5))
+    assert all(sample for _, _, sample, _ in frames)
+    assert frames[1][:2] == (6, 200)  # frame_index 1-based, posisi dari CAP_PROP_POS_MSEC
+    assert cap.grabs == 100 and cap.retrieves == 20
+    assert reader.stats()['frames_skipped'] == 80 and reader.frames_delivered == 20
+
+
+def test_decode_all_flags_samples():
+    reader = CaptureReader("fake:100", live=False, sample_interval_ms=200, decode_all=True)
+    frames, cap = _read_all(reader)
+
+    assert reader.ingest == 'all' and len(frames) == 100
+    assert [frame for _, _, sample, frame in frames if sample] == list(range(0, 100, 5))
+    assert cap.retrieves == 100
+
+
+def test_seek_jumps_to_sample_points():
+    reader = CaptureReader("fake:250", live=False, sample_interval_ms=2000, seek_min_interval_ms=1000)
+    frames, cap = _read_all(reader)
+
+    assert reader.ingest == 'seek'
+    assert [(position, frame) for _, position, _, frame in frames] == [
+        (0, 0), (2000, 50), (4000, 100), (6000, 150), (8000, 200)
+    ]
+    # Satu seek per titik sampel (termasuk 10000 ms di luar video), satu grab per seek
+    assert cap.seeks == 5 and cap.grabs == 5
+
+    # Backend yang mengabaikan seek: grab maju, sampel tetap sama
+    reader = CaptureReader("fake:250", live=False, sample_interval_ms=2000, seek_min_interval_ms=1000)
+    frames, cap = _read_all(reader, seekable=False)
+    assert [frame for _, _, _, frame in frames] == [0, 50, 100, 150, 200]
+    assert cap.grabs == 250
+
+
+def test_segment_and_fps_fallback():
+    """Segmen [1000, 2000) ms; container tanpa timestamp memakai index / fps"""
+    reader = CaptureReader("fake:100", live=False, sample_interval_ms=200, start_ms=1000, end_ms=2000)
+    frames, _ = _read_all(reader)
+    assert [position for _, position, _, _ in frames] == [1000, 1200, 1400, 1600, 1800]
+
+    reader = CaptureReader("fake:50", live=False, sample_interval_ms=400)
+    frames, _ = _read_all(reader, timestamps=False)
+    assert [frame for _, _, _, frame in frames] == list(range(0, 50, 10))
+
+
+if __name__ == "__main__":
+    test_grab_retrieves_only_samples()
+    test_decode_all_flags_samples()
+    test_seek_jumps_to_sample_points()
+    test_segment_and_fps_fallback()
+    print("OK")
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script untuk CrowdService: giliran weighted round-robin, kamera sibuk tidak dibagi, satu langkah worker
+"""
+
+import time
+from recognition.crowd_service import CrowdService
+
+
+class FakeReader:
+    """Reader palsu: frames = list (frame, is_sample); habis -> (False, None)"""
+
+    def __init__(self, frames=(), live=False):
+        self.frames = list(frames)
+        self.live = live
+        self.frame_index = 0
+        self.position_ms = 0.0
+        self.is_sample = False
+        self.intervals = []
+
+    def read(self, timeout=None):
+        if not self.frames:
+            return False, None
+        frame, self.is_sample = self.frames.pop(0)
+        self.frame_index += 1
+        self.position_ms = self.frame_index * 100.0
+        return True, frame
+
+    def set_sample_interval(self, interval_ms):
+        self.intervals.append(interval_ms)
+
+
+class FakeStream:
+    """CrowdStream palsu: frame 'diam' di-gate motion, frame lain diproses jadi satu record"""
+
+    sampler = None
+
+    def __init__(self):
+        self.skipped = []
+
+    def skip_reason(self, frame):
+        return 'motion' if frame == 'diam' else None
+
+    def process(self, frame, frame_num, position_ms):
+        return [{'type': 'frame', 'frame': frame_num, 'position_ms': position_ms, 'value': frame}]
+
+    def skip(self, frame_num, position_ms=0.0, reason='motion'):
+        self.skipped.append((frame_num, reason))
+
+
+class RecordingReducer:
+    def __init__(self):
+        self.records = []
+
+    def add(self, record):
+        self.records.append(record)
+
+
+def _service(*cameras, on_record=None):
+    service = CrowdService(crowd=None, workers=2, on_record=on_record)
+    for camera_id, priority, reader in cameras:
+        camera = service.add_camera(camera_id, "video.mp4", priority=priority)
+        camera.reader = reader or FakeReader()
+        camera.stream = FakeStream()
+        camera.reducer = RecordingReducer()
+    return service
+
+
+def _turns(service, count):
+    order = []
+    for _ in range(count):
+        camera = service._acquire()
+        order.append(camera.camera_id)
+        service._release(camera)
+    return order
+
+
+def test_weighted_round_robin():
+    service = _service(("A", 2, None), ("B", 1, None))
+    assert _turns(service, 6) == ["A", "B", "A", "A", "B", "A"]
+    assert [camera.turns for camera in service.cameras] == [4, 2]
+
+    # Kamera selesai tidak mendapat giliran; semua selesai -> None (worker berhenti)
+    service.cameras[0].finished = True
+    assert _turns(service, 2) == ["B", "B"]
+    service.cameras[1].finished = True
+    assert service._acquire() is None
+
+
+def test_busy_camera_is_not_shared():
+    """Kamera yang sedang diproses satu worker dilewati walau bobotnya lebih besar"""
+    service = _service(("A", 5, None), ("B", 1, None))
+    first = service._acquire()
+    assert first.camera_id == "A" and first.busy
+    assert service._acquire().camera_id == "B"
+    service._release(first)
+    assert not first.busy
+
+    # Setelah stop(): tidak ada giliran lagi (worker keluar)
+    service.stop()
+    assert service._acquire() is None
+
+
+def test_live_camera_waits_for_interval():
+    service = _service(("cam", 1, FakeReader(live=True)))
+    camera = service.cameras[0]
+    camera.sample_fps = 10.0
+
+    before = time.monotonic()
+    assert service._acquire() is camera
+    assert camera.next_due >= before + 0.1
+    service._release(camera)
+
+    # Giliran berikutnya tidak lebih cepat dari interval sampel
+    assert service._acquire() is camera
+    assert time.monotonic() >= before + 0.1
+    assert camera.late_turns == 0
+
+
+def test_step_reads_next_sample():
+    seen = []
+    reader = FakeReader([("f1", False), ("f2", True), ("diam", True), ("f4", False), ("f5", True)])
+    service = _service(("A", 1, reader), on_record=lambda camera_id, record: seen.append((camera_id, record['value'])))
+    camera = service.cameras[0]
+
+    service._step(camera)  # f1 bukan sampel -> f2 diproses
+    service._step(camera)  # diam -> skip motion
+    service._step(camera)  # f4 bukan sampel -> f5 diproses
+    assert [(record['frame'], record['value']) for record in camera.reducer.records] == [(2, "f2"), (5, "f5")]
+    assert camera.stream.skipped == [(3, 'motion')]
+    assert seen == [("A", "f2"), ("A", "f5")]
+    assert camera.frame_count == 5 and not camera.finished
+
+    service._step(camera)  # Sumber habis
+    assert camera.finished and camera.source_ended
+
+
+if __name__ == "__main__":
+    test_weighted_round_robin()
+    test_busy_camera_is_not_shared()
+    test_live_camera_waits_for_interval()
+    test_step_reads_next_sample()
+    print("OK")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Test script untuk reducer summary crowd yang dipakai UI Streamlit (summarize_crowd_records)
+"""
+
+import os
+import tempfile
+from datetime import datetime
+import numpy as np
+from main import FaceAccessSystem
+from recognition.crowd_recognize import CrowdDetectionComplete
+from recognition.detection_log import DetectionLog
+
+
+def _system(spill_dir):
+    crowd = CrowdDetectionComplete.__new__(CrowdDetectionComplete)
+    crowd.LOG_SPILL_DIR = spill_dir
+    crowd.DETECTION_MODE = 'full'
+    crowd.DETECTION_SCALE = 1.0
+    system = FaceAccessSystem.__new__(FaceAccessSystem)
+    system.crowd_detector = crowd
+    return system
+
+
+def _records(people=3):
+    filtered = {'stage0_no_face': 0}
+    for frame in range(1, people + 1):
+        yield {'type': 'frame', 'frame': frame, 'position_ms': frame * 200.0, 'detected': [],
+               'filtered': filtered, 'detect_ms': 5.0, 'embedded': 1, 'reused': 0, 'annotated_frame': None}
+        yield {'type': 'detection', 'frame': frame, 'timestamp': datetime.now(), 'id_pegawai': frame,
+               'nama': f"P{frame}", 'nip': str(frame), 'similarity': 0.8,
+               'bbox': np.array([0, 0, 10, 10], dtype=np.float32), 'track_id': frame,
+               'first_seen': frame, 'last_seen': frame}
+    yield {'type': 'end', 'total_frames': people, 'tracking': {'enabled': True, 'tracks': people},
+           'motion_gate': None, 'capture': None, 'degradation': None, 'sampling': None}
+
+
+def test_streamlit_reducer_spills_log():
+    """Dengan CROWD_LOG_SPILL_DIR, log ditulis ke file (bukan list) dan callback UI tetap jalan"""
+    spill_dir = tempfile.mkdtemp()
+    seen = []
+    summary = _system(spill_dir).summarize_crowd_records(
+        _records(), "WEBCAM", camera_id="cam 1", on_record=lambda record, reducer: seen.append(record['type'])
+    )
+
+    log = summary['detection_log']
+    assert isinstance(log, DetectionLog)
+    assert os.path.dirname(log.path) == spill_dir and os.path.exists(log.path)
+    assert "WEBCAM" in os.path.basename(log.path)
+    assert len(log) == 3 and [entry['id_pegawai'] for entry in log] == [1, 2, 3]
+    assert summary['unique_people'] == 3
+    assert seen.count('detection') == 3 and seen[-1] == 'end'
+
+
+def test_streamlit_reducer_in_memory_without_spill_dir():
+    summary = _system(None).summarize_crowd_records(_records(2))
+    assert isinstance(summary['detection_log'], list) and len(summary['detection_log']) == 2
+
+
+if __name__ == "__main__":
+    test_streamlit_reducer_spills_log()
+    test_streamlit_reducer_in_memory_without_spill_dir()
+    print("OK")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script untuk deteksi crowd mode tiled: input RetinaFace per tile harus kelipatan 32
+"""
+
+import numpy as np
+from insightface.app.common import Face
+from core.detector import FaceDetector
+from recognition.crowd_recognize import CrowdDetectionComplete
+
+
+class RecordingDetector:
+    """Detector palsu: catat ukuran input tiap tile, return satu wajah di tengah crop"""
+
+    pad_to_stride = staticmethod(FaceDetector.pad_to_stride)
+
+    def __init__(self):
+        self.calls = []
+
+    def detect_faces(self, frame, max_num=0, input_size=None):
+        self.calls.append((frame.shape[1], frame.shape[0], tuple(input_size)))
+        return [Face(bbox=np.array([10, 10, 40, 40], dtype=np.float32),
+                     kps=np.full((5, 2), 25, dtype=np.float32), det_score=0.9)]
+
+
+def _tiled_crowd(tile_size):
+    crowd = CrowdDetectionComplete.__new__(CrowdDetectionComplete)
+    crowd.detector = RecordingDetector()
+    crowd.TILE_SIZE = tile_size
+    crowd.TILE_OVERLAP = 0.25
+    crowd.TILE_NMS_IOU = 0.4
+    crowd._tile_pool = None
+    return crowd
+
+
+def test_tiled_input_is_stride_aligned():
+    """Frame 1000x700, tile 500 px: semua input kelipatan 32 dan sama dengan ukuran crop"""
+    crowd = _tiled_crowd(500)
+    frame = np.zeros((700, 1000, 3), dtype=np.uint8)
+    tiles = crowd._tile_grid(1000, 700)
+    faces = crowd._detect_tiled(frame, tiles)
+
+    assert len(crowd.detector.calls) == len(tiles)
+    for crop_w, crop_h, (input_w, input_h) in crowd.detector.calls:
+        assert input_w % 32 == 0 and input_h % 32 == 0
+        assert (crop_w, crop_h) == (input_w, input_h)
+        assert crop_w >= 500 and crop_h >= 500
+
+    # Koordinat dikembalikan ke frame asli (padding kanan/bawah tidak menggeser bbox)
+    offsets = {(x1, y1) for x1, y1, _, _ in tiles}
+    for face in faces:
+        assert (face.bbox[0] - 10, face.bbox[1] - 10) in offsets
+
+
+def test_adaptive_size_check_uses_detection_window():
+    """Mode adaptive: wajah full-frame diukur terhadap frame, wajah tile terhadap tile"""
+    crowd = _tiled_crowd(500)
+    crowd.SMALL_FACE_PX = 64
+
+    def detect_faces(frame, max_num=0, input_size=None):
+        # Full-frame: satu wajah kecil di (600, 400); tile: satu wajah di pojok crop
+        if frame.shape[1] == 1000:
+            return [Face(bbox=np.array([600, 400, 630, 430], dtype=np.float32),
+                         kps=np.full((5, 2), 615, dtype=np.float32), det_score=0.9)]
+        return [Face(bbox=np.array([10, 10, 40, 40], dtype=np.float32),
+                     kps=np.full((5, 2), 25, dtype=np.float32), det_score=0.9)]
+
+    crowd.detector.detect_faces = detect_faces
+    faces = crowd._detect_adaptive(np.zeros((700, 1000, 3), dtype=np.uint8))
+
+    full_pass = [face for face in faces if face.bbox[0] == 600]
+    tile_pass = [face for face in faces if face.bbox[0] != 600]
+    assert len(full_pass) == 1 and full_pass[0].det_area is None
+    assert tile_pass and all(face.det_area == 500 * 500 for face in tile_pass)
+
+
+def test_pad_to_stride_keeps_aligned_frame():
+    frame = np.ones((640, 480, 3), dtype=np.uint8)
+    assert FaceDetector.pad_to_stride(frame) is frame
+
+    padded = FaceDetector.pad_to_stride(frame[:500, :470])
+    assert padded.shape == (512, 480, 3)
+    assert padded[:500, :470].all() and not padded[500:].any()
+
+
+if __name__ == "__main__":
+    test_tiled_input_is_stride_aligned()
+    test_adaptive_size_check_uses_detection_window()
+    test_pad_to_stride_keeps_aligned_frame()
+    print("OK")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Test script untuk detection log crowd di disk: spill -> merge_summaries -> report -> ekspor kolom
+"""
+
+import os
+import tempfile
+import threading
+from datetime import datetime
+import numpy as np
+from recognition.crowd_recognize import CrowdDetectionComplete
+from recognition.crowd_stream import CrowdSummary
+from recognition.detection_log import DetectionLog, DetectionLogWriter, new_log_path, export_columnar
+
+
+class RecordingLogRepo:
+    def __init__(self):
+        self.rows = []
+
+    def log_crowd_detection(self, **row):
+        self.rows.append(row)
+
+
+def _crowd(spill_dir, sort_run=50000):
+    crowd = CrowdDetectionComplete.__new__(CrowdDetectionComplete)
+    crowd.LOG_SPILL_DIR = spill_dir
+    crowd.LOG_SORT_RUN = sort_run
+    crowd.DETECTION_MODE = 'full'
+    crowd.DETECTION_SCALE = 1.0
+    crowd.log_repo = RecordingLogRepo()
+    crowd._db_lock = threading.RLock()
+    return crowd
+
+
+def _entry(frame, id_pegawai, track_id, first_seen, last_seen, similarity, **flags):
+    return dict(
+        frame=frame, timestamp=datetime(2024, 1, 1, 8, 0, frame % 60), id_pegawai=id_pegawai,
+        nama=f"P{id_pegawai}", nip=str(id_pegawai), similarity=similarity,
+        bbox=np.array([0, 0, 10, 10], dtype=np.float32), track_id=track_id,
+        first_seen=first_seen, last_seen=last_seen, **flags
+    )
+
+
+def _segment_summary(crowd, entries, total_frames):
+    """Summary satu segmen lewat reducer yang sama dengan detect_from_video"""
+    reducer = crowd._new_summary("VIDEO")
+    for entry in entries:
+        reducer.add(dict(entry, type='detection'))
+    reducer.add({'type': 'frame', 'frame': total_frames, 'position_ms': 0.0, 'detected': [],
+                 'filtered': {}, 'detect_ms': 4.0, 'embedded': 0, 'reused': 0, 'annotated_frame': None})
+    reducer.add({'type': 'end', 'total_frames': total_frames,
+                 'tracking': {'enabled': True, 'tracks': len(entries)},
+                 'motion_gate': None, 'capture': None, 'degradation': None, 'sampling': None})
+    return reducer.summary()
+
+
+def test_writer_round_trip():
+    """Tipe NumPy & datetime disimpan sebagai JSON biasa dan dikembalikan saat dibaca"""
+    path = new_log_path(tempfile.mkdtemp(), "WEBCAM", camera_id="cam/1 lobby")
+    assert "cam_1_lobby" in os.path.basename(path)
+
+    writer = DetectionLogWriter(path)
+    writer.append(_entry(3, np.int64(7), 1, 3, 5, np.float32(0.75)))
+    writer.append(dict(_entry(4, 8, None, 4, 4, 0.6), bbox=None, timestamp=None))
+    log = writer.close()
+
+    entries = list(log)
+    assert len(log) == 2 and len(DetectionLog(path)) == 2  # count dari writer / hitung ulang file
+    assert entries[0]['timestamp'] == datetime(2024, 1, 1, 8, 0, 3)
+    assert entries[0]['id_pegawai'] == 7 and np.isclose(entries[0]['similarity'], 0.75)
+    assert entries[0]['bbox'].dtype == np.float32 and entries[0]['bbox'].tolist() == [0, 0, 10, 10]
+    assert entries[1]['bbox'] is None and entries[1]['timestamp'] is None and entries[1]['track_id'] is None
+
+    empty = DetectionLogWriter(new_log_path(tempfile.mkdtemp())).close()
+    assert not empty and list(empty) == []
+
+    writer = DetectionLogWriter(new_log_path(tempfile.mkdtemp()))
+    try:
+        writer.append({'frame': 1, 'face': object()})
+        assert False, "tipe tak dikenal harus ditolak"
+    except TypeError:
+        pass
+    finally:
+        writer.close()
+
+
+def test_spilled_merge_matches_in_memory():
+    """Merge run terurut di disk (run kecil) menghasilkan urutan sama dengan sort di memori"""
+    rng = np.random.default_rng(0)
+    segments = []
+    for segment in range(3):
+        entries = [
+            _entry(int(frame), int(rng.integers(1, 20)), track, int(frame), int(frame) + 5, 0.7)
+            for track, frame in enumerate(rng.integers(segment * 100, (segment + 1) * 100, size=15))
+        ]
+        segments.append(entries)
+
+    in_memory = _crowd(None)
+    expected = in_memory.merge_summaries([_segment_summary(in_memory, entries, 300) for entries in segments])
+
+    spilled = _crowd(tempfile.mkdtemp(), sort_run=4)
+    merged = spilled.merge_summaries([_segment_summary(spilled, entries, 300) for entries in segments])
+
+    order = [(entry['frame'], entry['segment'], entry['track_id']) for entry in merged['detection_log']]
+    assert order == sorted(order) and len(order) == 45
+    assert order == [(entry['frame'], entry['segment'], entry['track_id']) for entry in expected['detection_log']]
+    assert merged['unique_people'] == expected['unique_people']
+    assert len(os.listdir(spilled.LOG_SPILL_DIR)) == 1  # File segmen & run dihapus
+
+
+def test_export_columnar_from_list():
+    entries = [
+        _entry(1, 5, 2, 1, 4, 0.9),
+        dict(_entry(2, 6, None, 2, 2, 0.5), bbox=None, nama="Nama Panjang Sekali"),
+    ]
+    out_dir = os.path.join(tempfile.mkdtemp(), 'cols')
+    paths = export_columnar(entries, out_dir)
+
+    assert 'segment' not in paths  # Log satu sumber (tanpa segmen)
+    columns = {name: np.load(path) for name, path in paths.items()}
+    assert columns['track_id'].tolist() == [2, -1]
+    assert columns['nama'].tolist() == ["P5", "Nama Panjang Sekali"]
+    assert np.isnan(columns['bbox'][1]).all() and columns['bbox'][0].tolist() == [0, 0, 10, 10]
+    assert columns['timestamp'][0] == np.datetime64('2024-01-01T08:00:01')
+    assert np.allclose(columns['similarity'], [0.9, 0.5])
+
+    # Log kosong: kolom tetap dibuat dengan panjang 0
+    assert len(np.load(export_columnar([], out_dir)['frame'])) == 0
+
+
+def test_spilled_log_round_trip():
+    """Log segmen di disk (tidak urut frame) -> merge (urut, track batas digabung) -> report & kolom"""
+    spill_dir = tempfile.mkdtemp()
+    crowd = _crowd(spill_dir, sort_run=2)
+    # Entry ditulis saat track selesai, jadi tiap segmen tidak urut frame
+    segments = [
+        [_entry(20, 2, 2, 20, 30, 0.7), _entry(10, 1, 1, 5, 100, 0.6, open_end=True),
+         _entry(8, 3, 3, 8, 12, 0.9)],
+        [_entry(150, 4, 2, 140, 160, 0.7), _entry(120, 1, 1, 101, 190, 0.8, open_start=True)],
+    ]
+    summaries = [_segment_summary(crowd, entries, 100 * (i + 1)) for i, entries in enumerate(segments)]
+    assert all(isinstance(summary['detection_log'], DetectionLog) for summary in summaries)
+
+    merged = crowd.merge_summaries(summaries)
+    log = merged['detection_log']
+    assert isinstance(log, DetectionLog)
+    assert [(entry['frame'], entry['id_pegawai']) for entry in log] == [(8, 3), (20, 2), (120, 1), (150, 4)]
+    person = next(entry for entry in log if entry['id_pegawai'] == 1)
+    assert (person['first_seen'], person['last_seen'], person['similarity']) == (5, 190, 0.8)
+    assert all('open_start' not in entry and 'open_end' not in entry for entry in log)
+    # crowd_log yang ditunda worker ditulis sekali untuk track gabungan
+    assert [row['id_pegawai'] for row in crowd.log_repo.rows] == [1]
+    # Hanya file gabungan yang tersisa
+    assert os.listdir(spill_dir) == [os.path.basename(log.path)]
+
+    report = crowd.generate_detection_report(merged, print_report=False, columnar_dir=os.path.join(spill_dir, 'cols'))
+    assert "Unique People: 4" in report
+    assert "P1 (NIP: 1)" in report and "Last Seen: Frame 190" in report
+    assert report.index("Frame     8") < report.index("Frame   150")
+
+    columns = {name: np.load(os.path.join(spill_dir, 'cols', f"{name}.npy"), mmap_mode='r')
+               for name in ('frame', 'segment', 'track_id', 'bbox', 'timestamp')}
+    assert columns['frame'].tolist() == [8, 20, 120, 150]
+    assert columns['segment'].tolist() == [0, 0, 0, 1]
+    assert columns['bbox'].shape == (4, 4)
+    assert columns['timestamp'].dtype == np.dtype('datetime64[us]')
+
+
+def test_report_people_without_log():
+    """keep_log=False atau file log sudah dihapus: section people tetap dari counter reducer"""
+    crowd = _crowd(None)
+    reducer = CrowdSummary(crowd, keep_log=False)
+    for entry in (_entry(5, 7, 1, 5, 9, 0.6), _entry(30, 7, 2, 30, 33, 0.8)):
+        reducer.add(dict(entry, type='detection'))
+    reducer.add({'type': 'end', 'total_frames': 40, 'tracking': {'enabled': True, 'tracks': 2},
+                 'motion_gate': None, 'capture': None, 'degradation': None, 'sampling': None})
+    summary = reducer.summary()
+
+    report = crowd.generate_detection_report(summary, print_report=False)
+    assert "P7 (NIP: 7)" in report and "Appearances: 2 times" in report
+    assert "avg 0.700, max 0.800" in report
+    assert "detection log tidak disimpan" in report
+
+    spilled = _segment_summary(_crowd(tempfile.mkdtemp()), [_entry(5, 7, 1, 5, 9, 0.6)], 10)
+    os.remove(spilled['detection_log'].path)
+    report = crowd.generate_detection_report(spilled, print_report=False)
+    assert "P7 (NIP: 7)" in report and "file detection log tidak ditemukan" in report
+
+
+if __name__ == "__main__":
+    test_writer_round_trip()
+    test_spilled_merge_matches_in_memory()
+    test_export_columnar_from_list()
+    test_spilled_log_round_trip()
+    test_report_people_without_log()
+    print("OK")
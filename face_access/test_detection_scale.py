@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script untuk CROWD_DETECTION_SCALE: deteksi di frame kecil, bbox/kps dikembalikan ke resolusi asli
+"""
+
+import numpy as np
+from insightface.app.common import Face
+from core.detector import FaceDetector
+from recognition.crowd_recognize import CrowdDetectionComplete
+
+
+class RecordingDetector:
+    """Detector palsu: catat ukuran frame & input, return satu wajah di tengah frame yang diterima"""
+
+    fit_input_size = FaceDetector.fit_input_size
+    pad_to_stride = staticmethod(FaceDetector.pad_to_stride)
+    downscale = staticmethod(FaceDetector.downscale)
+    rescale_faces = staticmethod(FaceDetector.rescale_faces)
+
+    def __init__(self):
+        self.det_size = (1024, 1024)
+        self.calls = []
+
+    def detect_faces(self, frame, max_num=0, input_size=None):
+        h, w = frame.shape[:2]
+        self.calls.append((w, h, input_size))
+        return [Face(bbox=np.array([w / 2 - 20, h / 2 - 20, w / 2 + 20, h / 2 + 20], dtype=np.float32),
+                     kps=np.full((5, 2), [w / 2, h / 2], dtype=np.float32), det_score=0.9)]
+
+
+def _crowd(mode='full', scale=1.0):
+    crowd = CrowdDetectionComplete.__new__(CrowdDetectionComplete)
+    crowd.detector = RecordingDetector()
+    crowd.DETECTION_MODE = mode
+    crowd.DETECTION_SCALE = scale
+    crowd.TILE_SIZE = 640
+    crowd.TILE_OVERLAP = 0.25
+    crowd.TILE_NMS_IOU = 0.4
+    crowd._tile_pool = None
+    return crowd
+
+
+def test_full_resolution_is_unchanged():
+    crowd = _crowd(scale=1.0)
+    faces = crowd._detect(np.zeros((1080, 1920, 3), dtype=np.uint8))
+    assert crowd.detector.calls == [(1920, 1080, None)]
+    assert faces[0].bbox.tolist() == [940, 520, 980, 560]
+
+
+def test_downscaled_detection_maps_back():
+    """Frame 1920x1080, skala 0.5: RetinaFace melihat 960x540 (input tidak di-upscale ke det_size)"""
+    crowd = _crowd(scale=0.5)
+    faces = crowd._detect(np.zeros((1080, 1920, 3), dtype=np.uint8))
+
+    assert crowd.detector.calls == [(960, 540, (960, 544))]
+    assert np.allclose(faces[0].bbox, [920, 500, 1000, 580])  # Tengah frame asli, ukuran x2
+    assert np.allclose(faces[0].kps, [960, 540])
+    assert faces[0].det_score == 0.9
+
+    # Override skala dari FrameBudget
+    crowd = _crowd(scale=1.0)
+    crowd._detect(np.zeros((1080, 1920, 3), dtype=np.uint8), scale=0.25)
+    assert crowd.detector.calls == [(480, 270, (480, 288))]
+
+
+def test_downscaled_tiles_keep_detection_area():
+    """Mode tiled di frame kecil: det_area (luas tile) ikut diskalakan ke piksel asli"""
+    crowd = _crowd(mode='tiled', scale=0.5)
+    faces = crowd._detect(np.zeros((1440, 2560, 3), dtype=np.uint8))
+    assert crowd.detector.calls and all(w <= 640 and h <= 640 for w, h, _ in crowd.detector.calls)
+    assert faces and all(face.det_area == 640 * 640 * 4 for face in faces)
+
+
+def test_fit_input_size():
+    detector = RecordingDetector()
+    assert detector.fit_input_size(np.zeros((200, 300, 3))) == (320, 224)
+    assert detector.fit_input_size(np.zeros((2160, 3840, 3))) == (1024, 1024)
+
+
+if __name__ == "__main__":
+    test_full_resolution_is_unchanged()
+    test_downscaled_detection_maps_back()
+    test_downscaled_tiles_keep_detection_area()
+    test_fit_input_size()
+    print("OK")
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script untuk embedding ArcFace batch: urutan hasil sama dengan per crop, chunk per batch size
+"""
+
+import numpy as np
+from core.embedding import EmbeddingExtractor
+
+
+class RecordingRecModel:
+    """Model recognition palsu: fitur = isi crop (flatten, tidak ternormalisasi); catat ukuran batch"""
+
+    def __init__(self, batch_dim=None):
+        self.input_shape = [batch_dim, 3, 112, 112]
+        self.input_size = (112, 112)
+        self.batches = []
+
+    def get_feat(self, crops):
+        if self.input_shape[0] is not None:
+            assert len(crops) <= self.input_shape[0]
+        self.batches.append(len(crops))
+        return np.stack([crop.reshape(-1)[:512] for crop in crops]).astype(np.float32) * 3.0
+
+
+class FakeDetector:
+    def __init__(self, rec_model):
+        self.rec_model = rec_model
+
+
+def _crops(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.standard_normal((16, 16, 3)).astype(np.float32) + 0.1 for _ in range(count)]
+
+
+def test_batches_are_chunked_and_ordered():
+    model = RecordingRecModel()
+    extractor = EmbeddingExtractor(FakeDetector(model), batch_size=4)
+    crops = _crops(10)
+
+    embeddings = extractor.extract_batch(crops)
+    assert model.batches == [4, 4, 2]
+    assert embeddings.shape == (10, 512) and embeddings.dtype == np.float32
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
+
+    # Sama dengan menjalankan satu crop per run
+    single = np.concatenate([extractor.extract_batch([crop]) for crop in crops])
+    assert np.allclose(embeddings, single, atol=1e-6)
+
+
+def test_static_batch_dimension():
+    """Model ONNX dengan batch statis 1 tetap dijalankan satu per satu"""
+    model = RecordingRecModel(batch_dim=1)
+    extractor = EmbeddingExtractor(FakeDetector(model), batch_size=32)
+    assert len(extractor.extract_batch(_crops(3))) == 3
+    assert model.batches == [1, 1, 1]
+
+    model = RecordingRecModel(batch_dim=8)
+    EmbeddingExtractor(FakeDetector(model), batch_size=32).extract_batch(_crops(10))
+    assert model.batches == [8, 2]
+
+
+def test_empty_and_extract_faces():
+    model = RecordingRecModel()
+    extractor = EmbeddingExtractor(FakeDetector(model))
+    assert extractor.extract_batch([]).shape == (0, 512)
+    assert extractor.extract_faces(None, []) == []
+    assert model.batches == []
+
+    class Face:
+        def __init__(self, crop):
+            self.crop = crop
+            self.embedding = None
+
+    # align() memakai face_align.norm_crop; di sini crop sudah tersedia per wajah
+    extractor.align = lambda frame, face: face.crop
+    faces = [Face(crop) for crop in _crops(3, seed=1)]
+    embeddings = extractor.extract_faces(None, faces)
+    assert model.batches == [3]
+    for face, embedding in zip(faces, embeddings):
+        assert np.array_equal(face.embedding, embedding)
+        assert np.allclose(embedding, extractor.extract_batch([face.crop])[0], atol=1e-6)
+
+
+if __name__ == "__main__":
+    test_batches_are_chunked_and_ordered()
+    test_static_batch_dimension()
+    test_empty_and_extract_faces()
+    print("OK")
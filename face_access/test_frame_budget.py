@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script untuk FrameBudget: naik/turun level, hysteresis (dwell & recover_ratio), level 3 skip frame
+"""
+
+from recognition.frame_budget import FrameBudget
+
+DETECT_HEAVY = {'detect': 60.0, 'filter': 10.0, 'embed': 30.0}
+
+
+def _budget(**kwargs):
+    # smoothing=1.0: rata-rata = frame terakhir, supaya langkah level mudah dihitung
+    return FrameBudget(100, smoothing=1.0, dwell_frames=3, **kwargs)
+
+
+def _run(budget, frame_ms, frames, stage_ms=DETECT_HEAVY):
+    levels = []
+    for _ in range(frames):
+        budget.record(frame_ms, stage_ms)
+        levels.append((budget.level, budget.process_interval))
+    return levels
+
+
+def test_degrades_one_level_per_dwell():
+    budget = _budget()
+    levels = _run(budget, 250, 9)
+    # Level hanya berubah setelah dwell_frames frame sejak perubahan terakhir
+    assert levels == [(0, 1), (0, 1), (1, 1), (1, 1), (1, 1), (2, 1), (2, 1), (2, 1), (3, 2)]
+    assert budget.detection_scale(1.0) == 0.75
+    assert budget.skip_optional_stages and budget.reuse_tracks
+
+    # Level 3: interval naik selama frame yang diproses > budget x interval, sampai max_interval
+    assert _run(budget, 250, 9)[-1] == (3, 3)  # 250 < 100 x 3: interval berhenti naik
+    assert _run(budget, 450, 9)[-1] == (3, 4)
+    assert budget.max_level == 3
+
+
+def test_hysteresis_band_holds_level():
+    budget = _budget()
+    _run(budget, 150, 3)
+    assert budget.level == 1
+    # Di antara budget x recover_ratio (60) dan budget (100): level bertahan
+    assert _run(budget, 80, 20)[-1] == (1, 1)
+    # Jauh di bawah budget: pulih ke normal
+    assert _run(budget, 40, 3)[-1] == (0, 1)
+    assert budget.stats()['level_changes'] == 2
+
+
+def test_recovery_steps_back_through_interval():
+    budget = _budget(max_interval=3)
+    _run(budget, 400, 15)
+    assert (budget.level, budget.process_interval) == (3, 3)
+
+    # Turun: interval 3 -> 2 dulu, lalu level 3 -> 2 -> 1 -> 0
+    levels = _run(budget, 10, 15)
+    assert levels[2::3] == [(3, 2), (2, 1), (1, 1), (0, 1), (0, 1)]
+    assert budget.detection_scale(1.0) == 1.0 and not budget.skip_optional_stages
+
+
+def test_skips_steps_for_non_dominant_stages():
+    """Deteksi < 25% waktu frame: menurunkan resolusi deteksi dilompati"""
+    budget = _budget()
+    _run(budget, 250, 3, stage_ms={'detect': 10.0, 'filter': 20.0, 'embed': 70.0})
+    assert budget.level == 2
+
+    budget = _budget()
+    _run(budget, 250, 3, stage_ms={'detect': 10.0, 'filter': 5.0, 'embed': 5.0, 'overlay': 80.0})
+    assert (budget.level, budget.process_interval) == (3, 2)
+
+
+def test_admit_at_level_three():
+    budget = _budget()
+    assert all(budget.admit() for _ in range(5))
+    _run(budget, 250, 9)
+    assert [budget.admit() for _ in range(6)] == [False, True] * 3
+    stats = budget.stats()
+    assert stats['skipped_frames'] == 3 and stats['level_name'] == 'skip_frames'
+    assert sum(stats['frames_at_level'].values()) == 9
+
+
+if __name__ == "__main__":
+    test_degrades_one_level_per_dwell()
+    test_hysteresis_band_holds_level()
+    test_recovery_steps_back_through_interval()
+    test_skips_steps_for_non_dominant_stages()
+    test_admit_at_level_three()
+    print("OK")
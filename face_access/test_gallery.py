@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script untuk EmbeddingGallery & FaceMatcher: hasil vektorisasi sama dengan loop cosine lama
+"""
+
+import numpy as np
+from core.gallery import EmbeddingGallery
+from core.matcher import FaceMatcher
+
+
+def _normalized(count, dim=64, seed=0):
+    matrix = np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _loop_best(probe, ids, matrix):
+    """Referensi: loop satu per satu seperti FaceMatcher.match versi awal"""
+    best_id, best_similarity = None, -1.0
+    for id_pegawai, embedding in zip(ids, matrix):
+        similarity = float(np.dot(probe, embedding))
+        if similarity > best_similarity:
+            best_id, best_similarity = int(id_pegawai), similarity
+    return best_id, best_similarity
+
+
+def test_best_matches_loop():
+    ids = np.repeat(np.arange(50), 2)  # Dua template per pegawai
+    matrix = _normalized(100)
+    gallery = EmbeddingGallery(ids, matrix)
+    probes = _normalized(20, seed=1)
+
+    batch_ids, batch_similarities = gallery.best_batch(probes)
+    for probe, batch_id, batch_similarity in zip(probes, batch_ids, batch_similarities):
+        expected_id, expected_similarity = _loop_best(probe, ids, matrix)
+        best_id, best_similarity = gallery.best(probe)
+        assert best_id == expected_id == int(batch_id)
+        assert np.isclose(best_similarity, expected_similarity, atol=1e-5)
+        assert np.isclose(batch_similarity, expected_similarity, atol=1e-5)
+
+
+def test_top_k_and_best_among():
+    ids = np.arange(30)
+    matrix = _normalized(30)
+    gallery = EmbeddingGallery(ids, matrix)
+    probe = matrix[7]
+
+    top = gallery.top_k(probe, k=5)
+    scores = matrix @ probe
+    assert [i for i, _ in top] == np.argsort(-scores)[:5].tolist()
+    assert top[0] == (7, top[0][1]) and np.isclose(top[0][1], 1.0, atol=1e-5)
+
+    # Kandidat (mis. dari ANN) di-rerank exact; id tak dikenal diabaikan
+    assert gallery.best_among(probe, [3, 7, 999])[0] == 7
+    assert gallery.best_among(probe, [999]) == (None, 0.0)
+
+
+def test_empty_gallery():
+    gallery = EmbeddingGallery.from_embeddings([(1, None)], dim=64)
+    assert len(gallery) == 0
+    assert gallery.best(_normalized(1)[0]) == (None, 0.0)
+    ids, similarities = gallery.best_batch(_normalized(3))
+    assert ids.tolist() == [-1, -1, -1] and not similarities.any()
+    assert gallery.top_k(_normalized(1)[0]) == []
+
+
+def test_matcher_threshold():
+    matrix = _normalized(10)
+    stored = [(i + 1, matrix[i]) for i in range(10)]
+    matcher = FaceMatcher(threshold=0.6)
+
+    assert matcher.match(matrix[4], stored)[0] == 5
+    # Di bawah threshold: id None, similarity tetap dilaporkan
+    far = _normalized(1, seed=5)[0]
+    id_pegawai, similarity = matcher.match(far, stored)
+    assert id_pegawai is None and similarity < 0.6
+    assert matcher.match(None, stored) == (None, 0.0)
+
+    results = matcher.match_batch([matrix[2], far], stored)
+    assert results[0][0] == 3 and results[1][0] is None
+    assert matcher.match_batch([], stored) == []
+
+
+if __name__ == "__main__":
+    test_best_matches_loop()
+    test_top_k_and_best_among()
+    test_empty_gallery()
+    test_matcher_threshold()
+    print("OK")
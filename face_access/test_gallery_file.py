@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Test script untuk gallery file memmap: grow, discard_last, referensi "gallery:<i>" dan baris hilang
+"""
+
+import os
+import tempfile
+import numpy as np
+from db.gallery_file import GalleryFile
+from db.embedding_repo import EmbeddingRepository
+
+
+class FakeCursor:
+    def __init__(self, rows, fail_insert):
+        self.rows = rows
+        self.fail_insert = fail_insert
+        self.lastrowid = None
+
+    def execute(self, query, params=None):
+        if query.startswith("INSERT") and self.fail_insert:
+            raise RuntimeError("insert gagal")
+        self.query = query
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return len(self.rows), len(self.rows)
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    """Koneksi palsu: SELECT face_embedding mengembalikan rows, INSERT bisa dibuat gagal"""
+
+    def __init__(self, rows=(), fail_insert=False):
+        self.rows = list(rows)
+        self.fail_insert = fail_insert
+
+    def get_connection(self):
+        return self
+
+    get_read_connection = get_connection
+
+    def cursor(self):
+        return FakeCursor(self.rows, self.fail_insert)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def _vectors(count, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+
+def test_append_grows_and_round_trips():
+    gallery = GalleryFile(os.path.join(tempfile.mkdtemp(), "gallery.bin"), dim=8, initial_capacity=2)
+    vectors = _vectors(5)
+    rows = [gallery.append(100 + i, vector) for i, vector in enumerate(vectors)]
+
+    assert rows == [0, 1, 2, 3, 4]
+    dim, count, capacity = gallery.read_header()
+    assert (dim, count) == (8, 5) and capacity >= 5
+    ids, matrix = gallery.load()
+    assert ids.tolist() == [100, 101, 102, 103, 104]
+    assert np.array_equal(matrix, vectors)
+
+
+def test_discard_last_only_reclaims_latest_row():
+    gallery = GalleryFile(os.path.join(tempfile.mkdtemp(), "gallery.bin"), dim=8)
+    vectors = _vectors(3)
+    for i, vector in enumerate(vectors[:2]):
+        gallery.append(i, vector)
+
+    assert not gallery.discard_last(0)  # Sudah ada append sesudahnya
+    assert gallery.discard_last(1)
+    assert gallery.read_header()[1] == 1
+    # Slot yang dikembalikan dipakai lagi
+    assert gallery.append(9, vectors[2]) == 1
+    ids, matrix = gallery.load()
+    assert ids.tolist() == [0, 9] and np.array_equal(matrix[1], vectors[2])
+
+
+def test_refs_round_trip():
+    for row in (0, 7, 123456):
+        ref = GalleryFile.make_ref(row)
+        assert GalleryFile.parse_ref(ref) == row
+        assert GalleryFile.parse_ref(ref.encode("ascii")) == row
+    assert GalleryFile.parse_ref("/embeddings/1_abc.pkl") is None
+    assert GalleryFile.parse_ref(b"\x00" * 2048) is None
+    assert GalleryFile.parse_ref("gallery:x") is None
+
+
+def _repository(database, path):
+    repo = EmbeddingRepository(database, storage_mode="gallery")
+    repo.gallery_file = GalleryFile(path, dim=EmbeddingRepository.EMBEDDING_DIM)
+    return repo
+
+
+def test_failed_insert_does_not_leave_orphan_row():
+    path = os.path.join(tempfile.mkdtemp(), "gallery.bin")
+    repo = _repository(FakeDatabase(fail_insert=True), path)
+    try:
+        repo.save(1, _vectors(1, dim=512)[0])
+        assert False, "insert gagal harus di-raise"
+    except RuntimeError:
+        pass
+    assert repo.gallery_file.read_header()[1] == 0
+
+
+def test_missing_rows_are_skipped():
+    """Referensi ke baris di luar file (file diganti/terpotong) dilewati, baris lain tetap dimuat"""
+    path = os.path.join(tempfile.mkdtemp(), "gallery.bin")
+    vectors = _vectors(2, dim=512)
+    gallery = GalleryFile(path, dim=512)
+    for i, vector in enumerate(vectors):
+        gallery.append(i + 1, vector)
+
+    rows = [(1, GalleryFile.make_ref(0)), (2, GalleryFile.make_ref(1)), (3, GalleryFile.make_ref(5))]
+    embeddings = _repository(FakeDatabase(rows), path).get_gallery()
+    assert embeddings.ids.tolist() == [1, 2]
+    assert np.allclose(embeddings.matrix, vectors)
+
+    # File hilang: tidak fatal, gallery kosong
+    os.remove(path)
+    assert len(_repository(FakeDatabase(rows), path).get_gallery()) == 0
+
+
+if __name__ == "__main__":
+    test_append_grows_and_round_trips()
+    test_discard_last_only_reclaims_latest_row()
+    test_refs_round_trip()
+    test_failed_insert_does_not_leave_orphan_row()
+    test_missing_rows_are_skipped()
+    print("OK")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script untuk FaceTracker: asosiasi IoU antar frame, aging track, template top-k per track
+"""
+
+import numpy as np
+from recognition.tracker import FaceTracker, FaceTrack
+
+
+def _box(x, y, size=40):
+    return [x, y, x + size, y + size]
+
+
+def test_association_follows_moving_faces():
+    tracker = FaceTracker(iou_threshold=0.3, max_age=2)
+    first = tracker.update([_box(0, 0), _box(200, 0)])
+    assert [track.track_id for track in first] == [1, 2]
+
+    # Wajah bergerak sedikit, urutan deteksi terbalik: track tetap sama
+    second = tracker.update([_box(205, 2), _box(4, 3)])
+    assert [track.track_id for track in second] == [2, 1]
+    assert all(track.hits == 2 and track.time_since_update == 0 for track in second)
+
+    # Wajah baru di tempat lain -> track baru
+    third = tracker.update([_box(8, 5), _box(210, 4), _box(400, 400)])
+    assert [track.track_id for track in third] == [1, 2, 3]
+    assert tracker.total_tracks == 3
+
+
+def test_one_detection_per_track():
+    """Dua deteksi overlap satu track: IoU terbesar dapat track, sisanya track baru"""
+    tracker = FaceTracker(iou_threshold=0.3)
+    tracker.update([_box(0, 0)])
+    tracks = tracker.update([_box(15, 0), _box(1, 0)])
+    assert [track.track_id for track in tracks] == [2, 1]
+
+
+def test_aging_and_flush():
+    tracker = FaceTracker(iou_threshold=0.3, max_age=2)
+    track = tracker.update([_box(0, 0)])[0]
+    other = tracker.update([_box(0, 0), _box(300, 300)])[1]
+
+    # Track 1 tidak terlihat: bertahan max_age frame, lalu selesai
+    tracker.update([_box(300, 300)])
+    tracker.update([_box(300, 300)])
+    assert tracker.pop_finished() == []
+    tracker.update([_box(300, 300)])
+    assert tracker.pop_finished() == [track]
+    assert tracker.pop_finished() == []
+    assert tracker.tracks == [other]
+
+    # Wajah muncul lagi setelah track berakhir -> track baru
+    assert tracker.update([_box(0, 0), _box(300, 300)])[0].track_id == 3
+
+    assert {t.track_id for t in tracker.flush()} == {2, 3}
+    assert tracker.tracks == []
+
+
+def test_samples_and_identity():
+    track = FaceTrack(1, _box(0, 0))
+    for frame, quality in enumerate([0.2, 0.9, 0.5, 0.7]):
+        if track.accepts(quality, top_k=2):
+            embedding = np.zeros(4, dtype=np.float32)
+            embedding[frame] = 1.0
+            track.add_sample(quality, embedding, frame, _box(0, 0), top_k=2)
+        track.mark_seen(frame + 10)
+
+    assert [sample['quality'] for sample in track.samples] == [0.9, 0.7]
+    assert not track.accepts(0.6, top_k=2) and track.accepts(0.8, top_k=2)
+    assert track.best_sample['frame'] == 1
+    assert (track.first_frame, track.last_frame) == (10, 13)
+
+    # Template: rata-rata berbobot kualitas, ternormalisasi
+    template = track.template()
+    assert np.isclose(np.linalg.norm(template), 1.0)
+    assert template[1] > template[3] > 0 and template[0] == template[2] == 0
+
+    assert track.is_uncertain(0.5)
+    track.set_identity(7, 0.4)
+    assert track.is_uncertain(0.5)
+    track.set_identity(7, 0.8)
+    assert not track.is_uncertain(0.5)
+    track.reset_samples()
+    assert track.template() is None and track.is_uncertain(0.5)
+
+
+if __name__ == "__main__":
+    test_association_follows_moving_faces()
+    test_one_detection_per_track()
+    test_aging_and_flush()
+    test_samples_and_identity()
+    print("OK")
@@ -16,4 +16,35 @@ def calculate_all_similarities(embeddings):
         for j in range(i + 1, n):
             sim = cosine_similarity(embeddings[i], embeddings[j])
             similarities.append(sim)
-    return similarities
\ No newline at end of file
+    return similarities
+
+def box_iou(boxes1, boxes2):
+    """Pairwise IoU antara boxes1 (N, 4) dan boxes2 (M, 4) format x1, y1, x2, y2"""
+    boxes1 = np.asarray(boxes1, dtype=np.float32).reshape(-1, 4)
+    boxes2 = np.asarray(boxes2, dtype=np.float32).reshape(-1, 4)
+
+    x1 = np.maximum(boxes1[:, None, 0], boxes2[None, :, 0])
+    y1 = np.maximum(boxes1[:, None, 1], boxes2[None, :, 1])
+    x2 = np.minimum(boxes1[:, None, 2], boxes2[None, :, 2])
+    y2 = np.minimum(boxes1[:, None, 3], boxes2[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+
+    area1 = (boxes1[:, 2] - boxes1[:, 0]) * (boxes1[:, 3] - boxes1[:, 1])
+    area2 = (boxes2[:, 2] - boxes2[:, 0]) * (boxes2[:, 3] - boxes2[:, 1])
+    union = area1[:, None] + area2[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+def nms(boxes, scores, iou_threshold=0.4):
+    """Non-maximum suppression; return index box yang dipertahankan (urut score menurun)"""
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    order = np.argsort(-np.asarray(scores, dtype=np.float32), kind='stable')
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(int(i))
+        if order.size == 1:
+            break
+        ious = box_iou(boxes[i], boxes[order[1:]])[0]
+        order = order[1:][ious <= iou_threshold]
+    return keep